@@ -1,60 +1,2713 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
 import json
 import os
+import re
+import csv
+import gzip
+import mmap
+import struct
+import array
+import gc
+import shutil
 import sys
 import threading
 from datetime import datetime, timedelta
 import time
 from pathlib import Path
 import traceback
+import functools
+import cProfile
+import pstats
+import io
+import tracemalloc
+import logging
+import logging.handlers
+from collections import deque
+import importlib.util
+import bisect
+import heapq
+import itertools
+import calendar
+import argparse
+import hashlib
+import tempfile
+import multiprocessing.connection
+import queue
+import secrets
+import hmac
+from urllib.parse import parse_qs
 
-# Tente importar bibliotecas opcionais
-try:
+STARTUP_TIME = time.perf_counter()
+
+logger = logging.getLogger("task_reminder")
+
+def module_available(name):
+    """Verifica se um módulo pode ser importado, sem importá-lo"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+class LazyImport:
+    """Adia a importação de uma biblioteca opcional até o primeiro uso"""
+    def __init__(self, loader):
+        # loader usa import normal para que o PyInstaller encontre o módulo
+        self._loader = loader
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    start = time.perf_counter()
+                    self._target = self._loader()
+                    logger.debug("%s carregado em %.1f ms", self._loader.__name__,
+                                 (time.perf_counter() - start) * 1000)
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+def _import_tkinter():
+    import tkinter
+    return tkinter
+
+def _import_ttk():
+    from tkinter import ttk
+    return ttk
+
+def _import_messagebox():
+    from tkinter import messagebox
+    return messagebox
+
+def _import_simpledialog():
+    from tkinter import simpledialog
+    return simpledialog
+
+def _import_filedialog():
+    from tkinter import filedialog
+    return filedialog
+
+def _import_plyer_notification():
     from plyer import notification
-    PLYER_AVAILABLE = True
-except ImportError:
-    PLYER_AVAILABLE = False
+    return notification
+
+def _import_schedule():
+    import schedule
+    return schedule
+
+def _import_pil_image():
+    from PIL import Image
+    return Image
+
+def _import_pil_image_draw():
+    from PIL import ImageDraw
+    return ImageDraw
+
+def _import_pil_image_font():
+    from PIL import ImageFont
+    return ImageFont
+
+def _import_pystray():
+    import pystray
+    return pystray
+
+def _import_pystray_menu_item():
+    from pystray import MenuItem
+    return MenuItem
+
+def _import_winshell():
+    import winshell
+    return winshell
+
+def _import_dispatch():
+    from win32com.client import Dispatch
+    return Dispatch
+
+def _import_date_entry():
+    from tkcalendar import DateEntry
+    return DateEntry
+
+def _import_http_server():
+    import http.server
+    return http.server
+
+def _import_zoneinfo():
+    import zoneinfo
+    return zoneinfo
+
+# Bibliotecas opcionais: só a disponibilidade é verificada ao iniciar
+PLYER_AVAILABLE = module_available("plyer")
+SCHEDULE_AVAILABLE = module_available("schedule")
+PILLOW_AVAILABLE = module_available("PIL")
+PYSTRAY_AVAILABLE = module_available("pystray")
+WINSHELL_AVAILABLE = module_available("winshell") and module_available("win32com")
+TKCALENDAR_AVAILABLE = module_available("tkcalendar")
+ZONEINFO_AVAILABLE = module_available("zoneinfo")
+
+# Tk só é carregado ao abrir a interface; os subcomandos da linha de comando não precisam dele
+tk = LazyImport(_import_tkinter)
+ttk = LazyImport(_import_ttk)
+messagebox = LazyImport(_import_messagebox)
+simpledialog = LazyImport(_import_simpledialog)
+filedialog = LazyImport(_import_filedialog)
+
+notification = LazyImport(_import_plyer_notification)
+schedule = LazyImport(_import_schedule)
+Image = LazyImport(_import_pil_image)
+ImageDraw = LazyImport(_import_pil_image_draw)
+ImageFont = LazyImport(_import_pil_image_font)
+pystray = LazyImport(_import_pystray)
+item = LazyImport(_import_pystray_menu_item)
+winshell = LazyImport(_import_winshell)
+Dispatch = LazyImport(_import_dispatch)
+DateEntry = LazyImport(_import_date_entry)
+zoneinfo = LazyImport(_import_zoneinfo)
+http_server = LazyImport(_import_http_server)
+
+class IconCache:
+    """Ícones do aplicativo por tamanho e contagem, em cache na memória e no disco"""
+    VERSION = 1  # Incrementar ao mudar o desenho para invalidar o cache em disco
+    SIZES = (16, 32, 48, 64)
+    MAX_BADGE = 99
+
+    def __init__(self, cache_dir, source_file=None):
+        self.source_file = Path(source_file) if source_file else None
+        self.images = {}
+        self.lock = threading.Lock()
+        
+        # O cache em disco é separado por versão do desenho e do ícone de origem
+        stamp = f"v{self.VERSION}"
+        if self.source_file and self.source_file.exists():
+            stamp += f"_{int(self.source_file.stat().st_mtime)}"
+        self.cache_dir = Path(cache_dir) / stamp
+
+    @classmethod
+    def badge_key(cls, count):
+        """Normaliza a contagem: 0 = sem selo, acima de 99 vira o selo 99+"""
+        if not count or count < 0:
+            return 0
+        return min(count, cls.MAX_BADGE + 1)
+
+    def get(self, size=64, count=0, overdue=False):
+        """Retorna o ícone renderizado; após a primeira vez é só uma consulta ao dicionário"""
+        key = (size, self.badge_key(count), bool(overdue) and bool(count))
+        image = self.images.get(key)
+        if image is None:
+            with self.lock:
+                image = self.images.get(key)
+                if image is None:
+                    image = self._load_or_render(*key)
+                    self.images[key] = image
+        return image
+
+    def prerender(self, size=64):
+        """Renderiza todas as variantes com selo de um tamanho (rodar em segundo plano)"""
+        for count in range(self.MAX_BADGE + 2):
+            for overdue in (False, True):
+                self.get(size, count, overdue)
+
+    def _cache_path(self, size, count, overdue):
+        suffix = "o" if overdue else "p"
+        return self.cache_dir / f"icon_{size}_{count}_{suffix}.png"
+
+    def _load_or_render(self, size, count, overdue):
+        path = self._cache_path(size, count, overdue)
+        if path.exists():
+            try:
+                image = Image.open(path)
+                image.load()
+                return image
+            except Exception:
+                logger.debug("Ícone em cache inválido: %s", path, exc_info=True)
+        
+        image = self._render(size, count, overdue)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            image.save(path, format='PNG')
+        except OSError:
+            logger.debug("Não foi possível gravar ícone em cache: %s", path, exc_info=True)
+        return image
+
+    def _render(self, size, count, overdue):
+        if count:
+            image = self.get(size).copy()
+            self._draw_badge(image, count, overdue)
+            return image
+        return self._render_base(size)
+
+    def _render_base(self, size):
+        """Ícone sem selo: o arquivo de ícone, se existir, ou o desenho padrão"""
+        if self.source_file and self.source_file.exists():
+            try:
+                image = Image.open(self.source_file).convert('RGBA')
+                return image.resize((size, size), Image.LANCZOS)
+            except Exception:
+                logger.warning("Erro ao ler %s, usando ícone padrão", self.source_file, exc_info=True)
+        
+        image = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        
+        draw.ellipse([(10, 10), (54, 54)], fill='#007bff')
+        
+        draw.rectangle([(26, 20), (38, 40)], fill='white')
+        draw.polygon([(24, 20), (40, 20), (38, 18), (26, 18)], fill='white')
+        
+        draw.line([(32, 40), (32, 44)], fill='white', width=2)
+        draw.ellipse([(30, 44), (34, 48)], fill='white')
+        
+        if size != 64:
+            image = image.resize((size, size), Image.LANCZOS)
+        return image
+
+    def _draw_badge(self, image, count, overdue):
+        """Desenha o selo com a contagem no canto inferior direito"""
+        size = image.width
+        text = f"{self.MAX_BADGE}+" if count > self.MAX_BADGE else str(count)
+        diameter = int(size * (0.55 if len(text) < 2 else 0.62))
+        box = [(size - diameter, size - diameter), (size - 1, size - 1)]
+        
+        draw = ImageDraw.Draw(image)
+        draw.ellipse(box, fill='#dc3545' if overdue else '#ffc107', outline='white')
+        
+        font = self._badge_font(int(diameter * (0.7 if len(text) < 3 else 0.5)))
+        center = (size - diameter / 2, size - diameter / 2)
+        draw.text(center, text, fill='white' if overdue else '#212529', font=font, anchor='mm')
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _badge_font(font_size):
+        try:
+            return ImageFont.truetype("arialbd.ttf", font_size)
+        except OSError:
+            try:
+                return ImageFont.load_default(size=font_size)
+            except TypeError:
+                return ImageFont.load_default()
+
+SNOOZE_OPTIONS = ((5, "5 min"), (15, "15 min"), (60, "1 h"))
+DEFAULT_ESCALATION_INTERVALS = [1, 2, 5, 10, 15]
+
+# Prioridades: menor valor sai primeiro da fila de notificações
+PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 0, 1, 2
+PRIORITY_LABELS = {PRIORITY_HIGH: "Alta", PRIORITY_NORMAL: "Normal", PRIORITY_LOW: "Baixa"}
+PRIORITY_ICONS = {PRIORITY_HIGH: "🔴", PRIORITY_NORMAL: "", PRIORITY_LOW: "🔵"}
+
+def task_priority(task):
+    """Prioridade da tarefa (tarefas antigas não têm o campo e são normais)"""
+    priority = task.get('priority', PRIORITY_NORMAL)
+    return priority if priority in PRIORITY_LABELS else PRIORITY_NORMAL
+
+def parse_priority(label):
+    """Converte o rótulo exibido no formulário para o valor salvo"""
+    for priority, text in PRIORITY_LABELS.items():
+        if text == label:
+            return priority
+    return PRIORITY_NORMAL
+
+def play_alert_sound():
+    """Toca o som de alerta do sistema (Windows); retorna False se não houver suporte"""
+    try:
+        import winsound
+        winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
+        return True
+    except (ImportError, RuntimeError):
+        return False
+
+# Fusos horários: a tarefa guarda o instante em UTC (due_at) e o fuso IANA de origem (tz);
+# 'datetime' é a hora local do sistema, recalculada a partir de due_at quando o fuso muda
+EPOCH = datetime(1970, 1, 1)
+# Transições de fuso acontecem em múltiplos de 15 minutos (UTC)
+OFFSET_BUCKET = 900
+
+@functools.lru_cache(maxsize=None)
+def get_zone(name):
+    """ZoneInfo do fuso ou None se não existir (ex.: Windows sem o pacote tzdata)"""
+    if not name or not ZONEINFO_AVAILABLE:
+        return None
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        logger.warning("Fuso horário desconhecido: %s", name)
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def zone_offset(name, bucket):
+    """Deslocamento UTC (segundos) do fuso num intervalo de 15 min; None é o fuso do sistema"""
+    instant = bucket * OFFSET_BUCKET
+    zone = get_zone(name)
+    if zone is None:
+        local = datetime.fromtimestamp(instant).astimezone()
+    else:
+        local = datetime.fromtimestamp(instant, zone)
+    return int(local.utcoffset().total_seconds())
+
+def epoch_to_wall(epoch, name=None):
+    """Hora local (sem fuso) de um instante UTC"""
+    epoch = int(epoch)
+    return EPOCH + timedelta(seconds=epoch + zone_offset(name, epoch // OFFSET_BUCKET))
+
+def wall_to_epoch(wall, name=None):
+    """Instante UTC de uma hora local; como no zoneinfo (fold=0), a hora repetida no fim
+    do horário de verão é a primeira e a hora pulada usa o deslocamento anterior"""
+    naive = int((wall - EPOCH).total_seconds())
+    guess = naive - zone_offset(name, naive // OFFSET_BUCKET)
+    epoch = naive - zone_offset(name, guess // OFFSET_BUCKET)
+    return epoch if epoch_to_wall(epoch, name) == wall else guess
+
+def wall_string(epoch, name=None):
+    return epoch_to_wall(epoch, name).strftime("%Y-%m-%d %H:%M:%S")
+
+def system_zone_name():
+    """Nome IANA do fuso do sistema, ou None quando só o deslocamento local é conhecido"""
+    name = os.environ.get("TZ", "").lstrip(":")
+    if name and get_zone(name) is not None:
+        return name
+    
+    target = os.path.realpath("/etc/localtime")
+    marker = "zoneinfo" + os.sep
+    if marker in target:
+        name = target.split(marker, 1)[1]
+        if get_zone(name) is not None:
+            return name
+    return None
+
+def zone_signature():
+    """Identifica o fuso atual do sistema para detectar mudanças (viagens, ajustes)"""
+    if hasattr(time, "tzset"):
+        time.tzset()
+    return system_zone_name(), time.tzname, time.timezone
+
+def effective_due(task):
+    """Quando a tarefa volta a notificar: o adiamento, se houver, ou a data da tarefa"""
+    return task.get('snoozed_until') or task['datetime']
+
+def clear_snooze(task):
+    task.pop('snoozed_until', None)
+    task.pop('snooze_at', None)
+
+class UndoHistory:
+    """Pilhas de desfazer/refazer com operações inversas, limitadas a limit ações.
+
+    Cada ação guarda só o que mudou: ('insert', [(posição, tarefa)]),
+    ('delete', [ids]) ou ('update', {id: campos}), nunca cópias da lista inteira;
+    ('archive' / 'unarchive', [tarefas]) movem tarefas para o arquivo e de volta.
+    """
+    def __init__(self, limit=50):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+
+    def record(self, label, undo, redo):
+        entry = (label, undo, redo)
+        self.undo_stack.append(entry)
+        self.redo_stack.clear()
+        return entry
+
+    def is_last(self, entry):
+        """A ação ainda é a próxima a desfazer (e pode receber mais operações)?"""
+        return bool(self.undo_stack) and self.undo_stack[-1] is entry
+
+    def undo(self):
+        """Retorna (rótulo, operações) da última ação ou None"""
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return entry[0], entry[1]
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        return entry[0], entry[2]
+
+    def set_limit(self, limit):
+        # Mantém as ações mais recentes
+        self.undo_stack = deque(self.undo_stack, maxlen=limit)
+        self.redo_stack = deque(self.redo_stack, maxlen=limit)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+class TaskJournal:
+    """Diário de alterações (uma linha JSON cada) aplicado sobre o tasks.json: campos de
+    uma tarefa ou um lote de tarefas novas"""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+
+    def append(self, task_id, fields):
+        """Registra a alteração de campos de uma tarefa (None remove o campo)"""
+        line = json.dumps({"op": "update", "id": task_id, "fields": fields}, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+    def append_tasks(self, tasks):
+        """Registra tarefas novas inteiras (ex.: um lote da importação)"""
+        line = json.dumps({"op": "insert", "tasks": tasks}, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+    def replay(self, tasks):
+        """Aplica as alterações registradas sobre a lista carregada do tasks.json"""
+        if not self.path.exists():
+            return 0
+        
+        by_id = {task['id']: task for task in tasks}
+        applied = 0
+        updates = []
+        with self.lock, open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha incompleta (gravação interrompida)
+                    logger.warning("Linha inválida ignorada no diário %s", self.path)
+                    continue
+                if entry.get("op") != "insert":
+                    updates.append(entry)
+                    continue
+                for task in entry.get("tasks", ()):
+                    if task.get("id") not in by_id:
+                        tasks.append(task)
+                        by_id[task["id"]] = task
+                applied += 1
+        
+        # Os lotes novos são gravados por outra thread: uma alteração numa tarefa importada
+        # pode estar no diário antes do lote dela
+        for entry in updates:
+            task = by_id.get(entry.get("id"))
+            if task is None:
+                continue
+            apply_task_fields(task, entry.get("fields", {}))
+            applied += 1
+        return applied
+
+    def clear(self):
+        """Descarta o diário depois de um salvamento completo"""
+        with self.lock:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+def apply_task_fields(task, fields):
+    """Atualiza campos de uma tarefa; valores None removem o campo"""
+    for key, value in fields.items():
+        if value is None:
+            task.pop(key, None)
+        else:
+            task[key] = value
+
+def set_task_due(task, wall, zone):
+    """Define o horário (hora local do fuso zone) guardando o instante UTC e o fuso"""
+    task['tz'] = zone or ""
+    task['due_at'] = wall_to_epoch(wall, zone)
+    task['datetime'] = wall_string(task['due_at'], zone)
+
+def anchor_task(task, zone):
+    """Recalcula as horas locais da tarefa a partir dos instantes em UTC"""
+    task['datetime'] = wall_string(task['due_at'], zone)
+    if 'snooze_at' in task:
+        task['snoozed_until'] = wall_string(task['snooze_at'], zone)
+
+def build_task(task_id, text, task_datetime, zone, reminders=(), priority=PRIORITY_NORMAL,
+               list_name="", tags=(), recurrence=None, escalate=False):
+    """Monta o dicionário de uma tarefa nova (ainda fora da lista)"""
+    now = datetime.now()
+    task = {
+        "id": task_id,
+        "task": text,
+        "datetime": task_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+        "reminders": sorted({m for m in reminders if isinstance(m, int) and m > 0}),
+        "status": "Pendente",
+        "created_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "is_overdue": task_datetime < now,
+        "priority": priority,
+        "list": list_name or DEFAULT_LIST,
+        "tags": list(tags)
+    }
+    set_task_due(task, task_datetime, zone)
+    if recurrence:
+        task["recurrence"] = recurrence
+        task["occurrence"] = 1
+    if escalate:
+        task["escalate"] = True
+    return task
+
+def next_task_id(tasks):
+    return max((t['id'] for t in tasks), default=0) + 1
+
+def task_from_command(task_id, zone, text, at=None, reminders="", priority="Normal", tags="", list_name=""):
+    """Tarefa nova a partir dos argumentos da linha de comando"""
+    text = (text or "").strip()
+    if not text:
+        raise ValueError("Descrição da tarefa vazia")
+    task_datetime = parse_user_datetime(at) if at else \
+        (datetime.now() + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+    return build_task(
+        task_id,
+        text,
+        task_datetime,
+        zone,
+        reminders=parse_reminder_offsets(reminders or ""),
+        priority=parse_priority(priority),
+        list_name=list_name,
+        tags=parse_tags(tags or "")
+    )
+
+def tasks_from_records(records, task_id, zone, rejected=None):
+    """Converte registros importados em tarefas novas, com IDs sequenciais a partir de task_id;
+    as posições dos registros inválidos vão para rejected"""
+    tasks = []
+    for position, record in enumerate(records):
+        try:
+            fields = record_fields(record)
+            task = build_task(task_id, fields.pop('text'), fields.pop('task_datetime'), zone, **fields)
+        except (KeyError, ValueError):
+            logger.warning("Registro importado inválido ignorado: %r", record)
+            if rejected is not None:
+                rejected.append(position)
+            continue
+        if record.get('status') == 'Concluída':
+            task['status'] = 'Concluída'
+            task['completed_at'] = record.get('completed_at') or task['created_at']
+        tasks.append(task)
+        task_id += 1
+    return tasks
+
+def read_task_records(path):
+    """Registros de um arquivo JSON: uma lista ou {"tasks": [...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    if isinstance(records, dict):
+        records = records.get("tasks", [])
+    return records
+
+IMPORT_CHUNK_SIZE = 5000
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+CSV_COLUMNS = ["id", "task", "datetime", "status", "priority", "list", "tags",
+               "reminders", "recurrence", "escalate", "created_at", "completed_at"]
+
+def iter_csv_records(f):
+    """Registros de um CSV com cabeçalho (colunas de CSV_COLUMNS; as demais são ignoradas)"""
+    for row in csv.DictReader(f):
+        record = {key.strip().lower(): value.strip() for key, value in row.items()
+                  if key and isinstance(value, str) and value.strip()}
+        if 'recurrence' in record:
+            try:
+                record['recurrence'] = json.loads(record['recurrence'])
+            except ValueError:
+                pass  # record_fields rejeita o registro
+        if 'escalate' in record:
+            record['escalate'] = record['escalate'].lower() in ("1", "true", "sim", "yes", "x")
+        yield record
+
+def iter_ndjson_records(f):
+    """Um registro JSON por linha; linhas inválidas são ignoradas com aviso"""
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            logger.warning("Linha %d inválida ignorada: %s", number, line[:80])
+
+def csv_row(task):
+    return {
+        **{key: task.get(key, "") for key in CSV_COLUMNS},
+        "priority": PRIORITY_LABELS[task_priority(task)],
+        "tags": format_tags(task.get('tags', [])),
+        "reminders": format_reminder_offsets(task.get('reminders', [])),
+        "recurrence": json.dumps(task['recurrence'], ensure_ascii=False) if task.get('recurrence') else "",
+        "escalate": "sim" if task.get('escalate') else "",
+    }
+
+def iter_task_records(path, zone=None):
+    """Registros de um arquivo de tarefas conforme a extensão; só o JSON completo é lido de uma vez"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ICS_SUFFIXES:
+        with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+            yield from iter_ics_records(f, zone)
+    elif suffix == ".csv":
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from iter_csv_records(f)
+    elif suffix in NDJSON_SUFFIXES:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            yield from iter_ndjson_records(f)
+    else:
+        yield from read_task_records(path)
+
+def write_tasks_file(path, tasks, zone=None):
+    """Grava as tarefas no formato da extensão, uma de cada vez; .ics leva só as pendentes.
+    Retorna a quantidade"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ICS_SUFFIXES:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            return write_ics(f, tasks, zone)
+    
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if suffix == ".csv":
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            for task in tasks:
+                writer.writerow(csv_row(task))
+        elif suffix in NDJSON_SUFFIXES:
+            for task in tasks:
+                f.write(json.dumps(task, ensure_ascii=False) + "\n")
+        else:
+            json.dump(tasks, f, ensure_ascii=False, indent=2)
+    return len(tasks)
+
+def content_hash(text, when):
+    """Identidade de conteúdo (texto, data/hora) usada para descartar duplicatas na importação"""
+    return hashlib.blake2b(f"{text}\0{when}".encode('utf-8'), digest_size=16).digest()
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+def dedup_batches(records, zone, seen, totals, size=IMPORT_CHUNK_SIZE):
+    """Converte os registros em lotes de tarefas novas (ainda sem ID definitivo).
+
+    Tarefas com o mesmo texto e data/hora de uma já existente (ou já importada) são
+    descartadas; seen guarda só os hashes. totals acumula read/imported/duplicates/rejected.
+    """
+    for chunk in iter_chunks(records, size):
+        rejected = []
+        tasks = []
+        for task in tasks_from_records(chunk, 1, zone, rejected):
+            key = content_hash(task['task'], task['datetime'])
+            if key in seen:
+                totals['duplicates'] += 1
+                continue
+            seen.add(key)
+            tasks.append(task)
+        totals['read'] += len(chunk)
+        totals['rejected'] += len(rejected)
+        totals['imported'] += len(tasks)
+        yield tasks
+
+def import_totals():
+    return {"read": 0, "imported": 0, "duplicates": 0, "rejected": 0}
+
+def describe_import(totals):
+    text = f"{totals['imported']} tarefa(s) importada(s)"
+    if totals['duplicates']:
+        text += f", {totals['duplicates']} duplicada(s) ignorada(s)"
+    if totals['rejected']:
+        text += f", {totals['rejected']} inválida(s)"
+    return text
+
+def mark_completed(task):
+    task['status'] = 'Concluída'
+    task['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    clear_snooze(task)
+
+def advance_recurrence(task, after, system_zone=None):
+    """Move uma tarefa recorrente para a próxima ocorrência depois de after; False se não houver"""
+    rule = task.get('recurrence')
+    if not rule:
+        return False
+    
+    # A regra vale na hora local do fuso da tarefa (9h continua 9h após o horário de verão)
+    zone = task.get('tz') or None
+    task_time = epoch_to_wall(task['due_at'], zone)
+    after = epoch_to_wall(after.timestamp(), zone)
+    occurrence = next_occurrence(rule, task_time, task.get('occurrence', 1), after)
+    if occurrence is None:
+        return False
+    
+    task['occurrence'], next_time = occurrence
+    task['due_at'] = wall_to_epoch(next_time, zone)
+    task['datetime'] = wall_string(task['due_at'], system_zone)
+    task['status'] = 'Pendente'
+    task['is_overdue'] = False
+    return True
+
+def complete_occurrence(task, system_zone=None):
+    """Conclui a ocorrência atual. A recorrente passa para a próxima e só fica Concluída
+    quando a regra terminou; retorna True se a tarefa continua em aberto"""
+    if task.get('recurrence') and task.get('snoozed_until'):
+        # O adiamento é da ocorrência que já disparou: a recorrência já avançou
+        clear_snooze(task)
+        return True
+    
+    clear_snooze(task)
+    after = datetime.now()
+    if task.get('due_at') is not None:
+        # Concluir antes da hora pula só esta ocorrência; atrasada, vai para a próxima futura
+        after = max(after, datetime.fromtimestamp(task['due_at']))
+    if advance_recurrence(task, after, system_zone):
+        return True
+    mark_completed(task)
+    return False
+
+def list_open_tasks(tasks, due_before=None, include_done=False):
+    """Tarefas por data/hora; due_before (datetime) limita às que vencem antes dele"""
+    limit = due_before.strftime("%Y-%m-%d %H:%M:%S") if due_before else None
+    selected = [t for t in tasks
+                if (include_done or t.get('status') != 'Concluída')
+                and (limit is None or effective_due(t) < limit)]
+    selected.sort(key=lambda t: (effective_due(t), t['id']))
+    return selected
+
+def task_stats(tasks):
+    """Contagens para o subcomando stats"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    open_tasks = [t for t in tasks if t.get('status') != 'Concluída']
+    by_list, by_priority = {}, {}
+    for task in open_tasks:
+        list_name = task.get('list') or DEFAULT_LIST
+        by_list[list_name] = by_list.get(list_name, 0) + 1
+        label = PRIORITY_LABELS[task_priority(task)]
+        by_priority[label] = by_priority.get(label, 0) + 1
+    upcoming = [effective_due(t) for t in open_tasks if effective_due(t) >= now]
+    return {
+        "total": len(tasks),
+        "pending": len(open_tasks),
+        "completed": len(tasks) - len(open_tasks),
+        "overdue": sum(1 for t in open_tasks if effective_due(t) < now),
+        "recurring": sum(1 for t in open_tasks if t.get('recurrence')),
+        "next_due": min(upcoming) if upcoming else None,
+        "by_list": by_list,
+        "by_priority": by_priority,
+    }
+
+# Esquema das tarefas: cada migração leva os dados da versão anterior para a sua, uma única vez
+def migrate_legacy_fields(tasks, zone):
+    """Versão 1: is_overdue calculado e lembretes na lista 'reminders'"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for task in tasks:
+        if 'is_overdue' not in task:
+            task['is_overdue'] = task['datetime'] < now
+        if 'reminders' not in task or any(field in task for field in LEGACY_REMINDER_FIELDS):
+            migrate_legacy_reminders(task)
+
+def migrate_anchor_times(tasks, zone):
+    """Versão 2: instantes UTC (due_at/snooze_at) e fuso; a hora salva era a do fuso do sistema"""
+    for task in tasks:
+        if 'due_at' not in task:
+            set_task_due(task, datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S"), zone)
+        if task.get('snoozed_until') and 'snooze_at' not in task:
+            task['snooze_at'] = wall_to_epoch(
+                datetime.strptime(task['snoozed_until'], "%Y-%m-%d %H:%M:%S"), zone)
+        elif not task.get('snoozed_until'):
+            clear_snooze(task)
+
+def migrate_organization(tasks, zone):
+    """Versão 3: prioridade, lista e etiquetas sempre presentes"""
+    for task in tasks:
+        task.setdefault('priority', PRIORITY_NORMAL)
+        task['list'] = task.get('list') or DEFAULT_LIST
+        task.setdefault('tags', [])
+
+MIGRATIONS = [
+    (1, migrate_legacy_fields),
+    (2, migrate_anchor_times),
+    (3, migrate_organization),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate_tasks(tasks, version, zone):
+    """Aplica em ordem as migrações posteriores a version; retorna a versão final"""
+    for target, migration in MIGRATIONS:
+        if version < target:
+            migration(tasks, zone)
+            logger.info("%d tarefa(s) migrada(s) para o esquema %d (%s)", len(tasks), target, migration.__name__)
+            version = target
+    return version
+
+# Snapshot binário: cabeçalho, colunas de tamanho fixo e uma tabela de strings sem repetição
+SNAPSHOT_MAGIC = b"TRSNAP\x00\x01"
+SNAPSHOT_HEADER = struct.Struct("<8sIIIII")  # magic, versão, esquema, tarefas, strings, fuso (ref)
+SNAPSHOT_VERSION = 3
+# A versão 2 não tem o resumo SHA-256 no fim do arquivo
+SNAPSHOT_VERSIONS = (2, 3)
+SNAPSHOT_COLUMNS = [
+    ("id", "q"), ("due_at", "q"), ("snooze_at", "q"),
+    ("task", "I"), ("datetime", "I"), ("created_at", "I"), ("completed_at", "I"), ("list", "I"),
+    ("tz", "I"), ("tags", "I"), ("reminders", "I"), ("snoozed_until", "I"), ("extra", "I"),
+    ("status", "B"), ("priority", "B"), ("flags", "B"),
+]
+SNAPSHOT_STATUSES = ["Pendente", "Concluída", "Atrasada"]
+SNAPSHOT_FIELDS = {"id", "task", "datetime", "status", "created_at", "reminders", "priority", "list",
+                   "tags", "tz", "due_at", "is_overdue", "completed_at", "snoozed_until", "snooze_at", "escalate"}
+FLAG_OVERDUE, FLAG_ESCALATE, FLAG_SNOOZE, FLAG_RAW = 1, 2, 4, 8
+
+def snapshot_fits(task):
+    """A tarefa cabe nas colunas? As que não cabem vão inteiras, em JSON, na coluna extra"""
+    try:
+        texts = [task[key] for key in ('task', 'datetime', 'created_at', 'list', 'tz')]
+        texts += [task.get('completed_at', ""), task.get('snoozed_until', "")] + task['tags']
+        return (type(task['id']) is int and type(task['due_at']) is int
+                and type(task.get('snooze_at', 0)) is int
+                and ('snooze_at' in task) == ('snoozed_until' in task)
+                and task['status'] in SNAPSHOT_STATUSES
+                and task['priority'] in PRIORITY_LABELS
+                and type(task['is_overdue']) is bool
+                and task.get('escalate', True) is True
+                and all(type(m) is int and m >= 0 for m in task['reminders'])
+                and all(type(text) is str for text in texts)
+                and all(tag and "\x1f" not in tag for tag in task['tags'])
+                and "\0" not in "".join(texts))
+    except (KeyError, TypeError):
+        return False
+
+# tasks.json começa pelo SHA-256 do próprio arquivo, calculado com o campo zerado
+CHECKSUM_PREFIX = b'{\n  "checksum": "'
+CHECKSUM_PLACEHOLDER = b"0" * 64
+
+def sync_directory(path):
+    """Força ao disco a troca de nomes na pasta (não existe no Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, data):
+    """Grava num temporário ao lado, força ao disco e troca pelo arquivo: nunca fica pela metade"""
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    sync_directory(path.parent)
+
+def file_digest(f):
+    """SHA-256 do arquivo aberto f, lido do início; deixa a posição no fim"""
+    f.flush()
+    f.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1 << 20), b""):
+        digest.update(chunk)
+    return digest.digest()
+
+def tasks_json_bytes(tasks, zone):
+    """Conteúdo do tasks.json, com o checksum"""
+    data = json.dumps({"checksum": CHECKSUM_PLACEHOLDER.decode(), "schema": SCHEMA_VERSION, "zone": zone,
+                       "tasks": tasks}, ensure_ascii=False, indent=2).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest().encode()
+    return data.replace(CHECKSUM_PLACEHOLDER, digest, 1)
+
+def parse_tasks_json(data):
+    """(tarefas, versão do esquema, fuso) de um tasks.json; ValueError se o checksum não confere.
+    Arquivos sem checksum (versões anteriores do app) são aceitos como estão"""
+    if data.startswith(CHECKSUM_PREFIX):
+        start = len(CHECKSUM_PREFIX)
+        view = memoryview(data)
+        digest = hashlib.sha256(view[:start])
+        digest.update(CHECKSUM_PLACEHOLDER)
+        digest.update(view[start + 64:])
+        if digest.hexdigest().encode() != data[start:start + 64]:
+            raise ValueError("Checksum do arquivo de tarefas não confere")
+    loaded = json.loads(data)
+    if isinstance(loaded, list):
+        # Formato antigo: só a lista, sem versão
+        return loaded, 0, None
+    if (not isinstance(loaded, dict) or not isinstance(loaded.get("tasks"), list)
+            or not isinstance(loaded.get("schema"), int)):
+        raise ValueError("Arquivo de tarefas sem 'schema' ou 'tasks'")
+    return loaded["tasks"], loaded["schema"], loaded.get("zone")
+
+def write_snapshot(path, tasks, zone):
+    """Grava o snapshot binário num arquivo temporário e o troca pelo atual"""
+    strings = {"": 0}
+    
+    def ref(value):
+        value = value or ""
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+    
+    columns = {name: array.array(code) for name, code in SNAPSHOT_COLUMNS}
+    appenders = {name: column.append for name, column in columns.items()}
+    for task in tasks:
+        if snapshot_fits(task):
+            extra = {key: value for key, value in task.items() if key not in SNAPSHOT_FIELDS}
+            flags = ((FLAG_OVERDUE if task['is_overdue'] else 0) | (FLAG_ESCALATE if task.get('escalate') else 0)
+                     | (FLAG_SNOOZE if 'snooze_at' in task else 0))
+            appenders["id"](task['id'])
+            appenders["due_at"](task['due_at'])
+            appenders["snooze_at"](task.get('snooze_at', 0))
+            appenders["task"](ref(task['task']))
+            appenders["datetime"](ref(task['datetime']))
+            appenders["created_at"](ref(task['created_at']))
+            appenders["completed_at"](ref(task.get('completed_at')))
+            appenders["list"](ref(task['list']))
+            appenders["tz"](ref(task['tz']))
+            appenders["tags"](ref("\x1f".join(task['tags'])))
+            appenders["reminders"](ref(",".join(map(str, task['reminders']))))
+            appenders["snoozed_until"](ref(task.get('snoozed_until')))
+            appenders["extra"](ref(json.dumps(extra, ensure_ascii=False) if extra else ""))
+            appenders["status"](SNAPSHOT_STATUSES.index(task['status']))
+            appenders["priority"](task['priority'])
+            appenders["flags"](flags)
+        else:
+            for name, code in SNAPSHOT_COLUMNS:
+                appenders[name](0)
+            # O ID verdadeiro (que pode nem ser numérico) está no JSON; a coluna fica zerada
+            columns["extra"][-1] = ref(json.dumps(task, ensure_ascii=False))
+            columns["flags"][-1] = FLAG_RAW
+    
+    # O fuso entra na tabela antes de ela ser serializada (pode não aparecer em nenhuma tarefa)
+    zone_ref = ref(zone)
+    table = "\0".join(strings).encode('utf-8', 'surrogatepass')
+    offsets = array.array("I", [0])
+    position = 0
+    for value in strings:
+        position += len(value.encode('utf-8', 'surrogatepass')) + 1
+        offsets.append(position)
+    
+    temp_path = Path(path).with_suffix(".tmp")
+    with open(temp_path, 'w+b') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, SCHEMA_VERSION,
+                                     len(tasks), len(strings), zone_ref))
+        for name, _ in SNAPSHOT_COLUMNS:
+            columns[name].tofile(f)
+        # Alinhar a tabela de deslocamentos depois das colunas de 1 byte
+        f.write(b"\0" * (-f.tell() % 8))
+        offsets.tofile(f)
+        f.write(table)
+        # SHA-256 de tudo o que veio antes, conferido ao carregar
+        f.write(file_digest(f))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    sync_directory(Path(path).parent)
+
+class TaskSnapshot:
+    """Snapshot binário aberto via mmap: nada é decodificado ao abrir.
+
+    As colunas são memoryviews sobre o arquivo e cada string só é decodificada quando
+    pedida; tasks() monta todos os dicionários de uma vez, decodificando a tabela inteira.
+    """
+    def __init__(self, path, data=None):
+        """data: conteúdo já em memória (um backup descompactado) em vez do arquivo"""
+        if data is None:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mm = data
+        try:
+            magic, self.version, self.schema, self.count, self.string_count, zone_ref = \
+                SNAPSHOT_HEADER.unpack_from(self.mm)
+            if magic != SNAPSHOT_MAGIC or self.version not in SNAPSHOT_VERSIONS:
+                raise ValueError(f"Snapshot desconhecido: {path}")
+            
+            self.view = memoryview(self.mm)
+            offset = SNAPSHOT_HEADER.size
+            self.columns = {}
+            for name, code in SNAPSHOT_COLUMNS:
+                size = self.count * struct.calcsize(code)
+                if offset + size > len(self.mm):
+                    raise ValueError(f"Snapshot truncado: {path}")
+                self.columns[name] = self.view[offset:offset + size].cast(code)
+                offset += size
+            offset += -offset % 8
+            size = (self.string_count + 1) * 4
+            self.offsets = self.view[offset:offset + size].cast("I")
+            self.table_start = offset + size
+            if self.table_start + self.offsets[-1] - 1 > len(self.mm):
+                raise ValueError(f"Snapshot truncado: {path}")
+            self.zone = self.string(zone_ref)
+        except Exception:
+            self.close()
+            raise
+
+    def verify(self):
+        """Confere o SHA-256 do fim do arquivo; percorre o arquivo inteiro uma vez"""
+        if self.version < 3:
+            return
+        size = len(self.mm) - 32
+        if size < self.table_start or hashlib.sha256(self.view[:size]).digest() != self.mm[size:]:
+            raise ValueError("Checksum do snapshot não confere")
+
+    def string(self, index):
+        if not 0 <= index < self.string_count:
+            raise ValueError(f"Índice de string inválido no snapshot: {index}")
+        start = self.table_start + self.offsets[index]
+        end = self.table_start + self.offsets[index + 1] - 1
+        return str(self.mm[start:end], 'utf-8', 'surrogatepass')
+
+    def record(self, index, strings=None):
+        """Decodifica só a tarefa index"""
+        string = strings.__getitem__ if strings is not None else self.string
+        c = self.columns
+        flags = c["flags"][index]
+        if flags & FLAG_RAW:
+            return json.loads(string(c["extra"][index]))
+        
+        tags = string(c["tags"][index])
+        reminders = string(c["reminders"][index])
+        task = {
+            "id": c["id"][index],
+            "task": string(c["task"][index]),
+            "datetime": string(c["datetime"][index]),
+            "reminders": [int(m) for m in reminders.split(",")] if reminders else [],
+            "status": SNAPSHOT_STATUSES[c["status"][index]],
+            "created_at": string(c["created_at"][index]),
+            "is_overdue": bool(flags & FLAG_OVERDUE),
+            "priority": c["priority"][index],
+            "list": string(c["list"][index]),
+            "tags": tags.split("\x1f") if tags else [],
+            "tz": string(c["tz"][index]),
+            "due_at": c["due_at"][index],
+        }
+        if c["completed_at"][index]:
+            task["completed_at"] = string(c["completed_at"][index])
+        if flags & FLAG_SNOOZE:
+            task["snooze_at"] = c["snooze_at"][index]
+            task["snoozed_until"] = string(c["snoozed_until"][index])
+        if flags & FLAG_ESCALATE:
+            task["escalate"] = True
+        if c["extra"][index]:
+            task.update(json.loads(string(c["extra"][index])))
+        return task
+
+    def tasks(self):
+        """Todas as tarefas, com a tabela de strings decodificada numa só chamada.
+
+        As colunas viram listas de uma vez e o dicionário é montado direto; só as tarefas
+        gravadas inteiras em JSON ou adiadas passam por record().
+        """
+        start = self.table_start
+        strings = str(self.mm[start:start + self.offsets[-1] - 1], 'utf-8', 'surrogatepass').split("\0")
+        c = {name: column.tolist() for name, column in self.columns.items()}
+        statuses = SNAPSHOT_STATUSES
+        rare = FLAG_RAW | FLAG_SNOOZE
+        reminder_lists = {0: ()}
+        tag_lists = {0: ()}
+        for ref in set(c["reminders"]) - reminder_lists.keys():
+            reminder_lists[ref] = tuple(int(m) for m in strings[ref].split(","))
+        for ref in set(c["tags"]) - tag_lists.keys():
+            tag_lists[ref] = tuple(strings[ref].split("\x1f"))
+        
+        # Milhares de dicionários novos: a coleta de lixo só atrapalharia aqui
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            tasks = []
+            append = tasks.append
+            for index, (task_id, due_at, text, when, created, completed, list_name, tz, tags, reminders,
+                        extra, status, priority, flags) in enumerate(zip(
+                    c["id"], c["due_at"], c["task"], c["datetime"], c["created_at"], c["completed_at"],
+                    c["list"], c["tz"], c["tags"], c["reminders"], c["extra"], c["status"],
+                    c["priority"], c["flags"])):
+                if flags & rare:
+                    append(self.record(index, strings))
+                    continue
+                task = {
+                    "id": task_id,
+                    "task": strings[text],
+                    "datetime": strings[when],
+                    "reminders": list(reminder_lists[reminders]),
+                    "status": statuses[status],
+                    "created_at": strings[created],
+                    "is_overdue": bool(flags & FLAG_OVERDUE),
+                    "priority": priority,
+                    "list": strings[list_name],
+                    "tags": list(tag_lists[tags]),
+                    "tz": strings[tz],
+                    "due_at": due_at,
+                }
+                if completed:
+                    task["completed_at"] = strings[completed]
+                if flags & FLAG_ESCALATE:
+                    task["escalate"] = True
+                if extra:
+                    task.update(json.loads(strings[extra]))
+                append(task)
+            return tasks
+        finally:
+            if enabled:
+                gc.enable()
+
+    def close(self):
+        for view in getattr(self, 'columns', {}).values():
+            view.release()
+        if getattr(self, 'offsets', None) is not None:
+            self.offsets.release()
+        if getattr(self, 'view', None) is not None:
+            self.view.release()
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Carimbos de versão de cada tarefa no arquivo compartilhado
+VERSION_FIELDS = ('rev', 'updated_at')
+# Espera máxima (s) pela trava do arquivo compartilhado
+SHARED_LOCK_TIMEOUT = 10
+# Intervalo (ms) da verificação de gravações de outro computador
+SHARED_WATCH_INTERVAL = 5000
+# Campo ausente numa das versões da tarefa (diferente de None)
+MISSING = object()
+
+def try_lock(f):
+    """Trava exclusiva, sem esperar, do arquivo aberto f; False se outro processo a tem"""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+def unlock(f):
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class FileLock:
+    """Trava consultiva entre processos (e entre computadores, se o compartilhamento a repassa)"""
+    def __init__(self, path, timeout=SHARED_LOCK_TIMEOUT):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.file = None
+
+    def __enter__(self):
+        f = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while not try_lock(f):
+            if time.monotonic() >= deadline:
+                f.close()
+                raise TimeoutError(f"{self.path.name} travado por outro processo há mais de {self.timeout} s")
+            time.sleep(0.05)
+        self.file = f
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            unlock(self.file)
+        except OSError:
+            pass
+        finally:
+            self.file.close()
+            self.file = None
+
+def stamp_changes(tasks, base):
+    """Carimba (rev + 1, updated_at) as tarefas novas ou diferentes da versão base"""
+    now = int(time.time())
+    for task in tasks:
+        previous = base.get(task['id'])
+        if task != previous:
+            task['rev'] = (previous or {}).get('rev', 0) + 1
+            task['updated_at'] = now
+
+def merge_task(base, ours, theirs):
+    """Junta campo a campo as duas versões de uma tarefa; se ambas mudaram o mesmo campo,
+    vence a carimbada por último. Retorna (tarefa, houve conflito)"""
+    newer = ours if ((ours.get('updated_at', 0), ours.get('rev', 0))
+                     > (theirs.get('updated_at', 0), theirs.get('rev', 0))) else theirs
+    merged = {}
+    conflict = False
+    for key in {**theirs, **ours}:
+        if key in VERSION_FIELDS:
+            continue
+        mine, other, old = ours.get(key, MISSING), theirs.get(key, MISSING), base.get(key, MISSING)
+        if mine == other or other == old:
+            value = mine
+        elif mine == old:
+            value = other
+        else:
+            value = newer.get(key, MISSING)
+            conflict = True
+        if value is not MISSING:
+            merged[key] = value
+    merged['rev'] = max(ours.get('rev', 0), theirs.get('rev', 0)) + 1
+    merged['updated_at'] = max(ours.get('updated_at', 0), theirs.get('updated_at', 0))
+    return merged, conflict
+
+def merge_tasks(base, ours, theirs):
+    """Merge de três vias por id: base é {id: tarefa} da última leitura/gravação deste app,
+    ours a lista atual e theirs a lista gravada por outro computador.
+    Retorna (lista, número de conflitos)"""
+    mine = {t['id']: t for t in ours}
+    merged = []
+    clashes = []
+    conflicts = 0
+    for other in theirs:
+        task_id = other['id']
+        old = base.get(task_id)
+        task = mine.pop(task_id, None)
+        if task is None:
+            # Excluída aqui continua excluída, a não ser que tenha sido alterada lá
+            if old is None or other != old:
+                merged.append(other)
+                conflicts += old is not None
+        elif old is None and task != other:
+            # Os dois lados criaram tarefas diferentes com o mesmo id
+            merged.append(other)
+            clashes.append(task)
+        elif task == other or other == old:
+            merged.append(task)
+        elif task == old:
+            merged.append(other)
+        else:
+            task, conflict = merge_task(old, task, other)
+            merged.append(task)
+            conflicts += conflict
+    
+    for task_id, task in mine.items():
+        old = base.get(task_id)
+        if old is not None:
+            # Excluída lá continua excluída, a não ser que tenha sido alterada aqui
+            if task == old:
+                continue
+            conflicts += 1
+        merged.append(task)
+    
+    next_id = max((t['id'] for t in merged), default=0) + 1
+    for task in clashes:
+        task['id'] = next_id
+        next_id += 1
+        merged.append(task)
+    return merged, conflicts
+
+class TaskStore:
+    """tasks.json (ou o snapshot binário tasks.snap) mais o diário de alterações, sem depender da interface.
+
+    As gravações são atômicas e levam checksum; cada uma deixa uma cópia compactada em
+    backups/, de onde a carga recupera as tarefas se o arquivo estiver corrompido.
+
+    No modo compartilhado (pasta sincronizada ou de rede usada por mais de um computador)
+    leituras e gravações acontecem sob a trava tasks.lock e, se o arquivo mudou desde a
+    última leitura, as alterações dos dois lados são juntadas antes de gravar.
+    """
+    def __init__(self, data_dir, binary=None, shared=False, backup_count=5):
+        self.path = Path(data_dir) / "tasks.json"
+        self.snapshot_path = Path(data_dir) / "tasks.snap"
+        self.lock_path = Path(data_dir) / "tasks.lock"
+        self.backups_dir = Path(data_dir) / "backups"
+        self.backup_count = backup_count
+        # Backup de onde a última carga recuperou as tarefas
+        self.recovered_from = None
+        # Erro da carga: enquanto houver, nada é gravado por cima do arquivo
+        self.load_error = None
+        self.journal = TaskJournal(Path(data_dir) / "tasks.journal")
+        # None: grava no formato do arquivo mais recente encontrado ao carregar
+        self.binary = binary
+        self.zone = None
+        self.shared = shared
+        self.base = {}              # id -> cópia da tarefa na última leitura/gravação
+        self.disk_signature = None  # (mtime, tamanho) dos arquivos nesse momento
+
+    def snapshot_is_current(self):
+        """O snapshot existe e não é mais antigo que o tasks.json"""
+        try:
+            snapshot_mtime = self.snapshot_path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        try:
+            return snapshot_mtime >= self.path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+
+    def read(self):
+        """(tarefas, versão do esquema, fuso em que as horas foram gravadas) do arquivo atual;
+        se ele estiver corrompido, do backup válido mais recente"""
+        source = self.snapshot_path if self.snapshot_is_current() else self.path
+        try:
+            return self.read_file(source)
+        except (ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+            return self.recover(source, e)
+
+    @staticmethod
+    def read_file(path, data=None):
+        """Lê e confere um tasks.json ou tasks.snap (ou o conteúdo data de um backup dele)"""
+        if ".snap" in path.suffixes:
+            with TaskSnapshot(path, data) as snapshot:
+                snapshot.verify()
+                return snapshot.tasks(), snapshot.schema, snapshot.zone or None
+        if data is None:
+            data = path.read_bytes()
+        return parse_tasks_json(data)
+
+    def backups(self):
+        """Backups compactados, do mais recente ao mais antigo"""
+        return sorted(self.backups_dir.glob("tasks-*.gz"), reverse=True)
+
+    def recover(self, source, error):
+        """Procura o backup válido mais recente (ou o arquivo do outro formato, mais antigo).
+        O arquivo corrompido é copiado à parte antes de ser regravado; sem nenhum válido o
+        erro sobe e o arquivo fica como está"""
+        logger.error("%s corrompido (%s); procurando um backup válido", source.name, error)
+        candidates = self.backups()[:max(self.backup_count, 1)]
+        other = self.path if source == self.snapshot_path else self.snapshot_path
+        if other.exists():
+            candidates.append(other)
+        
+        for candidate in candidates:
+            try:
+                if candidate.suffix == ".gz":
+                    with gzip.open(candidate, 'rb') as f:
+                        result = self.read_file(Path(candidate.stem), f.read())
+                else:
+                    result = self.read_file(candidate)
+            except (OSError, EOFError, ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+                logger.warning("Backup %s inválido: %s", candidate.name, e)
+                continue
+            
+            stamp = f"{datetime.now():%Y%m%d-%H%M%S}"
+            corrupt = source.with_name(f"{source.name}.corrupt-{stamp}")
+            for counter in itertools.count(2):
+                if not corrupt.exists():
+                    break
+                corrupt = source.with_name(f"{source.name}.corrupt-{stamp}-{counter}")
+            shutil.copy2(source, corrupt)
+            logger.warning("Tarefas recuperadas de %s; arquivo corrompido guardado em %s",
+                           candidate.name, corrupt.name)
+            self.recovered_from = candidate
+            return result
+        raise ValueError(f"{source.name} corrompido e nenhum backup válido encontrado: {error}") from error
+
+    def signature(self):
+        """(mtime, tamanho) dos arquivos de tarefas: detecta gravações de outro computador"""
+        stamps = []
+        for path in (self.path, self.snapshot_path):
+            try:
+                stat = path.stat()
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def changed_on_disk(self):
+        return self.signature() != self.disk_signature
+
+    def remember(self, tasks):
+        """Guarda a versão base do merge (cópia) e a assinatura do que está no disco"""
+        self.base = {t['id']: t for t in json.loads(json.dumps(tasks))}
+        self.disk_signature = self.signature()
+
+    def load(self, zone):
+        """Lê as tarefas, migra o esquema (uma vez), aplica o diário e ancora as horas no fuso zone.
+        Erros sobem e, a partir daí, save() recusa gravar por cima do arquivo"""
+        self.load_error = None
+        try:
+            if not self.shared:
+                return self._load(zone)
+            with FileLock(self.lock_path):
+                tasks = self._load(zone)
+                self.remember(tasks)
+            return tasks
+        except Exception as e:
+            self.load_error = e
+            raise
+
+    def _load(self, zone):
+        self.zone = zone
+        self.recovered_from = None
+        if self.binary is None:
+            self.binary = self.snapshot_is_current()
+        if self.path.exists() or self.snapshot_path.exists():
+            tasks, schema, saved_zone = self.read()
+        else:
+            # Primeira execução, ou só o diário (importação interrompida antes do primeiro salvamento)
+            tasks, schema, saved_zone = [], SCHEMA_VERSION, zone
+        if schema > SCHEMA_VERSION:
+            raise ValueError(f"Arquivo de tarefas do esquema {schema}, mais novo que este aplicativo")
+        
+        migrated = schema < SCHEMA_VERSION
+        if migrated:
+            self.backup_before_migration(schema)
+            migrate_tasks(tasks, schema, zone)
+            saved_zone = zone
+        
+        applied = self.journal.replay(tasks)
+        if applied:
+            logger.info("%d alteração(ões) do diário aplicada(s)", applied)
+        
+        # Só quando o fuso mudou com o app fechado as horas locais precisam ser refeitas
+        if saved_zone is None or saved_zone != (zone or None) or applied:
+            for task in tasks:
+                anchor_task(task, zone)
+        
+        if migrated or self.recovered_from:
+            # Regrava já no esquema atual (as próximas cargas não migram nada)
+            # ou por cima do arquivo corrompido
+            self.write(tasks)
+        return tasks
+
+    def backup_before_migration(self, schema):
+        """Cópia do arquivo antigo, caso seja preciso voltar a uma versão anterior do app"""
+        source = self.snapshot_path if self.snapshot_is_current() else self.path
+        backup = source.with_name(f"{source.stem}.schema{schema}{source.suffix}.bak")
+        if not backup.exists():
+            shutil.copy2(source, backup)
+            logger.info("Cópia do arquivo antes da migração: %s", backup)
+
+    def save(self, tasks):
+        """Grava as tarefas; retorna a lista gravada, que no modo compartilhado pode ser
+        uma nova lista com as alterações de outro computador"""
+        if self.load_error is not None:
+            raise OSError(f"O arquivo de tarefas não pôde ser lido ({self.load_error}); "
+                          "nada foi gravado para não sobrescrevê-lo")
+        if self.shared:
+            return self.sync(tasks)
+        self.write(tasks)
+        return tasks
+
+    def sync(self, tasks, write=True, locked=False):
+        """Sob a trava: junta ao que outro computador gravou desde a última leitura e grava
+        se write ou se houver alteração local. Retorna a lista resultante.
+        locked: quem chama já segura a trava (a espera fica em outra thread)"""
+        if not locked:
+            with FileLock(self.lock_path):
+                return self.sync(tasks, write, locked=True)
+        
+        changed = self.changed_on_disk()
+        if not changed and not write:
+            return tasks
+        stamp_changes(tasks, self.base)
+        if changed:
+            theirs = self._load(self.zone)
+            merged, conflicts = merge_tasks(self.base, tasks, theirs)
+            logger.info("Arquivo de tarefas alterado por outro computador; %d conflito(s) resolvido(s)",
+                        conflicts)
+            write = write or merged != theirs
+            tasks = merged
+        if write:
+            self.write(tasks)
+        self.remember(tasks)
+        return tasks
+
+    def write(self, tasks):
+        if self.binary:
+            write_snapshot(self.snapshot_path, tasks, self.zone)
+            data = None
+        else:
+            data = tasks_json_bytes(tasks, self.zone)
+            atomic_write(self.path, data)
+        self.journal.clear()
+        self.backup(data)
+
+    def backup(self, data=None):
+        """Cópia compactada do que acabou de ser gravado (data, ou o snapshot), mantendo as
+        backup_count mais recentes: a recuperação perde no máximo o último salvamento"""
+        if not self.backup_count:
+            return
+        
+        source = self.path if data is not None else self.snapshot_path
+        target = self.backups_dir / f"tasks-{datetime.now():%Y%m%d-%H%M%S-%f}{source.suffix}.gz"
+        temp_path = target.with_name(target.name + ".tmp")
+        try:
+            self.backups_dir.mkdir(exist_ok=True)
+            # Compressão rápida: o backup é feito no meio de um salvamento
+            with gzip.open(temp_path, 'wb', compresslevel=1) as f:
+                if data is not None:
+                    f.write(data)
+                else:
+                    with open(source, 'rb') as src:
+                        shutil.copyfileobj(src, f, 1 << 20)
+            os.replace(temp_path, target)
+            for old in self.backups()[self.backup_count:]:
+                old.unlink(missing_ok=True)
+        except OSError:
+            logger.exception("Erro ao gravar o backup %s", target)
+
+    def delete(self):
+        for path in (self.path, self.snapshot_path, *self.backups()):
+            path.unlink(missing_ok=True)
+        self.journal.clear()
+        if self.shared:
+            self.remember([])
+
+def archive_month(task):
+    """Mês (AAAA-MM) do segmento do arquivo: o da conclusão"""
+    return (task.get('completed_at') or task['datetime'])[:7]
+
+class TaskArchive:
+    """Tarefas concluídas antigas em segmentos mensais gzip (um JSON por linha), com um índice pequeno.
+
+    Incluir só anexa um membro gzip ao segmento do mês; o índice guarda contagens e o
+    período de cada segmento, para a busca pular os meses fora do intervalo.
+    """
+    INDEX_NAME = "index.json"
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.index_path = self.directory / self.INDEX_NAME
+        self.lock = threading.Lock()
+        self.index = self.load_index()
+
+    def segment_path(self, month):
+        return self.directory / f"{month}.jsonl.gz"
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"max_id": 0, "segments": {}}
+        except (OSError, ValueError):
+            logger.exception("Índice do arquivo inválido; reconstruindo a partir dos segmentos")
+            return self.rebuild_index()
+
+    def rebuild_index(self):
+        index = {"max_id": 0, "segments": {}}
+        for path in sorted(self.directory.glob("*.jsonl.gz")):
+            month = path.name[:7]
+            for task in self.iter_segment(month):
+                self._count(index, month, task)
+        self.index = index
+        self.save_index()
+        return index
+
+    @staticmethod
+    def _count(index, month, task):
+        completed = task.get('completed_at') or task['datetime']
+        segment = index["segments"].setdefault(month, {"count": 0, "first": completed, "last": completed})
+        segment["count"] += 1
+        segment["first"] = min(segment["first"], completed)
+        segment["last"] = max(segment["last"], completed)
+        index["max_id"] = max(index["max_id"], task['id'])
+
+    def save_index(self):
+        temp_path = self.index_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    @property
+    def count(self):
+        return sum(segment["count"] for segment in self.index["segments"].values())
+
+    @property
+    def max_id(self):
+        return self.index["max_id"]
+
+    def add(self, tasks):
+        """Anexa as tarefas aos segmentos dos meses de conclusão"""
+        by_month = {}
+        for task in tasks:
+            by_month.setdefault(archive_month(task), []).append(task)
+        
+        with self.lock:
+            self.directory.mkdir(exist_ok=True)
+            for month, month_tasks in sorted(by_month.items()):
+                # 'at' acrescenta um novo membro gzip sem reescrever o que já existe
+                with gzip.open(self.segment_path(month), 'at', encoding='utf-8') as f:
+                    for task in month_tasks:
+                        f.write(json.dumps(task, ensure_ascii=False) + "\n")
+                        self._count(self.index, month, task)
+            self.save_index()
+
+    def iter_segment(self, month):
+        try:
+            with gzip.open(self.segment_path(month), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+        except (OSError, EOFError, ValueError):
+            # Segmento truncado (queda durante a gravação): fica o que foi lido
+            logger.warning("Segmento do arquivo %s incompleto", month, exc_info=True)
+
+    def search(self, text="", since=None, until=None, limit=500):
+        """Tarefas arquivadas com o texto (ou @etiqueta), da conclusão mais recente para a mais antiga.
+
+        since/until ('AAAA-MM-DD ...') descartam meses inteiros pelo índice, sem abrir o segmento.
+        """
+        needle = text.strip().lower()
+        tag = needle.lstrip("@#")
+        results = []
+        for month in sorted(self.index["segments"], reverse=True):
+            segment = self.index["segments"][month]
+            if (since and segment["last"] < since) or (until and segment["first"] > until):
+                continue
+            matches = []
+            for task in self.iter_segment(month):
+                completed = task.get('completed_at') or task['datetime']
+                if (since and completed < since) or (until and completed > until):
+                    continue
+                if needle and needle not in task['task'].lower() and tag not in task.get('tags', []):
+                    continue
+                matches.append(task)
+            matches.sort(key=lambda t: t.get('completed_at') or t['datetime'], reverse=True)
+            results.extend(matches[:limit - len(results)])
+            if len(results) >= limit:
+                break
+        return results
+
+    def remove(self, tasks):
+        """Tira tarefas do arquivo (para restaurá-las ou desfazer o arquivamento);
+        reescreve só os segmentos delas"""
+        keys = {}
+        for task in tasks:
+            keys.setdefault(archive_month(task), set()).add((task['id'], task.get('completed_at'), task['task']))
+        with self.lock:
+            for month, month_keys in keys.items():
+                kept = [t for t in self.iter_segment(month)
+                        if (t['id'], t.get('completed_at'), t['task']) not in month_keys]
+                path = self.segment_path(month)
+                if kept:
+                    temp_path = path.with_suffix(".tmp")
+                    with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+                        for item in kept:
+                            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    os.replace(temp_path, path)
+                else:
+                    path.unlink(missing_ok=True)
+                
+                self.index["segments"].pop(month, None)
+                for item in kept:
+                    self._count(self.index, month, item)
+            self.save_index()
+
+class DueIndex:
+    """Índice das tarefas em aberto ordenado por data/hora"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []   # Lista ordenada de (datetime, id)
+        self.keys = {}      # id -> entrada em self.entries
+        self.tasks = {}     # id -> tarefa
+
+    @staticmethod
+    def is_open(task):
+        return task.get('status') != 'Concluída'
+
+    def rebuild(self, tasks):
+        """Recria o índice a partir da lista completa de tarefas"""
+        with self.lock:
+            open_tasks = [t for t in tasks if self.is_open(t)]
+            self.keys = {t['id']: (effective_due(t), t['id']) for t in open_tasks}
+            self.tasks = {t['id']: t for t in open_tasks}
+            self.entries = sorted(self.keys.values())
+
+    def update(self, task):
+        """Reposiciona uma tarefa após inclusão ou alteração"""
+        with self.lock:
+            self._remove(task['id'])
+            if self.is_open(task):
+                key = (effective_due(task), task['id'])
+                bisect.insort(self.entries, key)
+                self.keys[task['id']] = key
+                self.tasks[task['id']] = task
+
+    def discard(self, task_id):
+        """Remove uma tarefa do índice (excluída ou concluída)"""
+        with self.lock:
+            self._remove(task_id)
+
+    def _remove(self, task_id):
+        key = self.keys.pop(task_id, None)
+        if key is None:
+            return
+        self.tasks.pop(task_id, None)
+        position = bisect.bisect_left(self.entries, key)
+        if position < len(self.entries) and self.entries[position] == key:
+            del self.entries[position]
+
+    def add_many(self, tasks):
+        """Inclui várias tarefas novas de uma vez; o sort do Python intercala as duas
+        sequências já ordenadas em tempo linear"""
+        with self.lock:
+            keys = []
+            for task in tasks:
+                if self.is_open(task):
+                    key = (effective_due(task), task['id'])
+                    keys.append(key)
+                    self.keys[task['id']] = key
+                    self.tasks[task['id']] = task
+            keys.sort()
+            self.entries.extend(keys)
+            self.entries.sort()
+
+    def first(self, count):
+        """Retorna as próximas tarefas por data/hora"""
+        with self.lock:
+            return [self.tasks[task_id] for _, task_id in self.entries[:count]]
+
+    def __len__(self):
+        return len(self.entries)
+
+DEFAULT_LIST = "Geral"
+
+def parse_tags(text):
+    """Converte '@trabalho, casa' em ['casa', 'trabalho']"""
+    tags = {part.strip().lstrip("@#").lower() for part in text.replace(",", " ").split()}
+    tags.discard("")
+    return sorted(tags)
+
+def format_tags(tags):
+    return " ".join(f"@{tag}" for tag in tags)
+
+class TagIndex:
+    """Tarefas por etiqueta e por lista, mantidas a cada alteração.
+
+    Chaves são ('tag', nome) ou ('list', nome); consultas e contagens custam
+    o tamanho da etiqueta, não o total de tarefas.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.members = {}   # chave -> {id: tarefa}
+        self.keys = {}      # id -> chaves da tarefa
+
+    @staticmethod
+    def task_keys(task):
+        keys = {('tag', tag) for tag in task.get('tags', ())}
+        keys.add(('list', task.get('list') or DEFAULT_LIST))
+        return frozenset(keys)
+
+    def rebuild(self, tasks):
+        """Recria os índices a partir da lista completa de tarefas"""
+        with self.lock:
+            self.members = {}
+            self.keys = {}
+            for task in tasks:
+                self._add(task, self.task_keys(task))
+
+    def update(self, task):
+        """Ajusta só as etiquetas/listas que mudaram"""
+        keys = self.task_keys(task)
+        with self.lock:
+            for key in self.keys.get(task['id'], frozenset()) - keys:
+                self._remove_member(key, task['id'])
+            self._add(task, keys)
+
+    def discard(self, task_id):
+        with self.lock:
+            for key in self.keys.pop(task_id, ()):
+                self._remove_member(key, task_id)
+
+    def tasks(self, key):
+        with self.lock:
+            return list(self.members.get(key, {}).values())
+
+    def counts(self, kind):
+        """Quantidade de tarefas por nome, para um tipo de chave ('tag' ou 'list')"""
+        with self.lock:
+            return {key[1]: len(ids) for key, ids in self.members.items() if key[0] == kind}
+
+    def _add(self, task, keys):
+        self.keys[task['id']] = keys
+        for key in keys:
+            self.members.setdefault(key, {})[task['id']] = task
+
+    def _remove_member(self, key, task_id):
+        members = self.members.get(key)
+        if members is not None:
+            members.pop(task_id, None)
+            if not members:
+                del self.members[key]
+
+class ReminderScheduler:
+    """Agendador central: uma única thread e um heap de disparos por horário"""
+    # Espera máxima entre verificações, para acompanhar ajustes do relógio e suspensão
+    MAX_WAIT = 30
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.heap = []          # (horário, sequência, chave)
+        self.entries = {}       # chave -> (horário, sequência, callback)
+        self.task_keys = {}     # id da tarefa -> chaves armadas
+        self.sequence = itertools.count()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name="ReminderScheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def arm(self, key, when, callback):
+        """Agenda (ou reagenda) o disparo identificado por key; key[0] é o id da tarefa"""
+        timestamp = when.timestamp() if isinstance(when, datetime) else float(when)
+        with self.condition:
+            sequence = next(self.sequence)
+            self.entries[key] = (timestamp, sequence, callback)
+            self.task_keys.setdefault(key[0], set()).add(key)
+            heapq.heappush(self.heap, (timestamp, sequence, key))
+            # Só acorda a thread se o novo disparo é o próximo
+            if self.heap[0][1] == sequence:
+                self.condition.notify()
+
+    def cancel(self, key):
+        """Cancela um disparo; a entrada no heap é descartada quando chegar ao topo"""
+        with self.condition:
+            self._forget(key)
+
+    def cancel_task(self, task_id):
+        """Cancela todos os disparos de uma tarefa"""
+        with self.condition:
+            for key in list(self.task_keys.get(task_id, ())):
+                self._forget(key)
+
+    def clear(self):
+        with self.condition:
+            self.heap.clear()
+            self.entries.clear()
+            self.task_keys.clear()
+            self.condition.notify()
+
+    def pending(self, key):
+        """Retorna o horário (timestamp) de um disparo armado ou None"""
+        with self.condition:
+            entry = self.entries.get(key)
+            return entry[0] if entry else None
+
+    def __len__(self):
+        with self.condition:
+            return len(self.entries)
+
+    def _forget(self, key):
+        if self.entries.pop(key, None) is None:
+            return
+        keys = self.task_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.task_keys[key[0]]
+
+    def _run(self):
+        while True:
+            with self.condition:
+                callback = None
+                while self.running and callback is None:
+                    if not self.heap:
+                        self.condition.wait(self.MAX_WAIT)
+                        continue
+                    
+                    timestamp, sequence, key = self.heap[0]
+                    entry = self.entries.get(key)
+                    if entry is None or entry[1] != sequence:
+                        # Entrada cancelada ou substituída
+                        heapq.heappop(self.heap)
+                        continue
+                    
+                    delay = timestamp - time.time()
+                    if delay > 0:
+                        self.condition.wait(min(delay, self.MAX_WAIT))
+                        continue
+                    
+                    heapq.heappop(self.heap)
+                    self._forget(key)
+                    callback = entry[2]
+                
+                if not self.running:
+                    return
+            
+            try:
+                callback()
+            except Exception:
+                logger.exception("Erro em disparo agendado", extra={"key": key})
+
+def parse_quiet_windows(text):
+    """Converte '22:00-07:00, 12:00-13:00' em [(início, fim)] em minutos do dia"""
+    windows = []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, end = (datetime.strptime(p.strip(), "%H:%M") for p in part.split("-"))
+        except ValueError:
+            raise ValueError(f"Horário inválido: {part}")
+        start = start.hour * 60 + start.minute
+        end = end.hour * 60 + end.minute
+        if start == end:
+            raise ValueError(f"Intervalo vazio: {part}")
+        windows.append((start, end))
+    return sorted(windows)
+
+def format_quiet_windows(windows):
+    return ", ".join(f"{s // 60:02d}:{s % 60:02d}-{e // 60:02d}:{e % 60:02d}" for s, e in windows)
+
+class QuietHours:
+    """Horários silenciosos por dia da semana; os limites são calculados uma vez por dia"""
+
+    def __init__(self, days=None):
+        # Uma lista de intervalos (minutos do dia) por dia da semana, segunda = 0
+        self.days = list(days or [[] for _ in range(7)])
+        self.cache = (None, [])
+
+    @classmethod
+    def from_config(cls, texts):
+        days = []
+        for weekday in range(7):
+            text = texts[weekday] if texts and weekday < len(texts) else ""
+            try:
+                days.append(parse_quiet_windows(text or ""))
+            except ValueError:
+                logger.warning("Horário silencioso inválido ignorado: %s", text)
+                days.append([])
+        return cls(days)
+
+    def windows_for(self, day):
+        """Intervalos (início, fim) que tocam o dia, incluindo os que vêm da véspera"""
+        cached_day, windows = self.cache
+        if cached_day == day:
+            return windows
+        
+        midnight = datetime.combine(day, datetime.min.time())
+        windows = []
+        for offset in (-1, 0):
+            base = midnight + timedelta(days=offset)
+            for start, end in self.days[base.weekday()]:
+                # Intervalo que atravessa a meia-noite termina no dia seguinte
+                finish = base + timedelta(minutes=end if end > start else end + 1440)
+                if finish > midnight:
+                    windows.append((base + timedelta(minutes=start), finish))
+        windows.sort()
+        
+        merged = []
+        for begin, finish in windows:
+            if merged and begin <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], finish))
+            else:
+                merged.append((begin, finish))
+        
+        self.cache = (day, merged)
+        logger.debug("Horários silenciosos de %s: %d intervalo(s)", day, len(merged))
+        return merged
+
+    def quiet_until(self, now):
+        """Fim do horário silencioso em andamento ou None"""
+        for begin, finish in self.windows_for(now.date()):
+            if begin <= now < finish:
+                return finish
+        return None
+
+class NotificationDispatcher:
+    """Fila de notificações por prioridade, com limite de exibições por minuto.
+
+    Notificações que vencem juntas são ordenadas por prioridade; as de prioridade
+    alta sempre aparecem, as demais esperam vaga e as de baixa viram um resumo.
+    Durante o horário silencioso tudo fica retido e sai num resumo ao final.
+    """
+    # Espera para juntar notificações que vencem no mesmo instante
+    COALESCE_DELAY = 0.5
+    WINDOW = 60
+    FLUSH_KEY = ('dispatcher', 'flush')
+    QUIET_KEY = ('dispatcher', 'quiet')
+
+    def __init__(self, scheduler, show_batch, limit=3, quiet_hours=None):
+        self.scheduler = scheduler
+        self.show_batch = show_batch
+        self.limit = limit
+        self.quiet_hours = quiet_hours or QuietHours()
+        self.lock = threading.Lock()
+        self.queue = []             # (prioridade, sequência, resumo, exibir)
+        self.deferred = {}          # chave -> (prioridade, resumo, exibir), em ordem de chegada
+        self.sequence = itertools.count()
+        self.shown = deque()        # horários das últimas exibições
+
+    def submit(self, priority, summary, show, key=None):
+        """Enfileira uma notificação; show() a exibe, summary entra no resumo.
+
+        Com key, uma notificação retida no horário silencioso substitui a anterior
+        de mesma chave (ex.: avisos repetidos da mesma tarefa).
+        """
+        quiet_until = self.quiet_hours.quiet_until(datetime.now())
+        with self.lock:
+            if quiet_until is None:
+                heapq.heappush(self.queue, (priority, next(self.sequence), summary, show))
+            else:
+                if key is None:
+                    key = ('notification', next(self.sequence))
+                self.deferred.pop(key, None)
+                self.deferred[key] = (priority, summary, show)
+        
+        if quiet_until is not None:
+            logger.debug("Notificação retida até %s", quiet_until.strftime("%H:%M"))
+            if self.scheduler.pending(self.QUIET_KEY) is None:
+                self.scheduler.arm(self.QUIET_KEY, quiet_until, self.release_deferred)
+        elif self.scheduler.pending(self.FLUSH_KEY) is None:
+            self.scheduler.arm(self.FLUSH_KEY, time.time() + self.COALESCE_DELAY, self.flush)
+
+    def set_quiet_hours(self, quiet_hours):
+        """Troca as regras; o que estava retido é reavaliado imediatamente"""
+        self.quiet_hours = quiet_hours
+        if self.deferred:
+            self.scheduler.arm(self.QUIET_KEY, time.time(), self.release_deferred)
+
+    def rearm(self):
+        """Volta a agendar a fila pendente (após o agendador ser limpo)"""
+        with self.lock:
+            waiting = bool(self.queue)
+            deferred = bool(self.deferred)
+        if waiting and self.scheduler.pending(self.FLUSH_KEY) is None:
+            self.scheduler.arm(self.FLUSH_KEY, time.time(), self.flush)
+        if deferred and self.scheduler.pending(self.QUIET_KEY) is None:
+            self.scheduler.arm(self.QUIET_KEY, time.time(), self.release_deferred)
+
+    def release_deferred(self):
+        """Fim do horário silencioso: entrega o que ficou retido em um único resumo"""
+        quiet_until = self.quiet_hours.quiet_until(datetime.now())
+        if quiet_until is not None:
+            # Outro intervalo emendou neste
+            self.scheduler.arm(self.QUIET_KEY, quiet_until, self.release_deferred)
+            return
+        
+        with self.lock:
+            items = sorted(self.deferred.values(), key=lambda item: item[0])
+            self.deferred.clear()
+            if items:
+                self.shown.append(time.time())
+        
+        if not items:
+            return
+        logger.info("Fim do horário silencioso: %d notificação(ões) retida(s)", len(items))
+        try:
+            if len(items) == 1:
+                items[0][2]()
+            else:
+                self.show_batch([item[1] for item in items], "notificações do horário silencioso")
+        except Exception:
+            logger.exception("Erro ao exibir notificações retidas")
+
+    def __len__(self):
+        with self.lock:
+            return len(self.queue) + len(self.deferred)
+
+    def flush(self):
+        """Exibe o que cabe no limite atual e agenda o restante"""
+        now = time.time()
+        single, batch = [], []
+        with self.lock:
+            while self.shown and self.shown[0] <= now - self.WINDOW:
+                self.shown.popleft()
+            
+            while self.queue:
+                priority = self.queue[0][0]
+                if priority == PRIORITY_HIGH:
+                    # Prioridade alta nunca espera
+                    single.append(heapq.heappop(self.queue)[3])
+                    self.shown.append(now)
+                    continue
+                if len(self.shown) >= self.limit:
+                    break
+                if priority == PRIORITY_LOW and len(self.queue) > 1:
+                    # Só restam tarefas de baixa prioridade: um único resumo
+                    batch = [heapq.heappop(self.queue)[2] for _ in range(len(self.queue))]
+                    self.shown.append(now)
+                    break
+                single.append(heapq.heappop(self.queue)[3])
+                self.shown.append(now)
+            
+            next_flush = self.shown[0] + self.WINDOW if self.queue else None
+        
+        for show in single:
+            try:
+                show()
+            except Exception:
+                logger.exception("Erro ao exibir notificação")
+        if batch:
+            try:
+                self.show_batch(batch, "tarefas de baixa prioridade")
+            except Exception:
+                logger.exception("Erro ao exibir resumo de notificações")
+        
+        if next_flush is not None:
+            logger.debug("%d notificações aguardando o limite por minuto", len(self))
+            self.scheduler.arm(self.FLUSH_KEY, next_flush, self.flush)
 
-try:
-    import schedule
-    SCHEDULE_AVAILABLE = True
-except ImportError:
-    SCHEDULE_AVAILABLE = False
+# Campos booleanos antigos de lembrete e o respectivo intervalo em minutos
+LEGACY_REMINDER_FIELDS = {
+    "reminder_5min": 5,
+    "reminder_10min": 10,
+    "reminder_30min": 30,
+    "reminder_1h": 60,
+}
+REMINDER_UNITS = {"m": 1, "min": 1, "h": 60, "d": 1440}
 
-try:
-    from PIL import Image, ImageDraw
-    PILLOW_AVAILABLE = True
-except ImportError:
-    PILLOW_AVAILABLE = False
+def parse_reminder_offsets(text):
+    """Converte "5m, 15min, 1h, 1d" em uma lista ordenada de minutos; levanta ValueError"""
+    offsets = set()
+    for token in text.replace(";", ",").split(","):
+        token = token.strip().lower().replace(" ", "")
+        if not token:
+            continue
+        number = token.rstrip("abcdefghijklmnopqrstuvwxyz")
+        unit = token[len(number):] or "min"
+        if not number.isdigit() or unit not in REMINDER_UNITS:
+            raise ValueError(f"Lembrete inválido: '{token}'")
+        minutes = int(number) * REMINDER_UNITS[unit]
+        if minutes <= 0:
+            raise ValueError(f"Lembrete deve ser maior que zero: '{token}'")
+        offsets.add(minutes)
+    return sorted(offsets)
 
-try:
-    import pystray
-    from pystray import MenuItem as item
-    PYSTRAY_AVAILABLE = True
-except ImportError:
-    PYSTRAY_AVAILABLE = False
+def format_reminder_offset(minutes):
+    """Forma curta de um intervalo em minutos (ex.: 90min, 2h, 1d)"""
+    if minutes % 1440 == 0:
+        return f"{minutes // 1440}d"
+    if minutes % 60 == 0:
+        return f"{minutes // 60}h"
+    return f"{minutes}min"
 
-try:
-    import winshell
-    from win32com.client import Dispatch
-    WINSHELL_AVAILABLE = True
-except ImportError:
-    WINSHELL_AVAILABLE = False
+def format_reminder_offsets(offsets):
+    return ", ".join(format_reminder_offset(minutes) for minutes in offsets)
+
+def describe_reminder_offset(minutes):
+    """Forma por extenso de um intervalo em minutos para as notificações"""
+    for size, singular, plural in ((1440, "dia", "dias"), (60, "hora", "horas")):
+        if minutes % size == 0:
+            amount = minutes // size
+            return f"{amount} {singular if amount == 1 else plural}"
+    return f"{minutes} minuto{'' if minutes == 1 else 's'}"
+
+def migrate_legacy_reminders(task):
+    """Troca os campos reminder_5min/10min/30min/1h pela lista de intervalos"""
+    offsets = set(task.get('reminders') or ())
+    for field, minutes in LEGACY_REMINDER_FIELDS.items():
+        if task.pop(field, False):
+            offsets.add(minutes)
+    task['reminders'] = sorted(offsets)
+
+RECURRENCE_LABELS = {
+    "": "Não repetir",
+    "daily": "Diária",
+    "weekly": "Semanal",
+    "monthly": "Mensal",
+    "hourly": "A cada N horas",
+}
+WEEKDAY_LABELS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+def iter_occurrences(rule, start, index=1):
+    """Gera (número, data/hora) das ocorrências de uma regra a partir de start, sob demanda"""
+    freq = rule.get("freq")
+    interval = max(int(rule.get("interval") or 1), 1)
+    count = rule.get("count")
+    until = rule.get("until")
+    if until:
+        until = datetime.strptime(until, "%Y-%m-%d %H:%M:%S")
+    
+    def candidates():
+        if freq in ("hourly", "daily"):
+            step = timedelta(hours=interval) if freq == "hourly" else timedelta(days=interval)
+            current = start
+            while True:
+                yield current
+                current += step
+        elif freq == "weekly":
+            # A própria data da tarefa é sempre a primeira ocorrência
+            yield start
+            weekdays = sorted(set(rule.get("weekdays") or [start.weekday()]))
+            week_start = start - timedelta(days=start.weekday())
+            while True:
+                for weekday in weekdays:
+                    current = week_start + timedelta(days=weekday)
+                    if current > start:
+                        yield current
+                week_start += timedelta(weeks=interval)
+        elif freq == "monthly":
+            day = rule.get("monthday") or start.day
+            year, month = start.year, start.month
+            while True:
+                current = start.replace(year=year, month=month,
+                                        day=min(day, calendar.monthrange(year, month)[1]))
+                if current >= start:
+                    yield current
+                month += interval
+                year += (month - 1) // 12
+                month = (month - 1) % 12 + 1
+        else:
+            yield start
+    
+    for current in candidates():
+        if count and index > count:
+            return
+        if until and current > until:
+            return
+        yield index, current
+        index += 1
+
+def next_occurrence(rule, start, index, after):
+    """Próxima ocorrência depois de after, ou None se a regra terminou"""
+    freq = rule.get("freq")
+    if freq in ("hourly", "daily") and after > start:
+        # Intervalo fixo: pula direto para perto de after sem percorrer as ocorrências
+        interval = max(int(rule.get("interval") or 1), 1)
+        step = timedelta(hours=interval) if freq == "hourly" else timedelta(days=interval)
+        skipped = int((after - start) / step)
+        start += skipped * step
+        index += skipped
+    
+    for occurrence_index, occurrence in iter_occurrences(rule, start, index):
+        if occurrence > after:
+            return occurrence_index, occurrence
+    return None
+
+def parse_recurrence(rule):
+    """Valida uma regra de repetição vinda de fora (API, importação); retorna uma cópia
+    normalizada ou levanta ValueError, antes que ela chegue ao agendador"""
+    if not isinstance(rule, dict) or not rule.get("freq") or rule["freq"] not in RECURRENCE_LABELS:
+        raise ValueError(f"Repetição inválida: {rule!r}")
+    
+    def positive(key, high=None):
+        value = rule.get(key)
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1 or (high and value > high):
+            raise ValueError(f"Repetição: '{key}' deve ser um inteiro positivo, não {value!r}")
+        return value
+    
+    freq = rule["freq"]
+    parsed = {"freq": freq, "interval": positive("interval") or 1}
+    count = positive("count")
+    if count:
+        parsed["count"] = count
+    if rule.get("until"):
+        parsed["until"] = parse_user_datetime(str(rule["until"])).strftime("%Y-%m-%d %H:%M:%S")
+    if freq == "weekly" and rule.get("weekdays") is not None:
+        weekdays = rule["weekdays"]
+        if not isinstance(weekdays, list) or not all(type(d) is int and 0 <= d <= 6 for d in weekdays):
+            raise ValueError(f"Repetição: dias da semana inválidos: {weekdays!r}")
+        parsed["weekdays"] = sorted(set(weekdays))
+    if freq == "monthly" and rule.get("monthday") is not None:
+        parsed["monthday"] = positive("monthday", 31)
+    return parsed
+
+def describe_recurrence(rule):
+    """Texto curto da regra para exibição na tabela"""
+    if not rule or not rule.get("freq"):
+        return ""
+    interval = max(int(rule.get("interval") or 1), 1)
+    freq = rule["freq"]
+    if freq == "hourly":
+        text = f"a cada {interval}h"
+    elif freq == "weekly" and rule.get("weekdays"):
+        text = "/".join(WEEKDAY_LABELS[d] for d in sorted(rule["weekdays"]))
+        if interval > 1:
+            text += f" a cada {interval} sem."
+    else:
+        text = RECURRENCE_LABELS[freq]
+        if interval > 1:
+            text += f" (x{interval})"
+    return f"🔁 {text}"
+
+def _is_bool(value):
+    return isinstance(value, bool)
+
+def _int_between(low, high):
+    return lambda value: isinstance(value, int) and not isinstance(value, bool) and low <= value <= high
+
+def _valid_escalation(value):
+    return isinstance(value, list) and bool(value) and all(_int_between(1, 10080)(m) for m in value)
+
+def _valid_quiet_hours(value):
+    if not isinstance(value, list) or len(value) != 7:
+        return False
+    try:
+        return all(isinstance(text, str) and parse_quiet_windows(text) is not None for text in value)
+    except ValueError:
+        return False
+
+# Configurações conhecidas: chave -> (padrão, validação)
+STORAGE_FORMATS = {"json": "JSON (tasks.json)", "binary": "Binário (carrega mais rápido)"}
+
+CONFIG_SCHEMA = {
+    "start_with_windows": (True, _is_bool),
+    "minimize_to_tray": (True, _is_bool),
+    "show_tray_icon": (True, _is_bool),
+    "notification_sound": (True, _is_bool),
+    "notification_duration": (15, _int_between(5, 60)),
+    "check_interval": (60, _int_between(1, 1440)),
+    "theme": ("light", lambda value: value in ("light", "dark")),
+    "show_notification_on_minimize": (True, _is_bool),
+    "profile_duration": (30, _int_between(5, 600)),
+    "log_level": ("INFO", lambda value: value in LOG_LEVELS),
+    "tray_upcoming_count": (5, _int_between(0, 20)),
+    "escalation_intervals": (DEFAULT_ESCALATION_INTERVALS, _valid_escalation),
+    "max_notifications_per_minute": (3, _int_between(1, 60)),
+    "quiet_hours": ([""] * 7, _valid_quiet_hours),
+    "undo_history_limit": (50, _int_between(1, 500)),
+    "archive_after_days": (90, _int_between(0, 3650)),
+    "storage_format": ("json", lambda value: value in STORAGE_FORMATS),
+    "shared_file": (False, _is_bool),
+    "backup_count": (5, _int_between(0, 50)),
+    "api_enabled": (False, _is_bool),
+    "api_port": (8765, _int_between(1024, 65535)),
+    "api_token": ("", lambda value: isinstance(value, str)),
+}
+
+class ConfigService:
+    """Configurações validadas pelo esquema, com assinantes e recarga quando o arquivo muda"""
+    # Intervalo (ms) da verificação de mudanças no config.json
+    WATCH_INTERVAL = 2000
+
+    def __init__(self, path, schema=CONFIG_SCHEMA):
+        self.path = Path(path)
+        self.schema = schema
+        self.values = self.defaults()
+        self.subscribers = []   # (chaves ou None para todas, callback)
+        self.stamp = None       # (mtime, tamanho) da última leitura/gravação
+
+    def defaults(self):
+        return {key: list(default) if isinstance(default, list) else default
+                for key, (default, _) in self.schema.items()}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def validate(self, values):
+        """Retorna só os valores válidos; chaves fora do esquema são mantidas como estão"""
+        valid, rejected = {}, []
+        for key, value in values.items():
+            rule = self.schema.get(key)
+            if rule is None or rule[1](value):
+                valid[key] = value
+            else:
+                rejected.append(key)
+        if rejected:
+            logger.warning("Configurações inválidas ignoradas: %s", ", ".join(rejected))
+        return valid
+
+    def subscribe(self, callback, keys=None):
+        """callback(chave, valor) é chamado quando uma das chaves muda (qualquer uma se keys=None)"""
+        self.subscribers.append((frozenset(keys) if keys else None, callback))
+
+    def update(self, values):
+        """Aplica os valores válidos e avisa os assinantes; retorna as chaves alteradas"""
+        changed = {key: value for key, value in self.validate(values).items()
+                   if self.values.get(key) != value}
+        self.values.update(changed)
+        
+        for key, value in changed.items():
+            for keys, callback in self.subscribers:
+                if keys is None or key in keys:
+                    try:
+                        callback(key, value)
+                    except Exception:
+                        logger.exception("Erro ao aplicar configuração %s", key)
+        return list(changed)
+
+    def reset(self):
+        return self.update(self.defaults())
+
+    def load(self):
+        """Lê o arquivo; retorna False se ele ainda não existe"""
+        stamp = self._stat()
+        if stamp is None:
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except (OSError, ValueError):
+            logger.exception("Erro ao carregar configurações de %s", self.path)
+            return True
+        self.values.update(self.validate(loaded))
+        self.stamp = stamp
+        return True
+
+    def save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.values, f, ensure_ascii=False, indent=2)
+        except OSError:
+            logger.exception("Erro ao salvar configurações")
+            return False
+        # A própria gravação não deve ser vista como alteração externa
+        self.stamp = self._stat()
+        return True
+
+    def reload_if_changed(self):
+        """Confere mtime/tamanho do arquivo e aplica edições externas; retorna as chaves alteradas"""
+        stamp = self._stat()
+        if stamp is None or stamp == self.stamp:
+            return []
+        self.stamp = stamp
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except (OSError, ValueError):
+            # Provavelmente ainda sendo gravado; a próxima mudança é relida
+            logger.warning("config.json alterado mas ilegível; mantendo as configurações atuais")
+            return []
+        
+        changed = self.update(loaded)
+        if changed:
+            logger.info("Configurações recarregadas do arquivo: %s", ", ".join(changed))
+        return changed
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+class StartupTimer:
+    """Mede a duração de cada fase da inicialização"""
+    def __init__(self, origin=STARTUP_TIME):
+        self.origin = origin
+        self.last = origin
+        self.phases = []
+
+    def mark(self, phase):
+        """Encerra a fase atual com o nome informado"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.origin
+
+    def report(self):
+        """Resumo das fases em uma linha"""
+        parts = [f"{phase} {elapsed * 1000:.0f} ms" for phase, elapsed in self.phases]
+        parts.append(f"total {self.total() * 1000:.0f} ms")
+        return " | ".join(parts)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(threadName)s] %(message)s"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_BUFFER_SIZE = 2000
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter que acrescenta os campos passados em extra= como chave=valor"""
+    RESERVED = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+    def format(self, record):
+        text = super().format(record)
+        fields = [
+            f"{key}={value!r}"
+            for key, value in record.__dict__.items()
+            if key not in self.RESERVED
+        ]
+        if fields:
+            text = f"{text} | {' '.join(fields)}"
+        return text
+
+class RingBufferHandler(logging.Handler):
+    """Mantém os últimos registros de log em memória para exibição na interface"""
+    def __init__(self, capacity=LOG_BUFFER_SIZE):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        # A mensagem só é formatada quando o buffer é exibido; o traceback é
+        # convertido em texto agora para não manter os frames vivos
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+    def get_lines(self):
+        """Retorna os registros do buffer já formatados"""
+        lines = []
+        for record in list(self.records):
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                lines.append(str(record.msg))
+        return lines
+
+    def clear(self):
+        self.records.clear()
 
-try:
-    from tkcalendar import Calendar, DateEntry
-    TKCALENDAR_AVAILABLE = True
-except ImportError:
-    TKCALENDAR_AVAILABLE = False
-    print("tkcalendar não está instalado. Use: pip install tkcalendar")
+def setup_logging(log_dir, level="INFO"):
+    """Configura o log com arquivo rotativo e buffer em memória"""
+    formatter = StructuredFormatter(LOG_FORMAT)
+    
+    ring_handler = RingBufferHandler()
+    ring_handler.setFormatter(formatter)
+    logger.addHandler(ring_handler)
+    
+    try:
+        Path(log_dir).mkdir(exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            Path(log_dir) / "task_reminder.log",
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8',
+            delay=True
+        )
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
+    except OSError:
+        logger.warning("Não foi possível criar o arquivo de log em %s", log_dir, exc_info=True)
+    
+    # Sem console (pythonw/.exe) sys.stderr é None
+    if sys.stderr is not None:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        logger.addHandler(stream_handler)
+    
+    logger.propagate = False
+    set_log_level(level)
+    return ring_handler
+
+def set_log_level(level):
+    """Altera o nível de log; níveis desconhecidos voltam para INFO"""
+    if level not in LOG_LEVELS:
+        level = "INFO"
+    logger.setLevel(getattr(logging, level))
+
+class PerformanceMonitor:
+    """Contadores de tempo por operação e coleta de perfis sob demanda"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.profiler = None
+        self.profile_path = None
+        self.tracemalloc_path = None
+
+    def record(self, name, elapsed):
+        """Acumula uma medição (segundos) para a operação"""
+        with self.lock:
+            counter = self.counters.get(name)
+            if counter is None:
+                self.counters[name] = [1, elapsed, elapsed]
+            else:
+                counter[0] += 1
+                counter[1] += elapsed
+                if elapsed > counter[2]:
+                    counter[2] = elapsed
+
+    def snapshot(self):
+        """Retorna uma cópia dos contadores: nome -> (chamadas, total, máximo)"""
+        with self.lock:
+            return {name: tuple(values) for name, values in self.counters.items()}
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+    def format_counters(self):
+        """Texto dos contadores para exibição na interface"""
+        counters = self.snapshot()
+        if not counters:
+            return "Nenhuma operação medida ainda."
+        lines = []
+        for name in sorted(counters):
+            count, total, maximum = counters[name]
+            lines.append(
+                f"{name}: {count}x | média {total / count * 1000:.1f} ms | "
+                f"máx {maximum * 1000:.1f} ms | total {total:.2f} s"
+            )
+        return "\n".join(lines)
+
+    @property
+    def profiling(self):
+        return self.profiler is not None
+
+    @property
+    def tracing_memory(self):
+        return self.tracemalloc_path is not None
+
+    def start_profile(self, output_path):
+        """Inicia o cProfile na thread atual (thread da interface)"""
+        if self.profiler is not None:
+            return False
+        self.profiler = cProfile.Profile()
+        self.profile_path = Path(output_path)
+        self.profiler.enable()
+        return True
+
+    def stop_profile(self):
+        """Para o cProfile e grava o .prof e um resumo em texto"""
+        if self.profiler is None:
+            return None
+        profiler, path = self.profiler, self.profile_path
+        self.profiler = None
+        self.profile_path = None
+        profiler.disable()
+        
+        profiler.dump_stats(str(path))
+        
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats('cumulative').print_stats(50)
+        path.with_suffix('.txt').write_text(report.getvalue(), encoding='utf-8')
+        return path
+
+    def start_tracemalloc(self, output_path):
+        """Inicia o rastreamento de alocações de memória"""
+        if self.tracemalloc_path is not None:
+            return False
+        self.tracemalloc_path = Path(output_path)
+        tracemalloc.start(10)
+        return True
+
+    def stop_tracemalloc(self):
+        """Tira o snapshot, grava as maiores alocações e para o rastreamento"""
+        if self.tracemalloc_path is None:
+            return None
+        path = self.tracemalloc_path
+        self.tracemalloc_path = None
+        
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        lines = [
+            f"Memória rastreada: atual {current / 1024:.1f} KiB, pico {peak / 1024:.1f} KiB",
+            "",
+            "Maiores alocações por linha:",
+        ]
+        for stat in snapshot.statistics('lineno')[:50]:
+            lines.append(str(stat))
+        path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+        snapshot.dump(str(path.with_suffix('.tracemalloc')))
+        return path
+
+def timed_operation(name):
+    """Decorador que mede o tempo de um método do app em self.perf"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self.perf.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
 
 class NotificationWindow:
     """Janela de notificação"""
-    def __init__(self, task_text, reminder_text=None):
+    def __init__(self, task_text, reminder_text=None, on_snooze=None, on_acknowledge=None,
+                 task_id=None, repeat=0):
+        self.on_snooze = on_snooze
+        self.on_acknowledge = on_acknowledge
+        self.task_id = task_id
+        
         self.window = tk.Tk()
         self.window.title("Task Reminder - Notificação")
-        self.window.geometry("400x200")
+        self.window.geometry("460x220" if on_snooze else "400x200")
         self.window.configure(bg='#2c3e50')
         
         # Tornar a janela sempre no topo
@@ -80,6 +2733,8 @@ class NotificationWindow:
         icon_label.pack(side=tk.LEFT)
         
         title_text = "Lembrete de Tarefa" if reminder_text else "Tarefa Agora!"
+        if repeat:
+            title_text = f"Tarefa Pendente! ({repeat}º aviso)"
         title_label = tk.Label(icon_frame, text=title_text, 
                              font=('Arial', 16, 'bold'), 
                              bg='#2c3e50', fg='white')
@@ -105,40 +2760,111 @@ class NotificationWindow:
                             font=('Arial', 12, 'bold'),
                             bg='#3498db', fg='white',
                             padx=30, pady=10,
-                            command=self.on_close,
+                            command=self.acknowledge,
                             cursor='hand2')
-        ok_button.pack()
+        ok_button.pack(side=tk.LEFT if on_snooze else tk.TOP)
         
         # Configurar estilo do botão
         ok_button.configure(activebackground='#2980b9', activeforeground='white')
         
+        # Botões de adiar
+        if on_snooze:
+            tk.Label(button_frame, text="Adiar:", font=('Arial', 10),
+                     bg='#2c3e50', fg='#ecf0f1').pack(side=tk.LEFT, padx=(15, 5))
+            for minutes, label in SNOOZE_OPTIONS:
+                tk.Button(button_frame, text=label, font=('Arial', 10),
+                          bg='#7f8c8d', fg='white', padx=6, pady=6,
+                          command=lambda m=minutes: self.snooze(m),
+                          cursor='hand2').pack(side=tk.LEFT, padx=2)
+            tk.Button(button_frame, text="...", font=('Arial', 10),
+                      bg='#7f8c8d', fg='white', padx=6, pady=6,
+                      command=self.snooze_custom,
+                      cursor='hand2').pack(side=tk.LEFT, padx=2)
+        
         # Focar no botão OK
         ok_button.focus_set()
-        self.window.bind('<Return>', lambda e: self.on_close())
+        self.window.bind('<Return>', lambda e: self.acknowledge())
         
     def on_close(self):
         self.window.destroy()
+
+    def acknowledge(self):
+        """OK: confirma que a notificação foi vista (fechar no X não confirma)"""
+        if self.on_acknowledge:
+            self.on_acknowledge()
+        self.on_close()
+
+    def request_attention(self):
+        """Traz a janela já aberta de volta para a frente"""
+        self.window.deiconify()
+        self.window.lift()
+        self.window.attributes('-topmost', True)
+        self.window.bell()
+
+    def snooze(self, minutes):
+        """Adia a tarefa e fecha a janela"""
+        self.on_snooze(minutes)
+        self.on_close()
+
+    def snooze_custom(self):
+        """Pergunta por quantos minutos adiar"""
+        minutes = simpledialog.askinteger(
+            "Adiar",
+            "Adiar por quantos minutos?",
+            parent=self.window,
+            minvalue=1,
+            maxvalue=7 * 1440
+        )
+        if minutes:
+            self.snooze(minutes)
         
     def show(self):
         self.window.mainloop()
 
+# Bit do Shift em event.state (Tk)
+SHIFT_MASK = 0x0001
+
+# Configuração -> variável da aba de configurações
+SETTINGS_VARS = {
+    "start_with_windows": "start_with_windows_var",
+    "minimize_to_tray": "minimize_to_tray_var",
+    "show_tray_icon": "show_tray_icon_var",
+    "show_notification_on_minimize": "show_notification_var",
+    "notification_sound": "notification_sound_var",
+    "notification_duration": "notification_duration_var",
+    "check_interval": "check_interval_var",
+    "theme": "theme_var",
+    "profile_duration": "profile_duration_var",
+    "log_level": "log_level_var",
+    "max_notifications_per_minute": "max_notifications_var",
+    "undo_history_limit": "undo_history_var",
+    "archive_after_days": "archive_after_days_var",
+    "shared_file": "shared_file_var",
+    "backup_count": "backup_count_var",
+    "api_enabled": "api_enabled_var",
+    "api_port": "api_port_var",
+    "api_token": "api_token_var",
+}
+
 class TaskReminderApp:
-    def __init__(self, root):
+    def __init__(self, root, start_minimized=False):
         self.root = root
         self.root.title("Task Reminder")
         self.root.geometry("900x750")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.start_minimized = start_minimized
+        self.startup = StartupTimer()
+        self.startup.mark("imports")
+        
+        # Iniciado com o sistema: nada é desenhado até o usuário abrir a janela
+        if start_minimized:
+            self.root.withdraw()
         
         # Ocultar console
         self.hide_console()
         
         # Configurar caminhos dos arquivos
-        if getattr(sys, 'frozen', False):
-            # Executando como .exe
-            self.exe_dir = Path(sys.executable).parent.absolute()
-        else:
-            # Executando como script Python
-            self.exe_dir = Path(__file__).parent.absolute()
+        self.exe_dir = app_data_dir()
 
         # Criar pasta images se não existir
         self.images_path = self.exe_dir / "images"
@@ -146,22 +2872,59 @@ class TaskReminderApp:
 
         # Caminhos dos arquivos
         self.tasks_file = self.exe_dir / "tasks.json"
+        self.archive = TaskArchive(self.exe_dir / "archive")
         self.config_file = self.exe_dir / "config.json"
         self.icon_file = self.images_path / "icon.ico"
+        self.icon_cache = IconCache(self.images_path / "cache", self.icon_file)
+        
+        # Configurar log
+        self.log_buffer = setup_logging(self.exe_dir / "logs")
         
         # Carregar configurações
         self.config = self.load_config()
+        set_log_level(self.config.get("log_level", "INFO"))
+        self.store = TaskStore(self.exe_dir, binary=self.config.get("storage_format") == "binary",
+                               shared=self.config.get("shared_file", False),
+                               backup_count=self.config.get("backup_count", 5))
+        self.journal = self.store.journal
+        logger.info("Task Reminder iniciado em %s", self.exe_dir)
+        self.startup.mark("config")
         
         # Inicializar variáveis
         self.tasks = []
+        self.system_zone = system_zone_name()
+        self.zone_signature = zone_signature()
         self.scheduler_running = True
+        self.scheduler = ReminderScheduler()
+        self.dispatcher = NotificationDispatcher(
+            self.scheduler, self.show_notification_batch,
+            limit=self.config.get("max_notifications_per_minute", 3),
+            quiet_hours=QuietHours.from_config(self.config.get("quiet_hours")))
         self.tray_icon = None
         self.editing_task_id = None
         self.notification_windows = []
         self.is_quitting = False 
         self.add_button = None 
         self.update_button = None 
-        self.active_timers = []
+        self.perf = PerformanceMonitor()
+        self.tray_badge = None
+        self.due_index = DueIndex()
+        self.tag_index = TagIndex()
+        self.history = UndoHistory(self.config.get("undo_history_limit", 50))
+        self.check_wakeup = threading.Event()
+        self.events = EventHub()
+        self.api_server = None
+        self.shared_sync_thread = None
+        self.shared_sync_wakeup = threading.Event()
+        self.shared_sync_write = False
+        self.shared_sync_callbacks = []
+        self.shared_sync_failed = False
+        self.active_filter = None
+        self.filter_options = {}
+        self.tray_menu_items = ()
+        self.tray_menu_signature = None
+        self.sort_column = None
+        self.sort_reverse = False
         
         # Configurar cores
         self.setup_colors()
@@ -175,27 +2938,62 @@ class TaskReminderApp:
         
         # Configurar eventos de teclado
         self.setup_keyboard_shortcuts()
+        self.startup.mark("ui")
         
         # Carregar tarefas
         self.load_tasks()
+        self.startup.mark("load_tasks")
         self.load_tasks_to_table()
+        self.startup.mark("table")
         
-        # Configurar autostart
-        if self.config.get("start_with_windows", True) and WINSHELL_AVAILABLE:
-            self.setup_autostart()
+        # Bandeja, autostart e agendamentos só depois do primeiro quadro
+        # (after_idle dentro de after_idle roda após o redesenho pendente)
+        self.root.after_idle(lambda: self.root.after_idle(self.start_deferred_services))
+
+    def start_deferred_services(self):
+        """Inicia os subsistemas que não são necessários para desenhar a janela"""
+        self.startup.mark("first_frame")
+        
+        # Agendar notificações para tarefas existentes
+        self.scheduler.start()
+        self.reschedule_all_tasks()
+        
+        # Verificar tarefas periodicamente
+        threading.Thread(target=self.check_pending_tasks, daemon=True).start()
+        self.startup.mark("scheduler")
+        
+        # Mudanças de configuração (pela tela ou no config.json) valem na hora
+        self.setup_config_subscriptions()
+        self.root.after(ConfigService.WATCH_INTERVAL, self.watch_config)
+        self.root.after(SHARED_WATCH_INTERVAL, self.watch_task_file)
+        
+        # API local (opcional)
+        self.apply_api_setting()
+        
+        # Concluídas antigas vão para o arquivo (e de novo uma vez por dia)
+        self.archive_completed_tasks()
         
         # Configurar ícone na bandeja
         if self.config.get("show_tray_icon", True) and PYSTRAY_AVAILABLE and PILLOW_AVAILABLE:
             self.setup_tray_icon()
+        self.startup.mark("tray")
         
-        # Verificar tarefas imediatamente
-        threading.Thread(target=self.check_pending_tasks, daemon=True).start()
+        # Sem ícone na bandeja a janela minimizada precisa continuar acessível
+        if self.start_minimized and self.tray_icon is None:
+            self.root.iconify()
+        
+        # Configurar autostart
+        if self.config.get("start_with_windows", True) and WINSHELL_AVAILABLE:
+            self.setup_autostart()
+        self.startup.mark("autostart")
         
         # Verificar dependências
         self.check_dependencies()
         
-        # Agendar notificações para tarefas existentes
-        self.reschedule_all_tasks()
+        logger.info("Inicialização%s: %s", " (minimizado)" if self.start_minimized else "",
+                    self.startup.report())
+        if hasattr(self, 'startup_report_var'):
+            self.startup_report_var.set(self.startup.report())
 
     def hide_console(self):
         """Oculta o console do Windows"""
@@ -205,8 +3003,8 @@ class TaskReminderApp:
             if whnd != 0:
                 ctypes.windll.user32.ShowWindow(whnd, 0)
                 ctypes.windll.kernel32.CloseHandle(whnd)
-        except:
-            pass
+        except Exception:
+            logger.debug("Console não ocultado", exc_info=True)
 
     def setup_keyboard_shortcuts(self):
         """atalhos de teclado"""
@@ -233,6 +3031,13 @@ class TaskReminderApp:
 
         # F3 para limpar concluídas
         self.root.bind('<F3>', lambda e: self.clear_completed_tasks())
+        
+        # Ctrl+Z / Ctrl+Y para desfazer e refazer
+        # Com Caps Lock o keysym vem maiúsculo: só o bit do Shift separa desfazer de refazer
+        for key in ('<Control-z>', '<Control-Z>'):
+            self.root.bind(key, lambda e: self.redo_last() if e.state & SHIFT_MASK else self.undo_last())
+        for key in ('<Control-y>', '<Control-Y>'):
+            self.root.bind(key, lambda e: self.redo_last())
 
     def handle_enter_key(self, event):
         widget = event.widget
@@ -247,6 +3052,347 @@ class TaskReminderApp:
         # Prevenir comportamento padrão
         return "break"
 
+    def handle_instance_command(self, message):
+        """Atende um comando de outra execução (chamado na thread do canal local)"""
+        handlers = {
+            "show": self.show_window,
+            "add": self.add_task_from_command,
+            "import": self.import_tasks_file,
+            "list": self.list_tasks_for_command,
+            "complete": self.complete_task_from_command,
+            "export": self.export_tasks_for_command,
+            "stats": self.stats_for_command,
+        }
+        handler = handlers.get(message.get("command"))
+        if handler is None:
+            return {"ok": False, "error": f"Comando desconhecido: {message.get('command')}"}
+        
+        logger.info("Comando recebido de outra execução: %s", message["command"])
+        try:
+            if message["command"] == "import":
+                # Lê o arquivo nesta thread; só a inclusão passa pela interface
+                result = handler(**message.get("args", {}))
+            else:
+                result = self.call_in_ui(handler, **message.get("args", {}))
+        except Exception as e:
+            logger.warning("Comando %s falhou", message["command"], exc_info=True)
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
+
+    def call_in_ui(self, func, *args, timeout=10, **kwargs):
+        """Executa func na thread do Tk e espera o resultado.
+
+        Se a interface não começar a executá-la em timeout segundos (None: sem limite), a
+        chamada é cancelada em vez de rodar mais tarde, depois de quem chamou desistir.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        
+        done = threading.Event()
+        state = threading.Lock()
+        outcome = {}
+        
+        def run():
+            with state:
+                if outcome.get('cancelled'):
+                    return
+                outcome['started'] = True
+            try:
+                outcome['value'] = func(*args, **kwargs)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+        
+        self.root.after(0, run)
+        if not done.wait(timeout):
+            with state:
+                if not outcome.get('started'):
+                    outcome['cancelled'] = True
+                    raise TimeoutError("A interface não respondeu a tempo")
+            # Já começou: termina de qualquer forma
+            done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('value')
+
+    def add_task_from_command(self, text, at=None, reminders="", priority="Normal", tags="", list_name=""):
+        """Inclui uma tarefa vinda da linha de comando; retorna o ID"""
+        task = task_from_command(self.next_task_id(), self.system_zone, text, at,
+                                 reminders, priority, tags, list_name)
+        self.commit_new_tasks([task], "Adicionar tarefa")
+        self.status_var.set(f"✅ Tarefa '{task['task'][:30]}...' adicionada")
+        return task['id']
+
+    def import_tasks_file(self, path):
+        """Importa tarefas de um arquivo (.ics, .csv, .ndjson ou JSON); retorna as contagens.
+
+        Roda na thread de quem chamou: leitura, conversão, detecção de duplicatas e gravação
+        ficam fora da interface, que só recebe os lotes prontos. Cada lote vai para o diário
+        assim que entra (uma queda no meio perde no máximo o lote em andamento); o tasks.json
+        é regravado inteiro no próximo salvamento normal.
+        """
+        source = Path(path).name
+        contents = self.call_in_ui(lambda: [(t['task'], t['datetime']) for t in self.tasks])
+        seen = {content_hash(text, when) for text, when in contents}
+        totals = import_totals()
+        state = {'journaled': not self.store.shared}
+        try:
+            for tasks in dedup_batches(iter_task_records(path, self.system_zone), self.system_zone, seen, totals):
+                copies = self.call_in_ui(self.add_import_batch, tasks, source, dict(totals), state, timeout=60)
+                if state['journaled']:
+                    try:
+                        self.journal.append_tasks(copies)
+                    except OSError:
+                        logger.exception("Erro ao registrar lote importado no diário")
+                        state['journaled'] = False
+        finally:
+            # Sem prazo: os lotes já estão na memória
+            self.call_in_ui(self.finish_import, source, dict(totals), state, timeout=None)
+        return totals
+
+    def add_import_batch(self, tasks, source, totals, state):
+        """Inclui um lote da importação na memória, nos índices, no agendador, na tabela e no
+        desfazer; retorna cópias do lote para a gravação fora da interface"""
+        # Os IDs são definidos agora: outras tarefas podem ter sido criadas durante a leitura
+        first_id = self.next_task_id()
+        for offset, task in enumerate(tasks):
+            task['id'] = first_id + offset
+        
+        start = len(self.tasks)
+        self.tasks.extend(tasks)
+        self.due_index.add_many(tasks)
+        for task in tasks:
+            self.tag_index.update(task)
+            self.schedule_task_notifications(task)
+        self.append_task_rows(tasks)
+        
+        # Uma só ação de desfazer para a importação inteira, que já existe desde o primeiro lote
+        ids = [task['id'] for task in tasks]
+        rows = list(enumerate(tasks, start))
+        if state.get('entry') is not None and self.history.is_last(state['entry']):
+            state['ids'].extend(ids)
+            state['rows'].extend(rows)
+        else:
+            state['ids'], state['rows'] = ids, rows
+            state['entry'] = self.history.record("Importar tarefas", [('delete', ids)], [('insert', rows)])
+        self.events.publish("task.created", {"ids": ids})
+        
+        self.status_var.set(f"📥 Importando {source}: {totals['read']} registro(s) lido(s), "
+                            f"{totals['imported']} nova(s), {totals['duplicates']} duplicada(s)...")
+        return [dict(task) for task in tasks]
+
+    def finish_import(self, source, totals, state):
+        if totals['imported'] and not state['journaled']:
+            # Arquivo compartilhado (a gravação passa pelo merge) ou diário indisponível
+            self.save_tasks()
+        self.refresh_filter_options()
+        self.refresh_tray_menu()
+        logger.info("Importação de %s: %s", source, totals)
+        self.status_var.set(f"📥 {describe_import(totals)} de {source}")
+
+    def append_task_rows(self, tasks):
+        """Acrescenta linhas ao fim da tabela sem redesenhá-la; a ordenação completa volta
+        na próxima recarga (filtro, ordenação ou outra alteração)"""
+        now = datetime.now()
+        for task in tasks:
+            if self.active_filter is None or self.active_filter in TagIndex.task_keys(task):
+                values, tag = self.task_row(task, now)
+                self.tree.insert("", tk.END, iid=str(task['id']), values=values, tags=(tag,))
+        self.update_tray_badge()
+
+    def import_tasks_dialog(self):
+        path = filedialog.askopenfilename(
+            title="Importar tarefas",
+            filetypes=[("Arquivos de tarefas", "*.ics *.csv *.ndjson *.jsonl *.json"), ("Calendário", "*.ics"),
+                       ("CSV", "*.csv"), ("JSON por linha", "*.ndjson *.jsonl"), ("JSON", "*.json"),
+                       ("Todos os arquivos", "*.*")]
+        )
+        if not path:
+            return
+        
+        self.status_var.set(f"📥 Importando {Path(path).name}...")
+        
+        def run():
+            try:
+                self.import_tasks_file(path)
+            except Exception as e:
+                logger.exception("Erro ao importar %s", path)
+                msg = str(e)
+                self.root.after(0, lambda msg=msg: messagebox.showerror("Erro", f"Erro ao importar tarefas: {msg}"))
+        
+        threading.Thread(target=run, name="Import", daemon=True).start()
+
+    def export_tasks_dialog(self):
+        path = filedialog.asksaveasfilename(
+            title="Exportar tarefas",
+            defaultextension=".ics",
+            filetypes=[("Calendário (pendentes)", "*.ics"), ("CSV", "*.csv"),
+                       ("JSON por linha", "*.ndjson *.jsonl"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+        
+        # Cópia feita aqui; a gravação corre fora da interface
+        tasks = [dict(task) for task in self.tasks]
+        self.status_var.set(f"📤 Exportando {len(tasks)} tarefa(s)...")
+        
+        def run():
+            try:
+                count = write_tasks_file(path, tasks, self.system_zone)
+            except (OSError, ValueError) as e:
+                logger.exception("Erro ao exportar %s", path)
+                msg = str(e)
+                self.root.after(0, lambda msg=msg: messagebox.showerror("Erro", f"Erro ao exportar tarefas: {msg}"))
+                return
+            self.root.after(0, lambda: self.status_var.set(
+                f"📤 {count} tarefa(s) exportada(s) para {Path(path).name}"))
+        
+        threading.Thread(target=run, name="Export", daemon=True).start()
+
+    def tasks_from_records(self, records, rejected=None):
+        return tasks_from_records(records, self.next_task_id(), self.system_zone, rejected)
+
+    def list_tasks_for_command(self, due_before=None, include_done=False):
+        """Subcomando list: tarefas por data/hora, opcionalmente só as que vencem antes de due_before"""
+        limit = parse_user_datetime(due_before) if due_before else None
+        return [dict(task) for task in list_open_tasks(self.tasks, limit, include_done)]
+
+    def complete_task_from_command(self, task_id):
+        task = self.complete_task(int(task_id))
+        if task is None:
+            raise ValueError(f"Tarefa {task_id} não encontrada")
+        return dict(task)
+
+    def export_tasks_for_command(self):
+        return [dict(task) for task in self.tasks]
+
+    def stats_for_command(self):
+        return dict(task_stats(self.tasks), archived=self.archive.count)
+
+    def api_upcoming(self, limit=20):
+        """Próximas tarefas em aberto por data/hora"""
+        return [dict(task) for task in self.due_index.first(max(1, min(limit, 1000)))]
+
+    def api_create(self, record):
+        tasks = self.tasks_from_records([record])
+        if not tasks:
+            raise ValueError("Tarefa inválida: informe ao menos 'task' e 'datetime'")
+        self.commit_new_tasks(tasks, "Adicionar tarefa (API)")
+        return dict(tasks[0])
+
+    def api_bulk_create(self, records):
+        """Muitas tarefas numa só gravação e numa só passada no agendador"""
+        rejected = []
+        tasks = self.tasks_from_records(records, rejected)
+        if tasks:
+            self.commit_new_tasks(tasks, "Adicionar em lote (API)")
+        self.status_var.set(f"📥 {len(tasks)} tarefa(s) recebida(s) pela API")
+        return {"created": [t['id'] for t in tasks], "rejected": rejected}
+
+    def api_update(self, task_id, record):
+        """Altera campos de uma tarefa e reagenda só os disparos dela"""
+        task = self.find_task(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        fields = record_fields(record)
+        before = dict(task)
+        
+        if 'text' in fields:
+            task['task'] = fields['text']
+        if 'task_datetime' in fields:
+            self.set_task_due(task, fields['task_datetime'])
+            clear_snooze(task)
+            task['is_overdue'] = fields['task_datetime'] < datetime.now()
+            if task.get('status') != 'Concluída':
+                task['status'] = 'Pendente'
+        if 'reminders' in fields:
+            task['reminders'] = sorted({m for m in fields['reminders'] if m > 0})
+        if 'priority' in fields:
+            task['priority'] = fields['priority']
+        if 'tags' in fields:
+            task['tags'] = fields['tags']
+        if 'list_name' in fields:
+            task['list'] = fields['list_name'] or DEFAULT_LIST
+        if 'escalate' in fields:
+            if fields['escalate']:
+                task['escalate'] = True
+            else:
+                task.pop('escalate', None)
+                self.acknowledge_task(task)
+        
+        self.due_index.update(task)
+        self.tag_index.update(task)
+        self.record_update("Editar tarefa (API)", [(task, before)])
+        self.reschedule_task(task)
+        self.save_tasks()
+        self.refresh_task_row(task)
+        self.events.publish("task.updated", task)
+        return dict(task)
+
+    def api_complete(self, task_id):
+        task = self.complete_task(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return dict(task)
+
+    def apply_storage_format(self, key, value):
+        """Regrava as tarefas no formato escolhido; ao carregar vale o arquivo mais recente"""
+        self.store.binary = value == "binary"
+        
+        def on_saved(saved):
+            if saved:
+                logger.info("Tarefas gravadas no formato %s", value)
+        
+        self.save_tasks(on_saved=on_saved)
+
+    def apply_shared_setting(self, key, value):
+        """Liga ou desliga o modo de arquivo compartilhado entre computadores"""
+        self.store.shared = value
+        if value:
+            # O que está na memória é a base do primeiro merge
+            self.store.remember(self.tasks)
+            self.save_tasks()
+
+    def apply_shared_tasks(self, tasks):
+        """Adota a lista juntada com as alterações feitas em outro computador"""
+        self.tasks = tasks
+        self.due_index.rebuild(tasks)
+        self.tag_index.rebuild(tasks)
+        # As ações desfazíveis podem se referir a versões que o outro computador já mudou
+        self.history.clear()
+        self.reschedule_all_tasks()
+        self.load_tasks_to_table()
+        self.status_var.set("🔄 Tarefas atualizadas por outro computador")
+
+    def apply_api_setting(self, key=None, value=None):
+        """Liga, desliga ou reinicia a API local conforme a configuração"""
+        if self.api_server is not None:
+            self.api_server.stop()
+            self.api_server = None
+        if not self.config.get("api_enabled"):
+            return
+        
+        if not self.config.get("api_token"):
+            # O assinante é chamado de novo com o token e inicia a API
+            self.config.update({"api_token": secrets.token_urlsafe(24)})
+            self.save_config()
+            return
+        
+        self.api_server = LocalApiServer(self, self.config.get("api_port", 8765),
+                                         self.config.get("api_token"), self.events)
+        try:
+            self.api_server.start()
+        except OSError as e:
+            logger.error("API local não iniciada na porta %s: %s", self.config.get("api_port"), e)
+            self.api_server = None
+            self.status_var.set(f"⚠️ API local não iniciada: {e}")
+
+    def new_api_token(self):
+        """Gera um novo token para a API local"""
+        self.config.update({"api_token": secrets.token_urlsafe(24)})
+        self.save_config()
+
     def focus_new_task(self):
         """Foca no campo de descrição para nova tarefa"""
         self.task_entry.focus()
@@ -268,6 +3414,7 @@ class TaskReminderApp:
             missing.append("tkcalendar (para seleção de data)")
         
         if missing:
+            logger.warning("Dependências ausentes: %s", ", ".join(missing))
             self.status_var.set("⚠️ Algumas funcionalidades podem estar limitadas")
 
     def setup_colors(self):
@@ -286,44 +3433,16 @@ class TaskReminderApp:
         }
 
     def load_config(self):
-        """Carrega as configurações"""
-        default_config = {
-            "start_with_windows": True,
-            "minimize_to_tray": True,
-            "show_tray_icon": True,
-            "notification_sound": True,
-            "notification_duration": 15,
-            "check_interval": 60,
-            "theme": "light",
-            "show_notification_on_minimize": True
-        }
-        
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                    default_config.update(loaded_config)
-                    return default_config
-            except Exception as e:
-                print(f"Erro ao carregar configurações: {e}")
-                return default_config
-        else:
-            # Salvar configurações
-            self.save_config(default_config)
-            return default_config
+        """Carrega as configurações (validadas pelo esquema)"""
+        config = ConfigService(self.config_file)
+        if not config.load():
+            # Primeira execução: gravar os padrões
+            config.save()
+        return config
 
-    def save_config(self, config=None):
+    def save_config(self):
         """Salva as configurações"""
-        if config is None:
-            config = self.config
-        
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            print(f"Erro ao salvar configurações: {e}")
-            return False
+        return self.config.save()
 
     def setup_app_icon(self):
         """Configura o ícone do aplicativo"""
@@ -334,29 +3453,21 @@ class TaskReminderApp:
                 self.create_default_icon()
                 if os.path.exists(self.icon_file):
                     self.root.iconbitmap(default=str(self.icon_file))
-        except:
-            pass
+        except Exception:
+            logger.warning("Erro ao aplicar ícone do aplicativo", exc_info=True)
 
     def create_default_icon(self):
         if not PILLOW_AVAILABLE:
             return
             
         try:
-            image = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(image)
-            
-            draw.ellipse([(10, 10), (54, 54)], fill='#007bff')
-            
-            draw.rectangle([(26, 20), (38, 40)], fill='white')
-            draw.polygon([(24, 20), (40, 20), (38, 18), (26, 18)], fill='white')
-            
-            draw.line([(32, 40), (32, 44)], fill='white', width=2)
-            draw.ellipse([(30, 44), (34, 48)], fill='white')
+            image = self.icon_cache.get(64)
             
             # Salvar como ICO
-            image.save(self.icon_file, format='ICO')
-        except Exception as e:
-            print(f"Erro ao criar ícone padrão: {e}")
+            image.save(self.icon_file, format='ICO',
+                       sizes=[(size, size) for size in IconCache.SIZES])
+        except Exception:
+            logger.exception("Erro ao criar ícone padrão")
 
     def setup_autostart(self):
         """Configura o aplicativo para iniciar com o Windows"""
@@ -384,8 +3495,8 @@ class TaskReminderApp:
             
             shortcut.save()
             
-        except Exception as e:
-            print(f"Erro ao configurar autostart: {e}")
+        except Exception:
+            logger.exception("Erro ao configurar autostart")
 
     def remove_autostart(self):
         """Remove o aplicativo do início automático do Windows"""
@@ -399,8 +3510,8 @@ class TaskReminderApp:
             if os.path.exists(shortcut_path):
                 os.remove(shortcut_path)
                 return True
-        except Exception as e:
-            print(f"Erro ao remover autostart: {e}")
+        except Exception:
+            logger.exception("Erro ao remover autostart")
         return False
 
     def setup_tray_icon(self):
@@ -409,16 +3520,14 @@ class TaskReminderApp:
             return
             
         try:
-            if os.path.exists(self.icon_file):
-                image = Image.open(self.icon_file)
-            else:
-                image = Image.new('RGB', (64, 64), color='#007bff')
+            pending, overdue = self.count_open_tasks()
+            self.tray_badge = (IconCache.badge_key(pending), bool(overdue))
+            image = self.icon_cache.get(64, pending, overdue)
             
-            menu = (
-                item('Mostrar', self.show_window),
-                item('Configurações', self.open_settings),
-                item('Sair', self.quit_app_silent)
-            )
+            # Menu dinâmico: o pystray consulta self.tray_menu_items ao exibir
+            self.tray_menu_signature = None
+            self.tray_menu_items = self.build_tray_menu_items()
+            menu = pystray.Menu(lambda: self.tray_menu_items)
             
             self.tray_icon = pystray.Icon(
                 "task_reminder",
@@ -430,8 +3539,90 @@ class TaskReminderApp:
             # Iniciar ícone da bandeja em thread separada
             threading.Thread(target=self.tray_icon.run, daemon=True).start()
             
-        except Exception as e:
-            print(f"Erro ao configurar ícone da bandeja: {e}")
+            # Deixar os selos prontos para as próximas mudanças de contagem
+            threading.Thread(target=self.icon_cache.prerender, args=(64,), daemon=True).start()
+            
+        except Exception:
+            logger.exception("Erro ao configurar ícone da bandeja")
+
+    def tray_action(self, callback, *args):
+        """Cria uma ação de menu da bandeja que executa na thread da interface"""
+        def action():
+            self.root.after(0, lambda: callback(*args))
+        return action
+
+    def upcoming_tasks_signature(self):
+        """Identifica o conjunto das próximas tarefas exibidas na bandeja"""
+        count = self.config.get("tray_upcoming_count", 5)
+        return tuple(
+            (t['id'], t['datetime'], t['task'], bool(t.get('is_overdue')))
+            for t in self.due_index.first(count)
+        )
+
+    def build_tray_menu_items(self):
+        """Monta os itens do menu da bandeja com as próximas tarefas"""
+        signature = self.upcoming_tasks_signature()
+        self.tray_menu_signature = signature
+        
+        upcoming = []
+        for task_id, task_datetime, task_text, is_overdue in signature:
+            when = datetime.strptime(task_datetime, "%Y-%m-%d %H:%M:%S").strftime("%d/%m %H:%M")
+            label = f"{'⚠️ ' if is_overdue else ''}{when} - {task_text[:40]}"
+            actions = [item('✅ Concluir', self.tray_action(self.complete_task, task_id))]
+            for minutes, snooze_label in SNOOZE_OPTIONS:
+                actions.append(item(f'💤 Adiar {snooze_label}',
+                                    self.tray_action(self.snooze_task, task_id, minutes)))
+            upcoming.append(item(label, pystray.Menu(*actions)))
+        if not upcoming:
+            upcoming.append(item('Nenhuma tarefa pendente', None, enabled=False))
+        
+        return (
+            item('Mostrar', self.show_window, default=True),
+            item('Próximas tarefas', pystray.Menu(*upcoming)),
+            pystray.Menu.SEPARATOR,
+            item('Configurações', self.open_settings),
+            item('Sair', self.quit_app_silent)
+        )
+
+    def refresh_tray_menu(self):
+        """Reconstrói o menu da bandeja só se as próximas tarefas mudaram"""
+        if self.tray_icon is None:
+            return
+        if self.upcoming_tasks_signature() == self.tray_menu_signature:
+            return
+        
+        try:
+            self.tray_menu_items = self.build_tray_menu_items()
+            self.tray_icon.update_menu()
+        except Exception:
+            logger.warning("Erro ao atualizar menu da bandeja", exc_info=True)
+
+    def count_open_tasks(self):
+        """Retorna (tarefas em aberto, tarefas atrasadas)"""
+        pending = overdue = 0
+        for task in self.tasks:
+            if task.get('status') != 'Concluída':
+                pending += 1
+                if task.get('is_overdue'):
+                    overdue += 1
+        return pending, overdue
+
+    def update_tray_badge(self):
+        """Atualiza o selo do ícone da bandeja quando a contagem muda"""
+        if self.tray_icon is None:
+            return
+        
+        pending, overdue = self.count_open_tasks()
+        badge = (IconCache.badge_key(pending), bool(overdue))
+        if badge == self.tray_badge:
+            return
+        
+        try:
+            self.tray_icon.icon = self.icon_cache.get(64, pending, overdue)
+            self.tray_icon.title = f"Task Reminder - {pending} pendente(s)" if pending else "Task Reminder"
+            self.tray_badge = badge
+        except Exception:
+            logger.warning("Erro ao atualizar selo da bandeja", exc_info=True)
 
     def on_closing(self):
         """fechamento da janela"""
@@ -451,8 +3642,8 @@ class TaskReminderApp:
                     timeout=3,
                     app_name="Task Reminder"
                 )
-            except:
-                pass
+            except Exception:
+                logger.warning("Erro ao exibir notificação de minimização", exc_info=True)
 
     def show_window(self):
         """Mostra a janela principal"""
@@ -580,27 +3771,73 @@ class TaskReminderApp:
             command=self.set_current_time
         ).grid(row=0, column=5, padx=(10, 0))
         
+        ttk.Label(datetime_frame, text="Prioridade:").grid(row=0, column=6, padx=(20, 5))
+        self.priority_var = tk.StringVar(value=PRIORITY_LABELS[PRIORITY_NORMAL])
+        ttk.Combobox(
+            datetime_frame,
+            textvariable=self.priority_var,
+            values=list(PRIORITY_LABELS.values()),
+            state="readonly",
+            width=8
+        ).grid(row=0, column=7)
+        
         ttk.Label(input_frame, text="Lembretes:").grid(row=2, column=0, sticky=tk.W, pady=5)
         
         reminders_frame = ttk.Frame(input_frame)
         reminders_frame.grid(row=2, column=1, sticky=tk.W, pady=5, padx=(10, 0))
         
-        self.reminder_5min = tk.BooleanVar()
-        self.reminder_10min = tk.BooleanVar()
-        self.reminder_30min = tk.BooleanVar()
-        self.reminder_1h = tk.BooleanVar()
+        self.reminders_var = tk.StringVar()
+        ttk.Entry(
+            reminders_frame,
+            textvariable=self.reminders_var,
+            width=30,
+            font=('Segoe UI', 10)
+        ).grid(row=0, column=0)
+        ttk.Label(
+            reminders_frame,
+            text="antes (ex.: 5m, 15m, 1h, 1d)",
+            foreground=self.colors['pending']
+        ).grid(row=0, column=1, padx=(5, 0))
+        
+        self.escalate_var = tk.BooleanVar()
+        ttk.Checkbutton(
+            reminders_frame,
+            text="🚨 Insistir até confirmar",
+            variable=self.escalate_var
+        ).grid(row=0, column=2, padx=(15, 0))
+        
+        self.setup_recurrence_inputs(input_frame, row=3)
+        
+        ttk.Label(input_frame, text="Lista:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        
+        organize_frame = ttk.Frame(input_frame)
+        organize_frame.grid(row=5, column=1, sticky=tk.W, pady=5, padx=(10, 0))
         
-        ttk.Checkbutton(reminders_frame, text="5 min antes", 
-                       variable=self.reminder_5min).grid(row=0, column=0, padx=(0, 10), sticky=tk.W)
-        ttk.Checkbutton(reminders_frame, text="10 min antes", 
-                       variable=self.reminder_10min).grid(row=0, column=1, sticky=tk.W)
-        ttk.Checkbutton(reminders_frame, text="30 min antes", 
-                       variable=self.reminder_30min).grid(row=1, column=0, padx=(0, 10), sticky=tk.W)
-        ttk.Checkbutton(reminders_frame, text="1 hora antes", 
-                       variable=self.reminder_1h).grid(row=1, column=1, sticky=tk.W)
+        self.list_var = tk.StringVar(value=DEFAULT_LIST)
+        self.list_combo = ttk.Combobox(
+            organize_frame,
+            textvariable=self.list_var,
+            values=[DEFAULT_LIST],
+            width=18
+        )
+        self.list_combo.grid(row=0, column=0)
+        
+        ttk.Label(organize_frame, text="Etiquetas:").grid(row=0, column=1, padx=(15, 5))
+        self.tags_var = tk.StringVar()
+        ttk.Entry(
+            organize_frame,
+            textvariable=self.tags_var,
+            width=30,
+            font=('Segoe UI', 10)
+        ).grid(row=0, column=2)
+        ttk.Label(
+            organize_frame,
+            text="ex.: @trabalho @casa",
+            foreground=self.colors['pending']
+        ).grid(row=0, column=3, padx=(5, 0))
         
         button_frame = ttk.Frame(input_frame)
-        button_frame.grid(row=3, column=0, columnspan=2, pady=(15, 0))
+        button_frame.grid(row=6, column=0, columnspan=2, pady=(15, 0))
         
         self.add_button = ttk.Button(
             button_frame, 
@@ -629,20 +3866,42 @@ class TaskReminderApp:
         list_frame = ttk.LabelFrame(tasks_frame, text="Tarefas Agendadas", padding="10")
         list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
+        list_frame.rowconfigure(1, weight=1)
+        
+        filter_frame = ttk.Frame(list_frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 10))
+        
+        ttk.Label(filter_frame, text="Mostrar:").grid(row=0, column=0, padx=(0, 5))
+        self.filter_var = tk.StringVar()
+        self.filter_combo = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_var,
+            state="readonly",
+            width=30
+        )
+        self.filter_combo.grid(row=0, column=1)
+        self.filter_combo.bind('<<ComboboxSelected>>', self.on_filter_selected)
+        
+        ttk.Button(
+            filter_frame,
+            text="✅ Concluir as de hoje",
+            command=self.complete_filtered_today,
+            width=22
+        ).grid(row=0, column=2, padx=(10, 0))
         
-        columns = ("ID", "Tarefa", "Data/Hora", "Lembretes", "Status")
+        columns = ("ID", "Tarefa", "Data/Hora", "Prioridade", "Lembretes", "Status")
         self.tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=15)
         
-        self.tree.heading("ID", text="ID", anchor=tk.CENTER)
-        self.tree.heading("Tarefa", text="Tarefa", anchor=tk.W)
-        self.tree.heading("Data/Hora", text="Data/Hora", anchor=tk.CENTER)
-        self.tree.heading("Lembretes", text="Lembretes", anchor=tk.CENTER)
-        self.tree.heading("Status", text="Status", anchor=tk.CENTER)
+        # Clique no cabeçalho ordena pela coluna (de novo inverte a ordem)
+        for column in columns:
+            anchor = tk.W if column == "Tarefa" else tk.CENTER
+            self.tree.heading(column, text=column, anchor=anchor,
+                              command=lambda c=column: self.sort_table_by(c))
         
         self.tree.column("ID", width=50, anchor=tk.CENTER, minwidth=40)
         self.tree.column("Tarefa", width=400, anchor=tk.W, minwidth=200)
         self.tree.column("Data/Hora", width=120, anchor=tk.CENTER, minwidth=100)
+        self.tree.column("Prioridade", width=90, anchor=tk.CENTER, minwidth=70)
         self.tree.column("Lembretes", width=150, anchor=tk.CENTER, minwidth=120)
         self.tree.column("Status", width=100, anchor=tk.CENTER, minwidth=80)
         
@@ -650,12 +3909,12 @@ class TaskReminderApp:
         hsb = ttk.Scrollbar(list_frame, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
         
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        vsb.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        hsb.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        vsb.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        hsb.grid(row=2, column=0, sticky=(tk.W, tk.E))
         
         action_frame = ttk.Frame(list_frame)
-        action_frame.grid(row=2, column=0, columnspan=2, pady=(10, 0))
+        action_frame.grid(row=3, column=0, columnspan=2, pady=(10, 0))
         
         ttk.Button(
             action_frame,
@@ -680,18 +3939,160 @@ class TaskReminderApp:
         
         ttk.Button(
             action_frame,
-            text="🗑️ Limpar Concluídas",
-            command=self.clear_completed_tasks,
-            width=25
-        ).grid(row=0, column=3, padx=2)
+            text="🗑️ Limpar Concluídas",
+            command=self.clear_completed_tasks,
+            width=25
+        ).grid(row=0, column=3, padx=2)
+        
+        ttk.Button(
+            action_frame,
+            text="📥 Importar",
+            command=self.import_tasks_dialog,
+            width=12
+        ).grid(row=0, column=4, padx=2)
+        
+        ttk.Button(
+            action_frame,
+            text="📤 Exportar",
+            command=self.export_tasks_dialog,
+            width=12
+        ).grid(row=0, column=5, padx=2)
+        
+        ttk.Button(
+            action_frame,
+            text="📦 Arquivo",
+            command=self.show_archive_viewer,
+            width=12
+        ).grid(row=0, column=6, padx=2)
         
         self.tree.bind('<<TreeviewSelect>>', self.on_task_select)
         self.tree.bind('<Double-Button-1>', lambda e: self.edit_selected_task())
 
+    def setup_recurrence_inputs(self, parent, row):
+        """Campos de repetição da tarefa (ocupa duas linhas a partir de row)"""
+        ttk.Label(parent, text="Repetir:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        recurrence_frame = ttk.Frame(parent)
+        recurrence_frame.grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        self.recurrence_var = tk.StringVar(value=RECURRENCE_LABELS[""])
+        ttk.Combobox(
+            recurrence_frame,
+            textvariable=self.recurrence_var,
+            values=list(RECURRENCE_LABELS.values()),
+            state="readonly",
+            width=16
+        ).grid(row=0, column=0, padx=(0, 10))
+        
+        ttk.Label(recurrence_frame, text="intervalo:").grid(row=0, column=1, padx=(0, 5))
+        self.recurrence_interval_var = tk.IntVar(value=1)
+        ttk.Spinbox(
+            recurrence_frame,
+            from_=1,
+            to=365,
+            textvariable=self.recurrence_interval_var,
+            width=4
+        ).grid(row=0, column=2, padx=(0, 10))
+        
+        self.recurrence_weekday_vars = []
+        for weekday, label in enumerate(WEEKDAY_LABELS):
+            var = tk.BooleanVar()
+            ttk.Checkbutton(recurrence_frame, text=label, variable=var).grid(row=0, column=3 + weekday)
+            self.recurrence_weekday_vars.append(var)
+        
+        ttk.Label(parent, text="Término:").grid(row=row + 1, column=0, sticky=tk.W, pady=5)
+        
+        end_frame = ttk.Frame(parent)
+        end_frame.grid(row=row + 1, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        ttk.Label(end_frame, text="após").grid(row=0, column=0, padx=(0, 5))
+        self.recurrence_count_var = tk.IntVar(value=0)
+        ttk.Spinbox(
+            end_frame,
+            from_=0,
+            to=9999,
+            textvariable=self.recurrence_count_var,
+            width=6
+        ).grid(row=0, column=1, padx=(0, 5))
+        ttk.Label(end_frame, text="ocorrências (0 = sem limite)   ou até (DD/MM/AAAA):").grid(row=0, column=2, padx=(0, 5))
+        
+        self.recurrence_until_entry = ttk.Entry(end_frame, width=12, font=('Segoe UI', 10))
+        self.recurrence_until_entry.grid(row=0, column=3)
+
+    def get_recurrence_from_form(self, task_datetime):
+        """Lê a regra de repetição dos campos; retorna None, a regra ou levanta ValueError"""
+        labels = {label: freq for freq, label in RECURRENCE_LABELS.items()}
+        freq = labels.get(self.recurrence_var.get(), "")
+        if not freq:
+            return None
+        
+        try:
+            interval = int(self.recurrence_interval_var.get())
+            count = int(self.recurrence_count_var.get())
+        except (tk.TclError, ValueError):
+            raise ValueError("Intervalo e número de ocorrências devem ser números inteiros")
+        if interval < 1 or count < 0:
+            raise ValueError("Intervalo deve ser ao menos 1 e ocorrências não pode ser negativo")
+        
+        rule = {"freq": freq, "interval": interval}
+        if freq == "weekly":
+            rule["weekdays"] = [d for d, var in enumerate(self.recurrence_weekday_vars) if var.get()]
+        if freq == "monthly":
+            rule["monthday"] = task_datetime.day
+        if count:
+            rule["count"] = count
+        
+        until_text = self.recurrence_until_entry.get().strip()
+        if until_text:
+            until = datetime.strptime(until_text, "%d/%m/%Y").replace(hour=23, minute=59, second=59)
+            if until < task_datetime:
+                raise ValueError("A data de término é anterior à primeira ocorrência")
+            rule["until"] = until.strftime("%Y-%m-%d %H:%M:%S")
+        return rule
+
+    def set_recurrence_form(self, rule):
+        """Preenche os campos de repetição (None limpa os campos)"""
+        rule = rule or {}
+        self.recurrence_var.set(RECURRENCE_LABELS.get(rule.get("freq") or "", RECURRENCE_LABELS[""]))
+        self.recurrence_interval_var.set(rule.get("interval", 1))
+        self.recurrence_count_var.set(rule.get("count", 0))
+        weekdays = rule.get("weekdays") or []
+        for weekday, var in enumerate(self.recurrence_weekday_vars):
+            var.set(weekday in weekdays)
+        self.recurrence_until_entry.delete(0, tk.END)
+        if rule.get("until"):
+            until = datetime.strptime(rule["until"], "%Y-%m-%d %H:%M:%S")
+            self.recurrence_until_entry.insert(0, until.strftime("%d/%m/%Y"))
+
     def setup_settings_tab(self):
         """Configura a aba de configurações"""
-        settings_frame = ttk.Frame(self.notebook)
-        self.notebook.add(settings_frame, text="⚙️ Configurações")
+        settings_tab = ttk.Frame(self.notebook)
+        self.notebook.add(settings_tab, text="⚙️ Configurações")
+        settings_tab.columnconfigure(0, weight=1)
+        settings_tab.rowconfigure(0, weight=1)
+        
+        # As seções rolam dentro de um canvas; os botões de ação ficam sempre visíveis embaixo
+        canvas = tk.Canvas(settings_tab, highlightthickness=0,
+                           background=ttk.Style().lookup('TFrame', 'background'))
+        vsb = ttk.Scrollbar(settings_tab, orient="vertical", command=canvas.yview)
+        canvas.configure(yscrollcommand=vsb.set)
+        canvas.grid(row=0, column=0, sticky=(tk.N, tk.S, tk.W, tk.E))
+        vsb.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        
+        settings_frame = ttk.Frame(canvas)
+        content = canvas.create_window((0, 0), window=settings_frame, anchor=tk.NW)
+        settings_frame.bind('<Configure>', lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.bind('<Configure>', lambda e: canvas.itemconfigure(content, width=e.width))
+        
+        def on_mousewheel(event):
+            # Só rola com o ponteiro sobre a aba (a tabela de tarefas tem a própria rolagem)
+            if not str(event.widget).startswith(str(canvas)):
+                return
+            up = event.num == 4 or event.delta > 0
+            canvas.yview_scroll(-1 if up else 1, "units")
+        
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.root.bind_all(sequence, on_mousewheel, add='+')
         
         settings_frame.columnconfigure(0, weight=1)
         
@@ -786,6 +4187,133 @@ class TaskReminderApp:
         interval_spinbox.grid(row=0, column=0)
         row += 1
         
+        # Formato do arquivo de tarefas
+        ttk.Label(general_frame, text="Formato do arquivo de tarefas:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.storage_format_label_var = tk.StringVar(
+            value=STORAGE_FORMATS[self.config.get("storage_format", "json")])
+        ttk.Combobox(
+            general_frame,
+            textvariable=self.storage_format_label_var,
+            values=list(STORAGE_FORMATS.values()),
+            state="readonly",
+            width=28
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        # Mesmo arquivo usado por outros computadores
+        self.shared_file_var = tk.BooleanVar(value=self.config.get("shared_file", False))
+        ttk.Checkbutton(
+            general_frame,
+            text="Arquivo de tarefas compartilhado (pasta sincronizada ou de rede)",
+            variable=self.shared_file_var
+        ).grid(row=row, column=0, columnspan=2, sticky=tk.W, pady=5)
+        row += 1
+        
+        # Backups compactados do arquivo de tarefas
+        ttk.Label(general_frame, text="Backups do arquivo de tarefas (0 = nenhum):").grid(
+            row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.backup_count_var = tk.IntVar(value=self.config.get("backup_count", 5))
+        ttk.Spinbox(
+            general_frame,
+            from_=0,
+            to=50,
+            textvariable=self.backup_count_var,
+            width=10
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        # Arquivo de concluídas
+        ttk.Label(general_frame, text="Arquivar concluídas após (dias, 0 = nunca):").grid(
+            row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.archive_after_days_var = tk.IntVar(value=self.config.get("archive_after_days", 90))
+        ttk.Spinbox(
+            general_frame,
+            from_=0,
+            to=3650,
+            increment=30,
+            textvariable=self.archive_after_days_var,
+            width=10
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        # Insistência para tarefas críticas
+        ttk.Label(general_frame, text="Insistir até confirmar, após:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.escalation_intervals_var = tk.StringVar(
+            value=format_reminder_offsets(self.get_escalation_intervals()))
+        ttk.Entry(
+            general_frame,
+            textvariable=self.escalation_intervals_var,
+            width=25
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        # Tamanho do histórico de desfazer
+        ttk.Label(general_frame, text="Ações que podem ser desfeitas (Ctrl+Z):").grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.undo_history_var = tk.IntVar(value=self.config.get("undo_history_limit", 50))
+        ttk.Spinbox(
+            general_frame,
+            from_=1,
+            to=500,
+            textvariable=self.undo_history_var,
+            width=10
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        # Limite de notificações (prioridade alta não espera)
+        ttk.Label(general_frame, text="Máximo de notificações por minuto:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.max_notifications_var = tk.IntVar(value=self.config.get("max_notifications_per_minute", 3))
+        ttk.Spinbox(
+            general_frame,
+            from_=1,
+            to=60,
+            textvariable=self.max_notifications_var,
+            width=10
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        # API local
+        self.api_enabled_var = tk.BooleanVar(value=self.config.get("api_enabled", False))
+        ttk.Checkbutton(
+            general_frame,
+            text="Ativar API local (127.0.0.1), porta:",
+            variable=self.api_enabled_var
+        ).grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        self.api_port_var = tk.IntVar(value=self.config.get("api_port", 8765))
+        ttk.Spinbox(
+            general_frame,
+            from_=1024,
+            to=65535,
+            textvariable=self.api_port_var,
+            width=10
+        ).grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        row += 1
+        
+        ttk.Label(general_frame, text="Token da API:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        
+        token_frame = ttk.Frame(general_frame)
+        token_frame.grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        self.api_token_var = tk.StringVar(value=self.config.get("api_token", ""))
+        ttk.Entry(
+            token_frame,
+            textvariable=self.api_token_var,
+            state="readonly",
+            width=36
+        ).grid(row=0, column=0)
+        ttk.Button(
+            token_frame,
+            text="🔑 Novo",
+            command=self.new_api_token,
+            width=8
+        ).grid(row=0, column=1, padx=(5, 0))
+        row += 1
+        
         # Tema
         ttk.Label(general_frame, text="Tema:").grid(row=row, column=0, sticky=tk.W, pady=5)
         
@@ -800,9 +4328,15 @@ class TaskReminderApp:
         theme_combo.grid(row=row, column=1, sticky=tk.W, pady=5, padx=(10, 0))
         row += 1
         
+        # Horário silencioso
+        self.setup_quiet_hours_section(settings_frame, row=1)
+        
+        # Diagnóstico
+        self.setup_diagnostics_section(settings_frame, row=2)
+        
         # Botões de ação
-        button_frame = ttk.Frame(settings_frame)
-        button_frame.grid(row=1, column=0, pady=20)
+        button_frame = ttk.Frame(settings_tab)
+        button_frame.grid(row=1, column=0, columnspan=2, pady=10)
         
         ttk.Button(
             button_frame,
@@ -826,6 +4360,137 @@ class TaskReminderApp:
             width=30
         ).grid(row=0, column=2, padx=5)
 
+    def setup_quiet_hours_section(self, parent, row):
+        """Configura os horários silenciosos de cada dia da semana"""
+        quiet_frame = ttk.LabelFrame(parent, text="Horário Silencioso", padding="15")
+        quiet_frame.grid(row=row, column=0, sticky=(tk.W, tk.E), padx=10, pady=(0, 10))
+        
+        ttk.Label(
+            quiet_frame,
+            text="Notificações nesses horários são entregues num resumo ao final (ex.: 22:00-07:00, 12:00-13:00)",
+            foreground=self.colors['pending']
+        ).grid(row=0, column=0, columnspan=4, sticky=tk.W, pady=(0, 5))
+        
+        texts = self.config.get("quiet_hours") or [""] * 7
+        self.quiet_hours_vars = []
+        for weekday, label in enumerate(WEEKDAY_LABELS):
+            var = tk.StringVar(value=texts[weekday] if weekday < len(texts) else "")
+            self.quiet_hours_vars.append(var)
+            # Dois blocos lado a lado: segunda a quinta e sexta a domingo
+            grid_row, grid_column = weekday % 4 + 1, weekday // 4 * 2
+            ttk.Label(quiet_frame, text=f"{label}:").grid(row=grid_row, column=grid_column, sticky=tk.W, pady=2)
+            ttk.Entry(
+                quiet_frame,
+                textvariable=var,
+                width=25
+            ).grid(row=grid_row, column=grid_column + 1, sticky=tk.W, pady=2, padx=(10, 20))
+
+    def setup_diagnostics_section(self, parent, row):
+        """Configura a seção de diagnóstico (perfis e contadores de tempo)"""
+        diagnostics_frame = ttk.LabelFrame(parent, text="Diagnóstico", padding="15")
+        diagnostics_frame.grid(row=row, column=0, sticky=(tk.W, tk.E), padx=10, pady=(0, 10))
+        diagnostics_frame.columnconfigure(1, weight=1)
+        
+        # Duração da coleta
+        ttk.Label(diagnostics_frame, text="Duração da coleta (segundos):").grid(row=0, column=0, sticky=tk.W, pady=5)
+        
+        self.profile_duration_var = tk.IntVar(value=self.config.get("profile_duration", 30))
+        ttk.Spinbox(
+            diagnostics_frame,
+            from_=5,
+            to=600,
+            increment=5,
+            textvariable=self.profile_duration_var,
+            width=10
+        ).grid(row=0, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Botões de coleta
+        profile_frame = ttk.Frame(diagnostics_frame)
+        profile_frame.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        self.cpu_profile_button = ttk.Button(
+            profile_frame,
+            text="⏱️ Perfil de CPU",
+            command=self.start_cpu_profile,
+            width=20
+        )
+        self.cpu_profile_button.grid(row=0, column=0, padx=(0, 5))
+        
+        self.memory_profile_button = ttk.Button(
+            profile_frame,
+            text="🧠 Perfil de Memória",
+            command=self.start_memory_profile,
+            width=20
+        )
+        self.memory_profile_button.grid(row=0, column=1, padx=5)
+        
+        self.diagnostics_status_var = tk.StringVar(value="Nenhuma coleta em andamento")
+        ttk.Label(
+            diagnostics_frame,
+            textvariable=self.diagnostics_status_var
+        ).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Contadores por operação
+        ttk.Label(diagnostics_frame, text="Tempo por operação:").grid(row=3, column=0, sticky=(tk.W, tk.N), pady=5)
+        
+        self.perf_counters_var = tk.StringVar(value=self.perf.format_counters())
+        ttk.Label(
+            diagnostics_frame,
+            textvariable=self.perf_counters_var,
+            font=('Consolas', 9),
+            justify=tk.LEFT
+        ).grid(row=3, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        counters_frame = ttk.Frame(diagnostics_frame)
+        counters_frame.grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
+        ttk.Button(
+            counters_frame,
+            text="🔄 Atualizar Contadores",
+            command=self.refresh_perf_counters,
+            width=22
+        ).grid(row=0, column=0, padx=(0, 5))
+        
+        ttk.Button(
+            counters_frame,
+            text="🧹 Zerar Contadores",
+            command=self.reset_perf_counters,
+            width=20
+        ).grid(row=0, column=1, padx=5)
+        
+        # Log
+        ttk.Label(diagnostics_frame, text="Nível de log:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        
+        log_frame = ttk.Frame(diagnostics_frame)
+        log_frame.grid(row=5, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        self.log_level_var = tk.StringVar(value=self.config.get("log_level", "INFO"))
+        ttk.Combobox(
+            log_frame,
+            textvariable=self.log_level_var,
+            values=LOG_LEVELS,
+            state="readonly",
+            width=10
+        ).grid(row=0, column=0)
+        
+        ttk.Button(
+            log_frame,
+            text="📜 Ver Log",
+            command=self.show_log_viewer,
+            width=12
+        ).grid(row=0, column=1, padx=(10, 0))
+        
+        # Tempo de inicialização
+        ttk.Label(diagnostics_frame, text="Última inicialização:").grid(row=6, column=0, sticky=(tk.W, tk.N), pady=5)
+        
+        self.startup_report_var = tk.StringVar(value="Em andamento...")
+        ttk.Label(
+            diagnostics_frame,
+            textvariable=self.startup_report_var,
+            wraplength=550,
+            justify=tk.LEFT
+        ).grid(row=6, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+
     def setup_status_bar(self):
         """Configura a barra de status"""
         self.status_var = tk.StringVar(value="👌 Pronto")
@@ -866,7 +4531,7 @@ class TaskReminderApp:
             datetime.strptime(datetime_str, "%d/%m/%Y %H:%M")
             return True
         except ValueError as e:
-            print(f"Erro na validação: {e}")
+            logger.debug("Data/hora inválida: %s", e)
             return False
 
     def on_task_select(self, event=None):
@@ -934,49 +4599,36 @@ class TaskReminderApp:
         
         # Adicionar nova tarefa
         task_datetime = datetime.strptime(f"{date_str} {hour_str}:{minute_str}", "%d/%m/%Y %H:%M")
-        now = datetime.now()
-        
-        task = {
-            "id": max([t['id'] for t in self.tasks], default=0) + 1,
-            "task": task_text,
-            "datetime": task_datetime.strftime("%Y-%m-%d %H:%M:%S"),
-            "reminder_5min": self.reminder_5min.get(),
-            "reminder_10min": self.reminder_10min.get(),
-            "reminder_30min": self.reminder_30min.get(),
-            "reminder_1h": self.reminder_1h.get(),
-            "status": "Pendente",
-            "created_at": now.strftime("%Y-%m-%d %H:%M:%S"),
-            "is_overdue": task_datetime < now
-        }
-        
-        # Adicionar à lista
-        self.tasks.append(task)
-        
-        # Salvar no arquivo
-        self.save_tasks()
-        
-        # Atualizar interface
-        self.load_tasks_to_table()
         
-        # Agendar notificações
-        self.schedule_task_notifications(task)
+        try:
+            recurrence = self.get_recurrence_from_form(task_datetime)
+        except ValueError as e:
+            messagebox.showerror("Erro", f"Repetição inválida!\n\n{e}")
+            return
         
-        # Limpar campos
-        self.task_entry.delete(0, tk.END)
+        try:
+            reminders = parse_reminder_offsets(self.reminders_var.get())
+        except ValueError as e:
+            messagebox.showerror("Erro", f"{e}\n\nUse intervalos como: 5m, 15m, 1h, 1d")
+            return
         
-        # Resetar para próxima hora
-        next_hour = (datetime.now() + timedelta(hours=1))
-        if TKCALENDAR_AVAILABLE:
-            self.date_entry.set_date(next_hour)
+        task = self.new_task(
+            self.next_task_id(),
+            task_text,
+            task_datetime,
+            reminders=reminders,
+            priority=parse_priority(self.priority_var.get()),
+            list_name=self.list_var.get().strip(),
+            tags=parse_tags(self.tags_var.get()),
+            recurrence=recurrence,
+            escalate=self.escalate_var.get()
+        )
         
-        self.time_spinbox_hour.set(next_hour.strftime("%H"))
-        self.time_spinbox_minute.set("00")
+        # Adicionar, salvar, atualizar a tabela e agendar
+        self.commit_new_tasks([task], "Adicionar tarefa")
         
-        # Resetar lembretes
-        self.reminder_5min.set(False)
-        self.reminder_10min.set(False)
-        self.reminder_30min.set(False)
-        self.reminder_1h.set(False)
+        # Limpar campos e resetar para próxima hora
+        self.clear_task_form()
         
         # Atualizar status
         self.status_var.set(f"✅ Tarefa '{task_text[:30]}...' adicionada")
@@ -984,6 +4636,38 @@ class TaskReminderApp:
         # Voltar o foco para a descrição
         self.task_entry.focus()
 
+    def next_task_id(self):
+        # IDs de tarefas arquivadas não são reaproveitados
+        return max(next_task_id(self.tasks), self.archive.max_id + 1)
+
+    def new_task(self, task_id, text, task_datetime, **fields):
+        """Monta o dicionário de uma tarefa nova no fuso do sistema (ainda fora da lista)"""
+        return build_task(task_id, text, task_datetime, self.system_zone, **fields)
+
+    @timed_operation("add")
+    def commit_new_tasks(self, tasks, label):
+        """Inclui tarefas novas com uma única gravação, atualização da tabela e passada no agendador"""
+        start = len(self.tasks)
+        self.tasks.extend(tasks)
+        if len(tasks) == 1:
+            self.due_index.update(tasks[0])
+        else:
+            # Em lote, intercalar uma vez é mais barato que inserir uma a uma
+            self.due_index.add_many(tasks)
+        for task in tasks:
+            self.tag_index.update(task)
+        self.history.record(label, [('delete', [t['id'] for t in tasks])],
+                            [('insert', list(enumerate(tasks, start)))])
+        
+        self.save_tasks()
+        self.load_tasks_to_table()
+        
+        for task in tasks:
+            self.schedule_task_notifications(task)
+        logger.info("%d tarefa(s) incluída(s): %s", len(tasks), label)
+        self.events.publish("task.created", {"ids": [t['id'] for t in tasks]})
+
+    @timed_operation("update")
     def update_task(self):
         """Atualiza uma tarefa existente"""
         task_text = self.task_entry.get().strip()
@@ -1027,27 +4711,53 @@ class TaskReminderApp:
         task_datetime = datetime.strptime(f"{date_str} {hour_str}:{minute_str}", "%d/%m/%Y %H:%M")
         now = datetime.now()
         
+        try:
+            recurrence = self.get_recurrence_from_form(task_datetime)
+        except ValueError as e:
+            messagebox.showerror("Erro", f"Repetição inválida!\n\n{e}")
+            return
+        
+        try:
+            reminders = parse_reminder_offsets(self.reminders_var.get())
+        except ValueError as e:
+            messagebox.showerror("Erro", f"{e}\n\nUse intervalos como: 5m, 15m, 1h, 1d")
+            return
+        
         for task in self.tasks:
             if task['id'] == self.editing_task_id:
+                before = dict(task)
                 task['task'] = task_text
-                task['datetime'] = task_datetime.strftime("%Y-%m-%d %H:%M:%S")
-                task['reminder_5min'] = self.reminder_5min.get()
-                task['reminder_10min'] = self.reminder_10min.get()
-                task['reminder_30min'] = self.reminder_30min.get()
-                task['reminder_1h'] = self.reminder_1h.get()
+                self.set_task_due(task, task_datetime)
+                task['reminders'] = reminders
+                task['priority'] = parse_priority(self.priority_var.get())
+                task['list'] = self.list_var.get().strip() or DEFAULT_LIST
+                task['tags'] = parse_tags(self.tags_var.get())
+                clear_snooze(task)
+                if self.escalate_var.get():
+                    task['escalate'] = True
+                else:
+                    task.pop('escalate', None)
+                self.acknowledge_task(task)
                 task['status'] = "Pendente"
                 task['is_overdue'] = task_datetime < now
+                if recurrence:
+                    if recurrence != task.get('recurrence'):
+                        task['occurrence'] = 1
+                    task['recurrence'] = recurrence
+                else:
+                    task.pop('recurrence', None)
+                    task.pop('occurrence', None)
+                self.due_index.update(task)
+                self.tag_index.update(task)
+                self.record_update("Editar tarefa", [(task, before)])
                 
                 self.save_tasks()
                 self.load_tasks_to_table()
                 
-                self.reschedule_all_tasks()
+                # Só os disparos desta tarefa são refeitos
+                self.reschedule_task(task)
                 
-                self.task_entry.delete(0, tk.END)
-                self.reminder_5min.set(False)
-                self.reminder_10min.set(False)
-                self.reminder_30min.set(False)
-                self.reminder_1h.set(False)
+                self.clear_task_form(reset_datetime=False)
                 
                 self.editing_task_id = None
                 self.toggle_edit_buttons(editing=False)
@@ -1062,24 +4772,29 @@ class TaskReminderApp:
         self.editing_task_id = None
         self.toggle_edit_buttons(editing=False)
         
-        self.task_entry.delete(0, tk.END)
-        
-        next_hour = datetime.now() + timedelta(hours=1)
-        if TKCALENDAR_AVAILABLE:
-            self.date_entry.set_date(next_hour)
-        
-        self.time_spinbox_hour.set(next_hour.strftime("%H"))
-        self.time_spinbox_minute.set("00")
-        
-        self.reminder_5min.set(False)
-        self.reminder_10min.set(False)
-        self.reminder_30min.set(False)
-        self.reminder_1h.set(False)
+        self.clear_task_form()
         
         self.task_entry.focus()
         
         self.status_var.set("Edição cancelada")
 
+    def clear_task_form(self, reset_datetime=True):
+        """Limpa os campos da tarefa e, opcionalmente, volta a data para a próxima hora"""
+        self.task_entry.delete(0, tk.END)
+        self.reminders_var.set("")
+        self.escalate_var.set(False)
+        self.priority_var.set(PRIORITY_LABELS[PRIORITY_NORMAL])
+        self.tags_var.set("")
+        self.set_recurrence_form(None)
+        
+        if reset_datetime:
+            next_hour = datetime.now() + timedelta(hours=1)
+            if TKCALENDAR_AVAILABLE:
+                self.date_entry.set_date(next_hour)
+            
+            self.time_spinbox_hour.set(next_hour.strftime("%H"))
+            self.time_spinbox_minute.set("00")
+
     def edit_selected_task(self):
         """Carrega a tarefa selecionada para edição"""
         selected = self.tree.selection()
@@ -1107,10 +4822,12 @@ class TaskReminderApp:
                 self.time_spinbox_hour.set(task_datetime.strftime("%H"))
                 self.time_spinbox_minute.set(task_datetime.strftime("%M"))
                 
-                self.reminder_5min.set(task.get('reminder_5min', False))
-                self.reminder_10min.set(task.get('reminder_10min', False))
-                self.reminder_30min.set(task.get('reminder_30min', False))
-                self.reminder_1h.set(task.get('reminder_1h', False))
+                self.reminders_var.set(format_reminder_offsets(task.get('reminders', [])))
+                self.escalate_var.set(task.get('escalate', False))
+                self.priority_var.set(PRIORITY_LABELS[task_priority(task)])
+                self.list_var.set(task.get('list') or DEFAULT_LIST)
+                self.tags_var.set(format_tags(task.get('tags', ())))
+                self.set_recurrence_form(task.get('recurrence'))
                 
                 self.editing_task_id = task_id
                 self.toggle_edit_buttons(editing=True)
@@ -1133,8 +4850,13 @@ class TaskReminderApp:
         if messagebox.askyesno("Confirmar Exclusão", 
                               f"Deseja realmente excluir a tarefa?\n\n"
                               f"'{task_text[:50]}...'"):
-            # Remover da lista
+            # Remover da lista (a posição fica guardada para desfazer)
+            removed = [(i, t) for i, t in enumerate(self.tasks) if t['id'] == task_id]
+            self.history.record("Excluir tarefa", [('insert', removed)], [('delete', [task_id])])
             self.tasks = [t for t in self.tasks if t['id'] != task_id]
+            self.due_index.discard(task_id)
+            self.tag_index.discard(task_id)
+            self.events.publish("task.deleted", {"id": task_id})
             
             # Salvar alterações
             self.save_tasks()
@@ -1142,15 +4864,11 @@ class TaskReminderApp:
             # Atualizar interface
             self.load_tasks_to_table()
             
-            # Reagendar notificações
-            self.reschedule_all_tasks()
+            # Só os disparos desta tarefa deixam o agendador
+            self.scheduler.cancel_task(task_id)
 
             if self.editing_task_id == task_id:
-                self.task_entry.delete(0, tk.END)
-                self.reminder_5min.set(False)
-                self.reminder_10min.set(False)
-                self.reminder_30min.set(False)
-                self.reminder_1h.set(False)
+                self.clear_task_form(reset_datetime=False)
                 self.editing_task_id = None
                 self.toggle_edit_buttons(editing=False)
             
@@ -1166,18 +4884,196 @@ class TaskReminderApp:
         item = self.tree.item(selected[0])
         task_id = item['values'][0]
         
+        self.complete_task(task_id)
+
+    def find_task(self, task_id):
+        """Retorna a tarefa com o ID informado ou None"""
         for task in self.tasks:
             if task['id'] == task_id:
-                task['status'] = 'Concluída'
-                task['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                break
+                return task
+        return None
+
+    def complete_task(self, task_id):
+        """Marca uma tarefa como concluída pelo ID"""
+        task = self.find_task(task_id)
+        if task is None:
+            return None
+        
+        before = dict(task)
+        self.mark_task_completed(task)
+        self.record_update("Concluir tarefa", [(task, before)])
         
         self.save_tasks()
         self.load_tasks_to_table()
         
-        self.reschedule_all_tasks()
+        if task['status'] == 'Concluída':
+            self.status_var.set("✅ Tarefa marcada como concluída")
+        else:
+            self.status_var.set(f"✅ Ocorrência concluída; próxima em {task['datetime']}")
+        return task
+
+    def record_update(self, label, changes):
+        """Registra alterações de campos para desfazer; changes é [(tarefa, cópia anterior)]"""
+        undo, redo = {}, {}
+        for task, before in changes:
+            keys = [k for k in set(task) | set(before) if task.get(k) != before.get(k)]
+            if keys:
+                undo[task['id']] = {k: before.get(k) for k in keys}
+                redo[task['id']] = {k: task.get(k) for k in keys}
+        if undo:
+            self.history.record(label, [('update', undo)], [('update', redo)])
+
+    def undo_last(self):
+        """Desfaz a última ação sobre as tarefas"""
+        entry = self.history.undo()
+        if entry is None:
+            self.status_var.set("Nada para desfazer")
+            return
+        label, operations = entry
+        self.apply_operations(operations)
+        self.status_var.set(f"↩️ Desfeito: {label}")
+
+    def redo_last(self):
+        """Refaz a última ação desfeita"""
+        entry = self.history.redo()
+        if entry is None:
+            self.status_var.set("Nada para refazer")
+            return
+        label, operations = entry
+        self.apply_operations(operations)
+        self.status_var.set(f"↪️ Refeito: {label}")
+
+    @timed_operation("undo")
+    def apply_operations(self, operations):
+        """Aplica operações de desfazer/refazer e sincroniza índices e agendamentos"""
+        touched = set()
+        for kind, payload in operations:
+            if kind == 'insert':
+                existing = {t['id'] for t in self.tasks}
+                for position, task in payload:
+                    if task['id'] not in existing:
+                        self.tasks.insert(min(position, len(self.tasks)), task)
+                        touched.add(task['id'])
+            elif kind == 'delete':
+                ids = set(payload)
+                self.tasks = [t for t in self.tasks if t['id'] not in ids]
+                touched |= ids
+            elif kind == 'update':
+                for task in self.tasks:
+                    if task['id'] in payload:
+                        apply_task_fields(task, payload[task['id']])
+                touched |= set(payload)
+            elif kind == 'archive':
+                self.archive.add(payload)
+            elif kind == 'unarchive':
+                self.archive.remove(payload)
+        
+        present = {t['id']: t for t in self.tasks if t['id'] in touched}
+        for task_id in touched:
+            task = present.get(task_id)
+            if task is None:
+                self.due_index.discard(task_id)
+                self.tag_index.discard(task_id)
+                self.scheduler.cancel_task(task_id)
+            else:
+                self.acknowledge_task(task)
+                self.due_index.update(task)
+                self.tag_index.update(task)
+                self.reschedule_task(task)
+        
+        if self.editing_task_id in touched:
+            self.editing_task_id = None
+            self.toggle_edit_buttons(editing=False)
+            self.clear_task_form(reset_datetime=False)
+        
+        self.save_tasks()
+        self.load_tasks_to_table()
+        logger.info("%d tarefa(s) alteradas por desfazer/refazer", len(touched))
+
+    def mark_task_completed(self, task):
+        """Conclui a ocorrência atual: a recorrente é reagendada para a próxima, as demais
+        (e as que terminaram) saem do índice de vencimentos"""
+        self.acknowledge_task(task)
+        # Os disparos da ocorrência concluída saem antes de a próxima ser agendada
+        self.scheduler.cancel_task(task['id'])
+        if complete_occurrence(task, self.system_zone):
+            self.due_index.update(task)
+            self.schedule_task_notifications(task)
+        else:
+            self.due_index.discard(task['id'])
+        self.events.publish("task.completed", {"id": task['id']})
+
+    def snooze_task(self, task_id, minutes):
+        """Adia a notificação da tarefa, reagendando só a entrada dela"""
+        task = self.find_task(task_id)
+        if task is None:
+            return
+        
+        snooze_at = int(time.time()) + minutes * 60
+        snoozed_until = epoch_to_wall(snooze_at, self.system_zone)
+        fields = {'snoozed_until': snoozed_until.strftime("%Y-%m-%d %H:%M:%S"), 'snooze_at': snooze_at}
+        if not task.get('recurrence'):
+            # Tarefa única concluída pelo disparo volta a ficar pendente
+            fields.update(status='Pendente', is_overdue=False, completed_at=None)
+        
+        self.acknowledge_task(task)
+        self.save_task_fields(task, fields)
+        self.due_index.update(task)
+        self.arm_snooze(task)
+        self.refresh_task_row(task)
+        
+        logger.info("Tarefa adiada até %s", fields['snoozed_until'], extra={"task_id": task_id})
+        self.status_var.set(f"💤 Tarefa adiada para {snoozed_until.strftime('%H:%M')}")
+
+    def save_task_fields(self, task, fields):
+        """Aplica uma alteração pequena e a grava no diário em vez de reescrever o tasks.json
+        (no arquivo compartilhado a gravação completa passa pelo merge)"""
+        apply_task_fields(task, fields)
+        if self.store.shared:
+            self.save_tasks()
+            return
+        try:
+            self.journal.append(task['id'], fields)
+        except OSError:
+            logger.exception("Erro ao registrar alteração no diário", extra={"task_id": task['id']})
+            self.save_tasks()
+
+    def snooze_reminder(self, task_id, offset, minutes):
+        """Adia um lembrete: só a entrada dele volta ao agendador; o horário da tarefa não muda"""
+        task = self.find_task(task_id)
+        if task is None or task.get('status') != 'Pendente':
+            return
+        
+        snooze_at = time.time() + minutes * 60
+        if snooze_at >= task['due_at']:
+            # O aviso do horário da tarefa chega antes do lembrete adiado
+            self.status_var.set("💤 A tarefa vence antes disso; o aviso do horário continua agendado")
+            return
+        
+        self.scheduler.arm(
+            (task_id, 'reminder', offset),
+            snooze_at,
+            lambda: self.send_reminder_notification(task_id, task['task'], offset)
+        )
+        logger.info("Lembrete adiado por %d min", minutes, extra={"task_id": task_id})
+        self.status_var.set(f"💤 Lembrete adiado para {datetime.fromtimestamp(snooze_at).strftime('%H:%M')}")
+
+    def arm_snooze(self, task):
+        """Arma o disparo do adiamento da tarefa, se ainda estiver no futuro"""
+        snooze_at = task.get('snooze_at')
+        if snooze_at is None:
+            snooze_at = wall_to_epoch(datetime.strptime(task['snoozed_until'], "%Y-%m-%d %H:%M:%S"),
+                                      self.system_zone)
+        if snooze_at <= time.time():
+            return False
         
-        self.status_var.set("✅ Tarefa marcada como concluída")
+        task_id = task['id']
+        self.scheduler.arm(
+            (task_id, 'snooze'),
+            snooze_at,
+            lambda: self.send_main_notification(task_id, task['task'], snoozed=True)
+        )
+        return True
 
     def clear_completed_tasks(self):
         """Remove todas as tarefas concluídas"""
@@ -1190,116 +5086,412 @@ class TaskReminderApp:
         if messagebox.askyesno("Confirmar", 
                               f"Deseja remover {len(completed_tasks)} tarefa(s) concluída(s)?"):
 
+            removed = [(i, t) for i, t in enumerate(self.tasks) if t.get('status') == 'Concluída']
+            self.history.record("Limpar concluídas", [('insert', removed)],
+                                [('delete', [t['id'] for _, t in removed])])
             self.tasks = [t for t in self.tasks if t.get('status') != 'Concluída']
+            for task in completed_tasks:
+                self.tag_index.discard(task['id'])
+                self.scheduler.cancel_task(task['id'])
             
             self.save_tasks()
             self.load_tasks_to_table()
             
-            # Reagendar notificações
-            self.reschedule_all_tasks()
-            
             self.status_var.set(f"🧹 {len(completed_tasks)} tarefa(s) concluída(s) removida(s)")
 
+    ARCHIVE_INTERVAL = 24 * 60 * 60 * 1000
+
+    @timed_operation("archive")
+    def archive_completed_tasks(self, reschedule=True):
+        """Move para o arquivo as tarefas concluídas há mais de N dias"""
+        if reschedule:
+            self.root.after(self.ARCHIVE_INTERVAL, self.archive_completed_tasks)
+        
+        days = self.config.get("archive_after_days", 90)
+        if not days:
+            return
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        old = [t for t in self.tasks
+               if t.get('status') == 'Concluída' and (t.get('completed_at') or t['datetime']) < cutoff]
+        if not old:
+            return
+        
+        try:
+            self.archive.add(old)
+        except OSError:
+            logger.exception("Erro ao arquivar tarefas concluídas")
+            self.unarchive_tasks(old)
+            return
+        
+        archived = {t['id'] for t in old}
+        removed = [(i, t) for i, t in enumerate(self.tasks) if t['id'] in archived]
+        self.tasks = [t for t in self.tasks if t['id'] not in archived]
+        self.save_tasks(on_saved=lambda saved: self.finish_archive(saved, old, removed, days))
+
+    def finish_archive(self, saved, old, removed, days):
+        """Conclui o arquivamento depois que o tasks.json foi gravado (ou o desfaz)"""
+        archived = {t['id'] for t in old}
+        if not saved:
+            # O tasks.json ainda as tem: tirar do arquivo para não ficarem nos dois.
+            # No arquivo compartilhado a lista pode ter mudado enquanto a gravação esperava
+            for index, task in removed:
+                if self.find_task(task['id']) is None:
+                    self.tasks.insert(min(index, len(self.tasks)), task)
+            self.unarchive_tasks(old)
+            return
+        
+        self.history.record("Arquivar concluídas", [('unarchive', old), ('insert', removed)],
+                            [('delete', sorted(archived)), ('archive', old)])
+        for task_id in archived:
+            self.tag_index.discard(task_id)
+            self.scheduler.cancel_task(task_id)
+        self.load_tasks_to_table()
+        
+        logger.info("%d tarefa(s) concluída(s) há mais de %d dias arquivada(s)", len(old), days)
+        self.status_var.set(f"📦 {len(old)} tarefa(s) concluída(s) movida(s) para o arquivo")
+
+    def unarchive_tasks(self, tasks):
+        """Desfaz uma inclusão no arquivo que não pôde ser concluída"""
+        try:
+            self.archive.remove(tasks)
+        except OSError:
+            logger.exception("Erro ao desfazer o arquivamento de %d tarefa(s)", len(tasks))
+
+    def restore_archived_task(self, task):
+        """Traz de volta à lista uma tarefa arquivada (com novo ID se o antigo estiver em uso)"""
+        self.archive.remove([task])
+        task = dict(task)
+        if self.find_task(task['id']) is not None:
+            task['id'] = self.next_task_id()
+        self.commit_new_tasks([task], "Restaurar do arquivo")
+        self.status_var.set(f"📦 Tarefa '{task['task'][:30]}...' restaurada do arquivo")
+        return task
+
+    def show_archive_viewer(self):
+        """Abre uma janela para buscar e restaurar tarefas arquivadas"""
+        viewer = tk.Toplevel(self.root)
+        viewer.title("Task Reminder - Arquivo")
+        viewer.geometry("800x450")
+        viewer.columnconfigure(0, weight=1)
+        viewer.rowconfigure(1, weight=1)
+        
+        search_frame = ttk.Frame(viewer, padding=5)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        search_frame.columnconfigure(1, weight=1)
+        
+        ttk.Label(search_frame, text="Texto ou @etiqueta:").grid(row=0, column=0, padx=(0, 5))
+        search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=search_var)
+        search_entry.grid(row=0, column=1, sticky=(tk.W, tk.E))
+        
+        columns = ("Concluída em", "Tarefa", "Etiquetas")
+        tree = ttk.Treeview(viewer, columns=columns, show="headings")
+        for column, width in zip(columns, (130, 480, 150)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        vsb = ttk.Scrollbar(viewer, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        vsb.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        
+        status_var = tk.StringVar(value=f"{self.archive.count} tarefa(s) no arquivo")
+        results = {}
+        
+        def show(found):
+            if not viewer.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            results.clear()
+            for position, task in enumerate(found):
+                results[str(position)] = task
+                completed = datetime.strptime(task.get('completed_at') or task['datetime'], "%Y-%m-%d %H:%M:%S")
+                tree.insert("", tk.END, iid=str(position), values=(
+                    completed.strftime("%d/%m/%Y %H:%M"), task['task'], format_tags(task.get('tags', []))))
+            status_var.set(f"{len(found)} resultado(s) de {self.archive.count} tarefa(s) no arquivo")
+        
+        def search():
+            text = search_var.get()
+            status_var.set("🔍 Buscando...")
+            # Os segmentos são lidos fora da interface
+            threading.Thread(target=lambda: self.root.after(0, show, self.archive.search(text)),
+                             name="ArchiveSearch", daemon=True).start()
+        
+        def restore():
+            for iid in tree.selection():
+                self.restore_archived_task(results[iid])
+            search()
+        
+        ttk.Button(search_frame, text="🔍 Buscar", command=search, width=12).grid(row=0, column=2, padx=(5, 0))
+        search_entry.bind('<Return>', lambda e: search())
+        
+        button_frame = ttk.Frame(viewer, padding=5)
+        button_frame.grid(row=2, column=0, columnspan=2)
+        ttk.Label(button_frame, textvariable=status_var).grid(row=0, column=0, padx=(0, 10))
+        ttk.Button(button_frame, text="♻️ Restaurar", command=restore, width=15).grid(row=0, column=1, padx=2)
+        
+        search_entry.focus()
+        search()
+
+    @timed_operation("refresh")
     def load_tasks_to_table(self):
         """Carrega as tarefas na tabela com cores por status"""
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Ordenar tarefas
-        pending_tasks = [t for t in self.tasks if t.get('status') == 'Pendente']
-        completed_tasks = [t for t in self.tasks if t.get('status') == 'Concluída']
+        # Com filtro, só as tarefas da lista/etiqueta são percorridas
+        tasks = self.tasks if self.active_filter is None else self.tag_index.tasks(self.active_filter)
         
-        # Ordenar pendentes por data
-        pending_tasks.sort(key=lambda x: x['datetime'])
+        # Ordenar tarefas (atrasadas continuam entre as pendentes)
+        pending_tasks = [t for t in tasks if t.get('status') != 'Concluída']
+        completed_tasks = [t for t in tasks if t.get('status') == 'Concluída']
+        
+        # Ordenar pendentes por data ou pela coluna escolhida no cabeçalho
+        pending_tasks.sort(key=effective_due)
+        if self.sort_column:
+            sort_key = self.table_sort_key(self.sort_column)
+            pending_tasks.sort(key=sort_key, reverse=self.sort_reverse)
+            completed_tasks.sort(key=sort_key, reverse=self.sort_reverse)
         
         # Combinar listas
         sorted_tasks = pending_tasks + completed_tasks
         
         # Adicionar tarefas à tabela
+        now = datetime.now()
         for task in sorted_tasks:
-            task_datetime = datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S")
-            now = datetime.now()
-            
-            reminders = []
-            if task.get('reminder_5min'):
-                reminders.append("5min")
-            if task.get('reminder_10min'):
-                reminders.append("10min")
-            if task.get('reminder_30min'):
-                reminders.append("30min")
-            if task.get('reminder_1h'):
-                reminders.append("1h")
-            reminders_text = ", ".join(reminders) if reminders else "Nenhum"
-            
-            # Verificar se a tarefa está atrasada
-            status = task.get('status', 'Pendente')
-            is_overdue = False
-            
-            if status == 'Pendente':
-                if task_datetime < now:
-                    status = "Atrasada"
-                    task['status'] = 'Atrasada'
-                    task['is_overdue'] = True
-                    is_overdue = True
-                else:
-                    task['is_overdue'] = False
-            
-            # Determinar tag para cor
-            if status == 'Concluída':
-                tag = 'completed'
-            elif is_overdue:
-                tag = 'overdue'
-            else:
-                tag = 'pending'
-            
-            # Adicionar à tabela
-            item_id = self.tree.insert("", tk.END, values=(
-                task['id'],
-                task['task'],
-                task_datetime.strftime("%d/%m/%Y %H:%M"),
-                reminders_text,
-                status
-            ), tags=(tag,))
+            values, tag = self.task_row(task, now)
+            self.tree.insert("", tk.END, iid=str(task['id']), values=values, tags=(tag,))
         
         # Configurar cores das tags
         self.tree.tag_configure('overdue', foreground='red', font=('Segoe UI', 9, 'bold'))
         self.tree.tag_configure('pending', foreground='#6c757d')
         self.tree.tag_configure('completed', foreground='#28a745')
+        
+        self.refresh_filter_options()
+        self.update_tray_badge()
+        self.refresh_tray_menu()
+
+    def refresh_filter_options(self):
+        """Atualiza as opções do filtro com a contagem de cada lista e etiqueta"""
+        lists = self.tag_index.counts('list')
+        tags = self.tag_index.counts('tag')
+        
+        options = {f"Todas as tarefas ({len(self.tasks)})": None}
+        for name in sorted(lists):
+            options[f"📁 {name} ({lists[name]})"] = ('list', name)
+        for name in sorted(tags):
+            options[f"@{name} ({tags[name]})"] = ('tag', name)
+        self.filter_options = options
+        
+        if self.active_filter not in options.values():
+            # A lista/etiqueta filtrada ficou vazia
+            self.active_filter = None
+        self.filter_combo['values'] = list(options)
+        self.filter_var.set(next(label for label, key in options.items() if key == self.active_filter))
+        self.list_combo['values'] = sorted(set(lists) | {DEFAULT_LIST})
+
+    def on_filter_selected(self, event=None):
+        """Troca o filtro da tabela"""
+        self.active_filter = self.filter_options.get(self.filter_var.get())
+        self.load_tasks_to_table()
+
+    def complete_filtered_today(self):
+        """Conclui as tarefas em aberto da lista/etiqueta filtrada que vencem até hoje"""
+        if self.active_filter is None:
+            messagebox.showwarning("Aviso", "Escolha uma lista ou etiqueta em 'Mostrar' primeiro!")
+            return
+        
+        today = datetime.now().strftime("%Y-%m-%d 23:59:59")
+        tasks = [t for t in self.tag_index.tasks(self.active_filter)
+                 if DueIndex.is_open(t) and effective_due(t) <= today]
+        if not tasks:
+            messagebox.showinfo("Informação", "Nenhuma tarefa em aberto para hoje neste filtro.")
+            return
+        
+        if not messagebox.askyesno("Confirmar", f"Concluir {len(tasks)} tarefa(s) de hoje em '{self.filter_var.get()}'?"):
+            return
+        
+        # Só os disparos dessas tarefas são trocados, sem reagendar tudo
+        changes = []
+        for task in tasks:
+            changes.append((task, dict(task)))
+            self.mark_task_completed(task)
+        self.record_update("Concluir em lote", changes)
+        
+        self.save_tasks()
+        self.load_tasks_to_table()
+        logger.info("%d tarefa(s) concluída(s) em lote", len(tasks), extra={"filter": self.active_filter})
+        self.status_var.set(f"✅ {len(tasks)} tarefa(s) concluída(s)")
+
+    def table_sort_key(self, column):
+        """Chave de ordenação da tabela para uma coluna"""
+        if column == "ID":
+            return lambda t: t['id']
+        if column == "Tarefa":
+            return lambda t: t['task'].lower()
+        if column == "Prioridade":
+            return lambda t: (task_priority(t), effective_due(t))
+        if column == "Lembretes":
+            return lambda t: t.get('reminders') or [0]
+        if column == "Status":
+            return lambda t: (t.get('status', 'Pendente'), effective_due(t))
+        return effective_due
+
+    def sort_table_by(self, column):
+        """Ordena a tabela pela coluna clicada; clicar de novo inverte a ordem"""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        
+        for heading in self.tree["columns"]:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if heading == column else ""
+            self.tree.heading(heading, text=heading + arrow)
+        
+        self.load_tasks_to_table()
+
+    def task_row(self, task, now):
+        """Valores e tag de cor de uma linha da tabela; atualiza o estado de atraso"""
+        task_datetime = datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S")
+        
+        reminders_text = format_reminder_offsets(task.get('reminders', [])) or "Nenhum"
+        if task.get('escalate'):
+            reminders_text += " 🚨"
+        
+        # Verificar se a tarefa está atrasada
+        status = task.get('status', 'Pendente')
+        is_overdue = False
+        
+        if status != 'Concluída':
+            if effective_due(task) < now.strftime("%Y-%m-%d %H:%M:%S"):
+                status = "Atrasada"
+                task['status'] = 'Atrasada'
+                task['is_overdue'] = True
+                is_overdue = True
+            else:
+                status = "Pendente"
+                task['status'] = 'Pendente'
+                task['is_overdue'] = False
+                if task.get('snoozed_until'):
+                    snoozed_until = datetime.strptime(task['snoozed_until'], "%Y-%m-%d %H:%M:%S")
+                    status = f"💤 Até {snoozed_until.strftime('%H:%M')}"
+        
+        # Determinar tag para cor
+        if status == 'Concluída':
+            tag = 'completed'
+        elif is_overdue:
+            tag = 'overdue'
+        else:
+            tag = 'pending'
+        
+        values = (
+            task['id'],
+            f"{task['task']}  🏷 {format_tags(task['tags'])}" if task.get('tags') else task['task'],
+            f"{task_datetime.strftime('%d/%m/%Y %H:%M')}{self.describe_task_zone(task)} "
+            f"{describe_recurrence(task.get('recurrence'))}".strip(),
+            f"{PRIORITY_ICONS[task_priority(task)]} {PRIORITY_LABELS[task_priority(task)]}".strip(),
+            reminders_text,
+            status
+        )
+        return values, tag
 
-    def save_tasks(self):
-        """Salva as tarefas no arquivo tasks.json"""
+    def describe_task_zone(self, task):
+        """Hora no fuso de origem, quando a tarefa foi criada em outro fuso"""
+        zone = task.get('tz')
+        if not zone or zone == self.system_zone or 'due_at' not in task:
+            return ""
+        return f" (🌐 {epoch_to_wall(task['due_at'], zone).strftime('%H:%M')} {zone})"
+
+    def refresh_task_row(self, task):
+        """Atualiza só a linha de uma tarefa na tabela"""
+        iid = str(task['id'])
+        if not self.tree.exists(iid):
+            self.load_tasks_to_table()
+            return
+        
+        values, tag = self.task_row(task, datetime.now())
+        self.tree.item(iid, values=values, tags=(tag,))
+        self.update_tray_badge()
+        self.refresh_tray_menu()
+
+    @timed_operation("save")
+    def save_tasks(self, on_saved=None):
+        """Salva as tarefas no arquivo tasks.json e retorna se deu certo.
+
+        No arquivo compartilhado a gravação termina em segundo plano e o retorno é None;
+        quem precisa do resultado passa on_saved(ok), chamado na thread do Tk"""
+        if self.store.shared and not self.is_quitting:
+            # A trava pode demorar: o salvamento segue em segundo plano
+            if on_saved is not None:
+                self.shared_sync_callbacks.append(on_saved)
+            self.sync_shared_tasks()
+            return None
         try:
-            with open(self.tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(self.tasks, f, ensure_ascii=False, indent=2)
-            return True
+            tasks = self.store.save(self.tasks)
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao salvar tarefas: {e}")
-            return False
+            saved = False
+        else:
+            if tasks is not self.tasks:
+                self.apply_shared_tasks(tasks)
+            saved = True
+        if on_saved is not None:
+            on_saved(saved)
+        return saved
 
     def load_tasks(self):
         """Carrega as tarefas do arquivo tasks.json"""
-        if os.path.exists(self.tasks_file):
-            try:
-                with open(self.tasks_file, 'r', encoding='utf-8') as f:
-                    tasks = json.load(f)
-                    
-                    for task in tasks:
-                        if 'is_overdue' not in task:
-                            task_datetime = datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S")
-                            task['is_overdue'] = task_datetime < datetime.now()
-                        if 'reminder_30min' not in task:
-                            task['reminder_30min'] = False
-                        if 'reminder_1h' not in task:
-                            task['reminder_1h'] = False
-                    
-                    self.tasks = tasks
-                    return tasks
-            except Exception as e:
-                print(f"Erro ao carregar tarefas: {e}")
-                self.tasks = []
-                return []
-        self.tasks = []
-        return []
+        try:
+            tasks = self.store.load(self.system_zone)
+        except Exception as e:
+            logger.exception("Erro ao carregar tarefas de %s", self.tasks_file)
+            # A lista fica vazia, mas store.save() não grava por cima do arquivo
+            messagebox.showerror(
+                "Erro",
+                f"Não foi possível carregar as tarefas nem recuperá-las de um backup:\n\n{e}\n\n"
+                "Nenhuma alteração será gravada até o arquivo ser corrigido."
+            )
+            self.status_var.set("❌ Arquivo de tarefas ilegível: alterações não serão salvas")
+            tasks = []
+        else:
+            if self.store.recovered_from:
+                messagebox.showwarning(
+                    "Tarefas recuperadas",
+                    f"O arquivo de tarefas estava corrompido.\n\n"
+                    f"As tarefas foram recuperadas de {self.store.recovered_from.name}; "
+                    "o arquivo danificado foi guardado ao lado dele."
+                )
+                self.status_var.set(f"⚠️ Tarefas recuperadas de {self.store.recovered_from.name}")
+        self.tasks = tasks
+        self.due_index.rebuild(tasks)
+        self.tag_index.rebuild(tasks)
+        return tasks
+
+    def set_task_due(self, task, wall):
+        """Define o horário (hora local do sistema) guardando o instante UTC e o fuso"""
+        set_task_due(task, wall, self.system_zone)
+
+    def anchor_task(self, task):
+        anchor_task(task, self.system_zone)
+
+    @timed_operation("reanchor")
+    def reanchor_tasks(self):
+        """O fuso do sistema mudou: recalcula de uma vez as horas locais de todas as tarefas.
+
+        Os disparos do agendador usam instantes UTC e continuam válidos; só as horas
+        exibidas, o índice de vencimentos e os horários silenciosos mudam.
+        """
+        zone_offset.cache_clear()
+        previous, self.system_zone = self.system_zone, system_zone_name()
+        for task in self.tasks:
+            self.anchor_task(task)
+        self.due_index.rebuild(self.tasks)
+        self.dispatcher.set_quiet_hours(QuietHours(self.dispatcher.quiet_hours.days))
+        
+        logger.info("Fuso do sistema mudou de %s para %s; %d tarefa(s) reancorada(s)",
+                    previous or "local", self.system_zone or "local", len(self.tasks))
+        self.save_tasks()
+        self.load_tasks_to_table()
 
     def schedule_task_notifications(self, task):
         """Agenda as notificações para uma tarefa"""
@@ -1307,129 +5499,301 @@ class TaskReminderApp:
             if task.get('status') != 'Pendente':
                 return
                 
-            task_time = datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S")
-            now = datetime.now()
+            task_time = task['due_at']
+            now = time.time()
             
             if task_time > now:
                 def main_notification():
                     self.send_main_notification(task['id'], task['task'])
                 
-                wait_seconds = (task_time - now).total_seconds()
-                
-                if wait_seconds > 0:
-                    timer = threading.Timer(wait_seconds, main_notification)
-                    timer.daemon = True
-                    timer.start()
-                    self.active_timers.append(timer)
+                self.scheduler.arm((task['id'], 'main'), task_time, main_notification)
                 
                 def create_reminder_notification(minutes):
                     def reminder():
-                        self.send_reminder_notification(task['id'], task['task'], f"{minutes} minutos")
+                        self.send_reminder_notification(task['id'], task['task'], minutes)
                     return reminder
                 
-                reminders = [
-                    (5, task.get('reminder_5min')),
-                    (10, task.get('reminder_10min')),
-                    (30, task.get('reminder_30min')),
-                    (60, task.get('reminder_1h'))
-                ]
-                
-                for minutes, enabled in reminders:
-                    if enabled:
-                        reminder_time = task_time - timedelta(minutes=minutes)
-                        if reminder_time > now:
-                            wait_seconds = (reminder_time - now).total_seconds()
-                            if wait_seconds > 0:
-                                timer = threading.Timer(wait_seconds, create_reminder_notification(minutes))
-                                timer.daemon = True
-                                timer.start()
-                                self.active_timers.append(timer)
+                # Intervalos em ordem crescente: o primeiro lembrete já passado
+                # encerra o laço, pois todos os seguintes são ainda mais cedo
+                for minutes in task.get('reminders', ()):
+                    reminder_time = task_time - minutes * 60
+                    if reminder_time <= now:
+                        break
+                    self.scheduler.arm((task['id'], 'reminder', minutes), reminder_time,
+                                       create_reminder_notification(minutes))
+            
+            if task.get('snoozed_until') and not self.arm_snooze(task):
+                # Adiamento que venceu com o app fechado
+                clear_snooze(task)
                         
-        except Exception as e:
-            print(f"Erro ao agendar notificações para tarefa {task.get('id')}: {e}")
+        except Exception:
+            logger.exception("Erro ao agendar notificações", extra={"task_id": task.get('id')})
 
-    def send_main_notification(self, task_id, task_text):
-        """Envia notificação principal"""
-        if PLYER_AVAILABLE:
-            try:
-                notification.notify(
-                    title="📢 Task Reminder",
-                    message=f"⏰ HORA DA TAREFA!\n\n{task_text}",
-                    timeout=self.config.get("notification_duration", 15),
-                    toast=True,
-                    app_name="Task Reminder"
-                )
-            except:
-                pass
+    def send_main_notification(self, task_id, task_text, snoozed=False):
+        """Envia notificação principal (ou a de uma tarefa adiada)"""
+        def show():
+            if PLYER_AVAILABLE:
+                try:
+                    notification.notify(
+                        title="📢 Task Reminder",
+                        message=f"⏰ HORA DA TAREFA!\n\n{task_text}",
+                        timeout=self.config.get("notification_duration", 15),
+                        toast=True,
+                        app_name="Task Reminder"
+                    )
+                except Exception:
+                    logger.warning("Erro ao exibir notificação do sistema", exc_info=True,
+                                   extra={"task_id": task_id})
+            
+            # Mostrar janela de notificação personalizada
+            self.show_notification_window(task_text, None, task_id=task_id)
         
-        # Mostrar janela de notificação personalizada
-        self.show_notification_window(task_text, None)
+        logger.info("Notificação principal disparada", extra={"task_id": task_id})
+        self.events.publish("task.due", {"id": task_id, "task": task_text})
+        task = self.find_task(task_id)
+        self.dispatcher.submit(task_priority(task) if task else PRIORITY_NORMAL, task_text, show)
         
-        # Atualizar status da tarefa
+        # Atualizar status, salvar e redesenhar na thread principal (esta é a do agendador)
+        self.root.after(0, self.finish_main_notification, task_id, snoozed)
+
+    def finish_main_notification(self, task_id, snoozed):
+        """Atualiza a tarefa que disparou: as recorrentes avançam para a próxima ocorrência"""
         for task in self.tasks:
             if task['id'] == task_id:
-                task['status'] = 'Concluída'
-                task['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                if task.get('escalate'):
+                    self.start_escalation(task)
+                clear_snooze(task)
+                if snoozed and task.get('recurrence'):
+                    # A recorrência já avançou quando a ocorrência original disparou
+                    self.due_index.update(task)
+                elif not self.advance_recurring_task(task, datetime.now()):
+                    task['status'] = 'Concluída'
+                    task['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    self.due_index.discard(task_id)
                 break
         
-        # Salvar e atualizar na thread principal
         self.save_tasks()
-        self.root.after(0, self.load_tasks_to_table)
+        self.load_tasks_to_table()
+
+    def get_escalation_intervals(self):
+        """Intervalos (minutos) entre as insistências; o último se repete"""
+        intervals = [m for m in self.config.get("escalation_intervals") or () if isinstance(m, int) and m > 0]
+        return intervals or DEFAULT_ESCALATION_INTERVALS
+
+    def start_escalation(self, task):
+        """Começa a insistir na notificação até o usuário confirmar.
+
+        O passo fica na própria tarefa (escalation_step) e é gravado com ela, então a
+        insistência sobrevive a um reinício mesmo com a tarefa já Concluída"""
+        task['escalation_step'] = 0
+        self.arm_escalation(task)
+
+    def arm_escalation(self, task):
+        """Arma o próximo aviso de insistência (uma entrada no agendador central)"""
+        step = task.get('escalation_step')
+        if step is None:
+            return
+        intervals = self.get_escalation_intervals()
+        minutes = intervals[min(step, len(intervals) - 1)]
+        task_id = task['id']
+        # O passo muda na thread do Tk, a mesma de acknowledge_task
+        self.scheduler.arm(
+            (task_id, 'escalate'),
+            time.time() + minutes * 60,
+            lambda: self.root.after(0, self.send_escalation_notification, task_id)
+        )
+
+    def send_escalation_notification(self, task_id):
+        """Repete a notificação de uma tarefa ainda não confirmada"""
+        task = self.find_task(task_id)
+        if task is None or task.get('escalation_step') is None:
+            return
+        
+        step = task['escalation_step'] + 1
+        self.save_task_fields(task, {'escalation_step': step})
+        repeat = step + 1
+        logger.info("Insistência %d", repeat, extra={"task_id": task_id})
+        
+        def show():
+            if PLYER_AVAILABLE:
+                try:
+                    notification.notify(
+                        title="🚨 Task Reminder",
+                        message=f"⏰ TAREFA AINDA NÃO CONFIRMADA ({repeat}º aviso)\n\n{task['task']}",
+                        timeout=self.config.get("notification_duration", 15),
+                        toast=True,
+                        app_name="Task Reminder"
+                    )
+                except Exception:
+                    logger.warning("Erro ao exibir notificação do sistema", exc_info=True,
+                                   extra={"task_id": task_id})
+            
+            if self.config.get("notification_sound", True) and not play_alert_sound():
+                self.root.after(0, self.root.bell)
+            
+            self.show_notification_window(task['task'], None, task_id=task_id, repeat=repeat)
+        
+        self.dispatcher.submit(task_priority(task), f"{task['task']} ({repeat}º aviso)", show,
+                               key=(task_id, 'escalate'))
+        self.arm_escalation(task)
+
+    def acknowledge_task(self, task):
+        """Confirma a notificação: interrompe a insistência imediatamente"""
+        if task.get('escalation_step') is not None:
+            self.scheduler.cancel((task['id'], 'escalate'))
+            self.save_task_fields(task, {'escalation_step': None})
+            logger.info("Notificação confirmada", extra={"task_id": task['id']})
+
+    def advance_recurring_task(self, task, after):
+        """Move uma tarefa recorrente para a próxima ocorrência depois de after e a agenda"""
+        if not advance_recurrence(task, after, self.system_zone):
+            return False
+        
+        self.due_index.update(task)
+        self.schedule_task_notifications(task)
+        logger.debug("Tarefa recorrente avançou para %s", task['datetime'], extra={"task_id": task['id']})
+        return True
+
+    def send_reminder_notification(self, task_id, task_text, offset):
+        """Envia notificação antecipada (offset minutos antes do horário)"""
+        minutes = describe_reminder_offset(offset)
+        
+        def show():
+            if PLYER_AVAILABLE:
+                try:
+                    notification.notify(
+                        title="🔔 Task Reminder",
+                        message=f"⏰ Lembrete ({minutes} antes):\n\n{task_text}",
+                        timeout=10,
+                        toast=True,
+                        app_name="Task Reminder"
+                    )
+                except Exception:
+                    logger.warning("Erro ao exibir lembrete do sistema", exc_info=True,
+                                   extra={"task_id": task_id})
+            
+            # Mostrar janela de notificação personalizada
+            self.show_notification_window(task_text, f"Lembrete ({minutes} antes)", task_id=task_id,
+                                          reminder=offset)
+        
+        logger.info("Lembrete disparado (%s antes)", minutes, extra={"task_id": task_id})
+        task = self.find_task(task_id)
+        self.dispatcher.submit(task_priority(task) if task else PRIORITY_NORMAL,
+                               f"Lembrete ({minutes} antes): {task_text}", show)
 
-    def send_reminder_notification(self, task_id, task_text, minutes):
-        """Envia notificação antecipada"""
+    def show_notification_batch(self, summaries, heading):
+        """Mostra várias notificações em um único resumo"""
+        logger.info("Resumo com %d %s", len(summaries), heading)
+        lines = [f"• {summary}" for summary in summaries[:5]]
+        if len(summaries) > 5:
+            lines.append(f"... e mais {len(summaries) - 5}")
+        message = "\n".join(lines)
+        
         if PLYER_AVAILABLE:
             try:
                 notification.notify(
-                    title="🔔 Task Reminder",
-                    message=f"⏰ Lembrete ({minutes} antes):\n\n{task_text}",
-                    timeout=10,
+                    title="📋 Task Reminder",
+                    message=f"{len(summaries)} {heading}:\n\n{message}",
+                    timeout=self.config.get("notification_duration", 15),
                     toast=True,
                     app_name="Task Reminder"
                 )
-            except:
-                pass
+            except Exception:
+                logger.warning("Erro ao exibir resumo do sistema", exc_info=True)
         
-        # Mostrar janela de notificação personalizada
-        self.show_notification_window(task_text, f"Lembrete ({minutes} antes)")
+        self.show_notification_window(message, f"{len(summaries)} {heading}")
+
+    def show_notification_window(self, task_text, reminder_text, task_id=None, repeat=0, reminder=None):
+        """Mostra janela de notificação personalizada (com opções de adiar se houver task_id).
 
-    def show_notification_window(self, task_text, reminder_text):
-        """Mostra janela de notificação personalizada"""
+        Com reminder (minutos de antecedência), adiar re-arma só aquele lembrete"""
+        on_snooze = on_acknowledge = None
+        if task_id is not None and reminder is not None:
+            def on_snooze(minutes):
+                self.root.after(0, lambda: self.snooze_reminder(task_id, reminder, minutes))
+            
+            # A janela do lembrete não é a da insistência nem a do horário da tarefa
+            task_id = None
+        elif task_id is not None:
+            def on_snooze(minutes):
+                self.root.after(0, lambda: self.snooze_task(task_id, minutes))
+            
+            def on_acknowledge():
+                def acknowledge():
+                    task = self.find_task(task_id)
+                    if task is not None:
+                        self.acknowledge_task(task)
+                self.root.after(0, acknowledge)
+            
+            # Na insistência, a janela que continua aberta volta para a frente
+            for window in self.notification_windows[:]:
+                if window.task_id == task_id:
+                    try:
+                        window.window.after(0, window.request_attention)
+                        return
+                    except Exception:
+                        logger.debug("Janela de notificação já fechada", exc_info=True)
+        
         def create_window():
             try:
-                notif_window = NotificationWindow(task_text, reminder_text)
+                notif_window = NotificationWindow(task_text, reminder_text, on_snooze=on_snooze,
+                                                  on_acknowledge=on_acknowledge,
+                                                  task_id=task_id, repeat=repeat)
                 self.notification_windows.append(notif_window)
                 notif_window.show()
                 if notif_window in self.notification_windows:
                     self.notification_windows.remove(notif_window)
-            except Exception as e:
-                print(f"Erro ao criar janela de notificação: {e}")
+            except Exception:
+                logger.exception("Erro ao criar janela de notificação")
         
         # Executar em thread separada
         threading.Thread(target=create_window, daemon=True).start()
 
+    def reschedule_task(self, task):
+        """Refaz só os disparos de uma tarefa; o restante do agendador fica intacto"""
+        self.scheduler.cancel_task(task['id'])
+        # A insistência em andamento continua até ser confirmada
+        self.arm_escalation(task)
+        self.schedule_task_notifications(task)
+
     def reschedule_all_tasks(self):
         """Reagenda todas as notificações"""
-        for timer in self.active_timers:
-            try:
-                timer.cancel()
-            except:
-                pass
-        self.active_timers.clear()
+        self.scheduler.clear()
         
         if SCHEDULE_AVAILABLE:
             schedule.clear()
         
+        # Insistências em andamento (inclusive de antes de um reinício) continuam até serem confirmadas
+        for task in self.tasks:
+            self.arm_escalation(task)
+        
+        # Notificações ainda na fila esperam pela próxima vaga
+        self.dispatcher.rearm()
+        
+        # Tarefas recorrentes que venceram com o app fechado seguem para a próxima ocorrência
+        now = datetime.now()
+        for task in self.tasks:
+            if task.get('recurrence') and task.get('status') != 'Concluída' \
+                    and task['datetime'] < now.strftime("%Y-%m-%d %H:%M:%S"):
+                self.advance_recurring_task(task, now)
+        
         for task in self.tasks:
             if task.get('status') == 'Pendente':
                 self.schedule_task_notifications(task)
 
     def check_pending_tasks(self):
         """Verifica tarefas pendentes periodicamente"""
-        check_interval = self.config.get("check_interval", 60)
-        
         while self.scheduler_running:
-            time.sleep(check_interval)
+            # O intervalo é relido a cada volta; mudá-lo acorda a espera
+            self.check_wakeup.wait(self.config.get("check_interval", 60))
+            self.check_wakeup.clear()
+            if not self.scheduler_running:
+                break
+            
+            signature = zone_signature()
+            if signature != self.zone_signature:
+                self.zone_signature = signature
+                self.root.after(0, self.reanchor_tasks)
             
             now = datetime.now()
             needs_update = False
@@ -1437,69 +5801,159 @@ class TaskReminderApp:
             # Verificar tarefas atrasadas
             for task in self.tasks:
                 if task.get('status') == 'Pendente':
-                    task_time = datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S")
+                    task_time = datetime.strptime(effective_due(task), "%Y-%m-%d %H:%M:%S")
                     if task_time < now and not task.get('is_overdue', False):
                         task['is_overdue'] = True
                         needs_update = True
             
+            logger.debug("Verificação periódica: %d tarefa(s), atualizar=%s", len(self.tasks), needs_update)
+            
             if needs_update:
                 self.root.after(0, self.load_tasks_to_table)
 
-    # Métodos de configurações
-    def save_all_settings(self):
-        """Salva todas as configurações"""
-        config_updates = {
-            'minimize_to_tray': self.minimize_to_tray_var.get(),
-            'check_interval': self.check_interval_var.get(),
-            'theme': self.theme_var.get()
-        }
+    # Métodos de diagnóstico
+    def get_profile_duration(self):
+        """Retorna a duração da coleta em segundos, dentro dos limites"""
+        try:
+            duration = int(self.profile_duration_var.get())
+        except (tk.TclError, ValueError):
+            duration = self.config.get("profile_duration", 30)
+        return min(max(duration, 5), 600)
+
+    def diagnostics_file(self, prefix, suffix):
+        """Caminho com data/hora para um arquivo de diagnóstico ao lado do tasks.json"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self.tasks_file.parent / f"{prefix}_{timestamp}{suffix}"
+
+    def start_cpu_profile(self):
+        """Inicia a coleta de perfil de CPU pela duração configurada"""
+        duration = self.get_profile_duration()
+        if not self.perf.start_profile(self.diagnostics_file("profile", ".prof")):
+            return
         
-        if hasattr(self, 'start_with_windows_var'):
-            config_updates['start_with_windows'] = self.start_with_windows_var.get()
-            if WINSHELL_AVAILABLE:
-                if config_updates['start_with_windows']:
-                    self.setup_autostart()
-                else:
-                    self.remove_autostart()
+        self.cpu_profile_button.state(['disabled'])
+        self.diagnostics_status_var.set(f"⏱️ Coletando perfil de CPU por {duration} s...")
+        self.root.after(duration * 1000, self.stop_cpu_profile)
+
+    def stop_cpu_profile(self):
+        """Finaliza o perfil de CPU e grava os arquivos"""
+        try:
+            path = self.perf.stop_profile()
+            if path:
+                self.diagnostics_status_var.set(f"✅ Perfil de CPU salvo em {path.name}")
+                self.status_var.set(f"⏱️ Perfil de CPU salvo: {path.name}")
+        except Exception:
+            logger.exception("Erro ao salvar perfil de CPU")
+            self.diagnostics_status_var.set("❌ Erro ao salvar perfil de CPU")
+        finally:
+            self.cpu_profile_button.state(['!disabled'])
+            self.refresh_perf_counters()
+
+    def start_memory_profile(self):
+        """Inicia o rastreamento de memória pela duração configurada"""
+        duration = self.get_profile_duration()
+        if not self.perf.start_tracemalloc(self.diagnostics_file("memory", ".txt")):
+            return
         
-        if hasattr(self, 'show_tray_icon_var'):
-            config_updates['show_tray_icon'] = self.show_tray_icon_var.get()
-            # configuração do ícone da bandeja
-            if PYSTRAY_AVAILABLE and PILLOW_AVAILABLE:
-                if self.tray_icon:
-                    self.tray_icon.stop()
-                    self.tray_icon = None
-                if config_updates['show_tray_icon']:
-                    self.setup_tray_icon()
-        
-        if hasattr(self, 'show_notification_var'):
-            config_updates['show_notification_on_minimize'] = self.show_notification_var.get()
-        
-        if hasattr(self, 'notification_sound_var'):
-            config_updates['notification_sound'] = self.notification_sound_var.get()
-        
-        if hasattr(self, 'notification_duration_var'):
-            duration = self.notification_duration_var.get()
-            if 5 <= duration <= 60:
-                config_updates['notification_duration'] = duration
-            else:
-                config_updates['notification_duration'] = self.config.get('notification_duration', 15)
-                self.notification_duration_var.set(config_updates['notification_duration'])
+        self.memory_profile_button.state(['disabled'])
+        self.diagnostics_status_var.set(f"🧠 Rastreando memória por {duration} s...")
+        self.root.after(duration * 1000, self.stop_memory_profile)
+
+    def stop_memory_profile(self):
+        """Finaliza o rastreamento de memória e grava o snapshot"""
+        try:
+            path = self.perf.stop_tracemalloc()
+            if path:
+                self.diagnostics_status_var.set(f"✅ Perfil de memória salvo em {path.name}")
+                self.status_var.set(f"🧠 Perfil de memória salvo: {path.name}")
+        except Exception:
+            logger.exception("Erro ao salvar perfil de memória")
+            self.diagnostics_status_var.set("❌ Erro ao salvar perfil de memória")
+        finally:
+            self.memory_profile_button.state(['!disabled'])
+
+    def refresh_perf_counters(self):
+        """Atualiza o texto dos contadores de tempo"""
+        self.perf_counters_var.set(self.perf.format_counters())
+
+    def reset_perf_counters(self):
+        """Zera os contadores de tempo"""
+        self.perf.reset()
+        self.refresh_perf_counters()
+
+    def show_log_viewer(self):
+        """Abre uma janela com os registros recentes do log em memória"""
+        viewer = tk.Toplevel(self.root)
+        viewer.title("Task Reminder - Log")
+        viewer.geometry("800x450")
+        viewer.columnconfigure(0, weight=1)
+        viewer.rowconfigure(0, weight=1)
+        
+        text = tk.Text(viewer, wrap=tk.NONE, font=('Consolas', 9))
+        vsb = ttk.Scrollbar(viewer, orient="vertical", command=text.yview)
+        hsb = ttk.Scrollbar(viewer, orient="horizontal", command=text.xview)
+        text.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        
+        text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        vsb.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        hsb.grid(row=1, column=0, sticky=(tk.W, tk.E))
         
-        if hasattr(self, 'check_interval_var'):
-            interval = self.check_interval_var.get()
-            if 1 <= interval <= 1440:
-                config_updates['check_interval'] = interval
-            else:
-                config_updates['check_interval'] = self.config.get('check_interval', 60)
-                self.check_interval_var.set(config_updates['check_interval'])
+        def refresh():
+            text.configure(state=tk.NORMAL)
+            text.delete('1.0', tk.END)
+            text.insert(tk.END, "\n".join(self.log_buffer.get_lines()))
+            text.configure(state=tk.DISABLED)
+            text.see(tk.END)
+        
+        def clear():
+            self.log_buffer.clear()
+            refresh()
         
-        if hasattr(self, 'theme_var'):
-            config_updates['theme'] = self.theme_var.get()
-            if config_updates['theme'] != self.config.get('theme', 'light'):
-                messagebox.showinfo("Tema", "O tema será aplicado na próxima inicialização do aplicativo.")
+        button_frame = ttk.Frame(viewer, padding=5)
+        button_frame.grid(row=2, column=0, columnspan=2)
         
-        self.config.update(config_updates)
+        ttk.Button(button_frame, text="🔄 Atualizar", command=refresh, width=15).grid(row=0, column=0, padx=2)
+        ttk.Button(button_frame, text="🧹 Limpar", command=clear, width=15).grid(row=0, column=1, padx=2)
+        
+        refresh()
+
+    # Métodos de configurações
+    def save_all_settings(self):
+        """Salva todas as configurações; valores inválidos voltam ao valor atual"""
+        config_updates = {}
+        for key, name in SETTINGS_VARS.items():
+            if hasattr(self, name):
+                try:
+                    config_updates[key] = getattr(self, name).get()
+                except tk.TclError:
+                    # Texto em campo numérico: rejeitado pelo esquema
+                    config_updates[key] = None
+        
+        if hasattr(self, 'storage_format_label_var'):
+            labels = {label: key for key, label in STORAGE_FORMATS.items()}
+            config_updates['storage_format'] = labels.get(self.storage_format_label_var.get())
+        
+        if hasattr(self, 'escalation_intervals_var'):
+            try:
+                config_updates['escalation_intervals'] = parse_reminder_offsets(self.escalation_intervals_var.get())
+            except ValueError:
+                config_updates['escalation_intervals'] = None
+        
+        if hasattr(self, 'quiet_hours_vars'):
+            previous = self.config.get("quiet_hours") or [""] * 7
+            quiet_hours = []
+            for weekday, var in enumerate(self.quiet_hours_vars):
+                try:
+                    quiet_hours.append(format_quiet_windows(parse_quiet_windows(var.get())))
+                except ValueError:
+                    quiet_hours.append(previous[weekday])
+            config_updates['quiet_hours'] = quiet_hours
+        
+        changed = self.config.update(config_updates)
+        self.sync_settings_widgets()
+        
+        if 'theme' in changed:
+            messagebox.showinfo("Tema", "O tema será aplicado na próxima inicialização do aplicativo.")
         
         # Salvar no arquivo
         if self.save_config():
@@ -1510,53 +5964,139 @@ class TaskReminderApp:
             if not self.is_quitting:
                 messagebox.showerror("Erro", "Erro ao salvar configurações.")
 
+    def setup_config_subscriptions(self):
+        """Aplica as mudanças de configuração em tempo real"""
+        self.config.subscribe(self.sync_settings_widget)
+        self.config.subscribe(lambda key, value: set_log_level(value), ["log_level"])
+        self.config.subscribe(lambda key, value: self.check_wakeup.set(), ["check_interval"])
+        self.config.subscribe(lambda key, value: setattr(self.dispatcher, 'limit', value),
+                              ["max_notifications_per_minute"])
+        self.config.subscribe(lambda key, value: self.dispatcher.set_quiet_hours(QuietHours.from_config(value)),
+                              ["quiet_hours"])
+        self.config.subscribe(lambda key, value: self.history.set_limit(value), ["undo_history_limit"])
+        self.config.subscribe(self.apply_tray_setting, ["show_tray_icon", "tray_upcoming_count"])
+        self.config.subscribe(self.apply_api_setting, ["api_enabled", "api_port", "api_token"])
+        self.config.subscribe(lambda key, value: self.archive_completed_tasks(reschedule=False),
+                              ["archive_after_days"])
+        self.config.subscribe(self.apply_storage_format, ["storage_format"])
+        self.config.subscribe(self.apply_shared_setting, ["shared_file"])
+        self.config.subscribe(lambda key, value: setattr(self.store, 'backup_count', value), ["backup_count"])
+        if WINSHELL_AVAILABLE:
+            self.config.subscribe(
+                lambda key, value: self.setup_autostart() if value else self.remove_autostart(),
+                ["start_with_windows"])
+
+    def apply_tray_setting(self, key, value):
+        """Recria o ícone da bandeja ou o menu de próximas tarefas"""
+        if key == "tray_upcoming_count":
+            self.tray_menu_signature = None
+            self.refresh_tray_menu()
+            return
+        
+        if PYSTRAY_AVAILABLE and PILLOW_AVAILABLE:
+            if self.tray_icon:
+                self.tray_icon.stop()
+                self.tray_icon = None
+            if value:
+                self.setup_tray_icon()
+
+    def watch_task_file(self):
+        """Arquivo compartilhado: verifica periodicamente (só mtime/tamanho) se outro computador gravou"""
+        if self.is_quitting:
+            return
+        if (self.store.shared and not self.shared_sync_wakeup.is_set()
+                and self.store.changed_on_disk()):
+            self.sync_shared_tasks(write=False)
+        self.root.after(SHARED_WATCH_INTERVAL, self.watch_task_file)
+
+    def sync_shared_tasks(self, write=True):
+        """Pede uma sincronização do arquivo compartilhado; pedidos seguidos viram uma só"""
+        self.shared_sync_write = self.shared_sync_write or write
+        self.shared_sync_wakeup.set()
+        if self.shared_sync_thread is None:
+            self.shared_sync_thread = threading.Thread(target=self.shared_sync_loop, daemon=True)
+            self.shared_sync_thread.start()
+
+    def shared_sync_loop(self):
+        """Espera a trava fora da thread do Tk; leitura, merge e gravação rodam nela enquanto
+        esta thread segura a trava"""
+        while not self.is_quitting:
+            self.shared_sync_wakeup.wait()
+            self.shared_sync_wakeup.clear()
+            try:
+                with FileLock(self.store.lock_path):
+                    self.call_in_ui(self.merge_shared_tasks, timeout=SHARED_LOCK_TIMEOUT)
+            except TimeoutError:
+                # Trava ou interface ocupada: o pedido continua pendente
+                logger.warning("Arquivo de tarefas compartilhado ocupado; tentando de novo", exc_info=True)
+                time.sleep(1)
+                self.shared_sync_wakeup.set()
+            except Exception:
+                logger.exception("Erro ao sincronizar o arquivo de tarefas compartilhado")
+
+    def merge_shared_tasks(self):
+        """Na thread do Tk, com a trava já obtida: junta, grava e adota a lista resultante"""
+        write = self.shared_sync_write
+        try:
+            tasks = self.store.sync(self.tasks, write=write, locked=True)
+        except Exception as e:
+            # A gravação continua pendente e é refeita na próxima sincronização
+            logger.exception("Erro ao sincronizar o arquivo de tarefas compartilhado")
+            if write:
+                if not self.shared_sync_failed:
+                    messagebox.showerror("Erro", f"Erro ao salvar tarefas: {e}")
+                self.shared_sync_failed = True
+                self.finish_shared_save(False)
+            return
+        
+        # Pedidos feitos pelos callbacks abaixo valem para a próxima gravação
+        if write:
+            self.shared_sync_write = self.shared_sync_failed = False
+        if tasks is not self.tasks:
+            self.apply_shared_tasks(tasks)
+        if write:
+            self.finish_shared_save(True)
+
+    def finish_shared_save(self, saved):
+        """Avisa quem esperava pelo resultado da gravação do arquivo compartilhado"""
+        callbacks, self.shared_sync_callbacks = self.shared_sync_callbacks, []
+        for callback in callbacks:
+            callback(saved)
+
+    def watch_config(self):
+        """Verifica periodicamente (só mtime/tamanho) se o config.json foi editado"""
+        if self.is_quitting:
+            return
+        if self.config.reload_if_changed():
+            self.status_var.set("🔄 Configurações recarregadas do arquivo")
+        self.root.after(ConfigService.WATCH_INTERVAL, self.watch_config)
+
+    def sync_settings_widget(self, key, value):
+        """Mostra na aba de configurações o valor atual de uma chave"""
+        name = SETTINGS_VARS.get(key)
+        if name and hasattr(self, name):
+            getattr(self, name).set(value)
+        elif key == 'storage_format' and hasattr(self, 'storage_format_label_var'):
+            self.storage_format_label_var.set(STORAGE_FORMATS[value])
+        elif key == 'escalation_intervals' and hasattr(self, 'escalation_intervals_var'):
+            self.escalation_intervals_var.set(format_reminder_offsets(value))
+        elif key == 'quiet_hours' and hasattr(self, 'quiet_hours_vars'):
+            for var, text in zip(self.quiet_hours_vars, value):
+                var.set(text)
+
+    def sync_settings_widgets(self):
+        for key in CONFIG_SCHEMA:
+            self.sync_settings_widget(key, self.config.get(key))
+
     def restore_default_settings(self):
         """Restaura as configurações padrão"""
         if messagebox.askyesno("Confirmar", 
                             "Deseja restaurar todas as configurações para os valores padrão?\n\n"
                             "Esta ação não pode ser desfeita."):
-            default_config = {
-                "start_with_windows": True,
-                "minimize_to_tray": True,
-                "show_tray_icon": True,
-                "show_notification_on_minimize": True,
-                "notification_sound": True,
-                "notification_duration": 15,
-                "check_interval": 60,
-                "theme": "light"
-            }
-            
-            self.config = default_config
-            
-            # Atualizar variáveis de interface
-            if hasattr(self, 'start_with_windows_var'):
-                self.start_with_windows_var.set(True)
-            if hasattr(self, 'minimize_to_tray_var'):
-                self.minimize_to_tray_var.set(True)
-            if hasattr(self, 'show_tray_icon_var'):
-                self.show_tray_icon_var.set(True)
-            if hasattr(self, 'show_notification_var'):
-                self.show_notification_var.set(True)
-            if hasattr(self, 'notification_sound_var'):
-                self.notification_sound_var.set(True)
-            if hasattr(self, 'notification_duration_var'):
-                self.notification_duration_var.set(15)
-            if hasattr(self, 'check_interval_var'):
-                self.check_interval_var.set(60)
-            if hasattr(self, 'theme_var'):
-                self.theme_var.set("light")
-            
-            # Aplicar mudanças imediatamente para restaurar padrões
-            if WINSHELL_AVAILABLE:
-                self.setup_autostart()
-            
-            if self.tray_icon:
-                self.tray_icon.stop()
-                self.tray_icon = None
-            if PYSTRAY_AVAILABLE and PILLOW_AVAILABLE:
-                self.setup_tray_icon()
-            
-            self.save_config(default_config)
+            # Os assinantes atualizam a tela, a bandeja, o log e o agendador
+            self.config.reset()
+            self.sync_settings_widgets()
+            self.save_config()
             
             messagebox.showinfo("Sucesso", "Configurações padrão restauradas!")
             self.status_var.set("🔄 Configurações restauradas")
@@ -1568,13 +6108,18 @@ class TaskReminderApp:
                               "1. Excluir TODAS as tarefas agendadas\n"
                               "2. Restaurar configurações padrão\n"
                               "3. Remover o aplicativo do início automático\n\n"
-                              "Esta ação NÃO pode ser desfeita!\n\n"
+                              "As configurações NÃO podem ser recuperadas; as tarefas\n"
+                              "voltam com Ctrl+Z enquanto o aplicativo estiver aberto.\n\n"
                               "Deseja continuar?"):
             try:
                 # Limpar tarefas
+                if self.tasks:
+                    self.history.record("Limpar todos os dados", [('insert', list(enumerate(self.tasks)))],
+                                        [('delete', [t['id'] for t in self.tasks])])
                 self.tasks = []
-                if os.path.exists(self.tasks_file):
-                    os.remove(self.tasks_file)
+                self.due_index.rebuild([])
+                self.tag_index.rebuild([])
+                self.store.delete()
                 
                 # Restaurar configurações padrão
                 self.restore_default_settings()
@@ -1609,75 +6154,887 @@ class TaskReminderApp:
         """Encerra o aplicativo corretamente"""
         self.scheduler_running = False
         
-        for timer in self.active_timers:
-            try:
-                timer.cancel()
-            except:
-                pass
+        logger.info("Encerrando o aplicativo")
+        
+        self.scheduler.stop()
         
         for window in self.notification_windows[:]:
             try:
                 window.window.destroy()
-            except:
-                pass
+            except Exception:
+                logger.debug("Janela de notificação já fechada", exc_info=True)
+        
+        if self.api_server is not None:
+            self.api_server.stop()
+        
+        # Finalizar coletas de diagnóstico em andamento
+        try:
+            self.perf.stop_profile()
+            self.perf.stop_tracemalloc()
+        except Exception:
+            logger.exception("Erro ao finalizar coletas de diagnóstico")
         
         # Salvar tudo antes de sair
         try:
             self.save_tasks()
             self.save_config()
-        except:
-            pass
+        except Exception:
+            logger.exception("Erro ao salvar dados ao sair")
         
         if self.tray_icon:
             try:
                 self.tray_icon.stop()
-            except:
-                pass
+            except Exception:
+                logger.debug("Erro ao parar ícone da bandeja", exc_info=True)
         
         try:
             self.root.quit()
             self.root.destroy()
-        except:
-            pass
+        except Exception:
+            logger.debug("Janela principal já destruída", exc_info=True)
         
+        logging.shutdown()
         sys.exit(0)
 
-def main():
-    """Função principal"""
-    import ctypes
-    mutex_name = "Global\\TaskReminderApp"
-    mutex = ctypes.windll.kernel32.CreateMutexW(None, False, mutex_name)
-    last_error = ctypes.windll.kernel32.GetLastError()
+def record_fields(record):
+    """Normaliza os campos de um registro externo (API, importação) para new_task"""
+    fields = {}
+    try:
+        if 'task' in record:
+            fields['text'] = str(record['task']).strip()
+            if not fields['text']:
+                raise ValueError("Descrição da tarefa vazia")
+        if 'datetime' in record:
+            fields['task_datetime'] = parse_user_datetime(str(record['datetime']))
+        if record.get('reminders') is not None:
+            reminders = record['reminders']
+            fields['reminders'] = parse_reminder_offsets(reminders) if isinstance(reminders, str) \
+                else [int(m) for m in reminders]
+        if 'priority' in record:
+            priority = record['priority']
+            fields['priority'] = parse_priority(priority) if isinstance(priority, str) else int(priority)
+            if fields['priority'] not in PRIORITY_LABELS:
+                raise ValueError(f"Prioridade inválida: {priority}")
+        if record.get('tags') is not None:
+            tags = record['tags']
+            fields['tags'] = parse_tags(tags if isinstance(tags, str) else " ".join(map(str, tags)))
+        if 'list' in record:
+            fields['list_name'] = str(record['list'] or "").strip()
+        if 'escalate' in record:
+            fields['escalate'] = bool(record['escalate'])
+        if record.get('recurrence'):
+            fields['recurrence'] = parse_recurrence(record['recurrence'])
+    except (TypeError, AttributeError):
+        raise ValueError(f"Registro inválido: {record!r}")
+    return fields
+
+# iCalendar (RFC 5545): só o necessário para tarefas, lido e gravado em fluxo
+ICS_SUFFIXES = (".ics", ".ical", ".ifb")
+ICS_WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+ICS_FREQS = {"HOURLY": "hourly", "DAILY": "daily", "WEEKLY": "weekly", "MONTHLY": "monthly"}
+# Partes do RRULE que a regra do app representa
+ICS_RRULE_PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "WKST"}
+ICS_PRIORITIES = {PRIORITY_HIGH: 1, PRIORITY_NORMAL: 5, PRIORITY_LOW: 9}
+ICS_ALL_DAY_HOUR = 9  # Eventos de dia inteiro viram tarefas às 9h
+ICS_DURATION = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+ICS_ESCAPED = re.compile(r"\\([\\;,nN])")
+
+def unfold_ics_lines(lines):
+    """Junta as linhas dobradas (a continuação começa com espaço ou tab) sem ler o arquivo todo"""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+def parse_ics_line(line):
+    """'NOME;PARAM=X:valor' -> (NOME, {PARAM: X}, valor); ':' entre aspas não separa o valor"""
+    head, _, value = line.partition(":")
+    if ";" not in head:
+        # Caso comum, sem parâmetros
+        return head.upper(), {}, value
     
-    if last_error == 183:  # ERROR_ALREADY_EXISTS
+    quoted = False
+    for position, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            break
+    else:
+        return line.upper(), {}, ""
+    
+    name, *params = line[:position].split(";")
+    parsed = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        parsed[key.upper()] = value.strip('"')
+    return name.upper(), parsed, line[position + 1:]
+
+def ics_unescape(value):
+    return ICS_ESCAPED.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+def ics_escape(text):
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def ics_duration_minutes(value):
+    """Duração ISO 8601 em minutos (negativa = antes); None se inválida"""
+    match = ICS_DURATION.match(value.strip())
+    if not match or not any(match.groups()[1:]):
+        return None
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    total = (int(weeks or 0) * 10080 + int(days or 0) * 1440 + int(hours or 0) * 60
+             + int(minutes or 0) + round(int(seconds or 0) / 60))
+    return -total if sign == "-" else total
+
+class IcsReader:
+    """Converte VEVENT/VTODO em registros de tarefa (formato de record_fields)"""
+    def __init__(self, zone):
+        self.zone = zone
+        self.known_zones = {}
+
+    def local_time(self, value, params):
+        """Data/hora de DTSTART/DUE na hora local do fuso do sistema"""
+        value = value.strip()
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime(int(value[:4]), int(value[4:6]), int(value[6:8]), ICS_ALL_DAY_HOUR)
+        if len(value) < 15 or value[8] != "T":
+            raise ValueError(f"Data/hora inválida: {value}")
+        # Fatiar é bem mais rápido que strptime em arquivos grandes
+        wall = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                        int(value[9:11]), int(value[11:13]), int(value[13:15]))
+        if value.endswith("Z"):
+            return epoch_to_wall(int((wall - EPOCH).total_seconds()), self.zone)
+        
+        tzid = params.get("TZID")
+        if tzid and tzid != self.zone:
+            if tzid not in self.known_zones:
+                self.known_zones[tzid] = get_zone(tzid) is not None
+            if self.known_zones[tzid]:
+                return epoch_to_wall(wall_to_epoch(wall, tzid), self.zone)
+        # Sem fuso (ou fuso desconhecido, ex.: nomes do Windows): hora "flutuante"
+        return wall
+
+    def reminder(self, alarm, start, end):
+        """Minutos antes do horário da tarefa para um VALARM; None se não couber num lembrete"""
+        params, value = alarm
+        if params.get("VALUE") == "DATE-TIME":
+            minutes = int((start - self.local_time(value, params)).total_seconds() // 60)
+            return minutes if minutes > 0 else None
+        offset = ics_duration_minutes(value)
+        if offset is None:
+            return None
+        if params.get("RELATED") == "END" and end is not None:
+            offset += int((end - start).total_seconds() // 60)
+        return -offset if offset < 0 else None
+
+    def recurrence(self, value, start):
+        """RRULE -> regra de repetição do app. Sem equivalente, a tarefa entra sem repetição
+        (e o log diz qual regra ficou de fora) em vez de ser rejeitada"""
+        rule = dict(part.partition("=")[::2] for part in value.upper().split(";") if "=" in part)
         try:
-            messagebox.showinfo(
-                "Task Reminder",
-                "O aplicativo já está em execução!\n"
-                "Verifique o ícone na bandeja do sistema."
-            )
-        except:
+            recurrence = self.rrule_to_rule(rule, start)
+            if recurrence is not None:
+                recurrence = parse_recurrence(recurrence)
+        except ValueError:
+            recurrence = None
+        if recurrence is None:
+            logger.warning("Repetição sem equivalente ignorada (tarefa importada sem repetição): RRULE:%s", value)
+        return recurrence
+
+    def rrule_to_rule(self, rule, start):
+        """Partes do RRULE -> regra do app, ou None se alguma parte não puder ser representada"""
+        if set(rule) - ICS_RRULE_PARTS:
+            # BYSETPOS, BYMONTH, BYHOUR...: mudam quais ocorrências valem
+            return None
+        freq = ICS_FREQS.get(rule.get("FREQ"))
+        interval = int(rule.get("INTERVAL") or 1)
+        if rule.get("FREQ") == "YEARLY" and "BYDAY" not in rule:
+            freq, interval = "monthly", interval * 12
+        if freq is None:
+            # MINUTELY, SECONDLY ou YEARLY com BYDAY
+            return None
+        
+        recurrence = {"freq": freq, "interval": interval}
+        if rule.get("COUNT"):
+            recurrence["count"] = int(rule["COUNT"])
+        if rule.get("UNTIL"):
+            until = self.local_time(rule["UNTIL"], {})
+            recurrence["until"] = until.strftime("%Y-%m-%d %H:%M:%S")
+        
+        days = [day for day in rule.get("BYDAY", "").split(",") if day]
+        monthdays = [day for day in rule.get("BYMONTHDAY", "").split(",") if day]
+        if freq == "weekly" and not monthdays:
+            # Dias com ordinal (2MO) só existem em regras mensais/anuais
+            if not all(day in ICS_WEEKDAYS for day in days):
+                return None
+            recurrence["weekdays"] = sorted({ICS_WEEKDAYS.index(day) for day in days}) or [start.weekday()]
+        elif freq == "monthly" and not days and len(monthdays) <= 1:
+            # Dia negativo (contado do fim do mês) é rejeitado por parse_recurrence
+            recurrence["monthday"] = int(monthdays[0]) if monthdays else start.day
+        elif days or monthdays:
+            return None
+        return recurrence
+
+    def record(self, kind, props, alarms):
+        """Registro de uma tarefa ou None (eventos cancelados)"""
+        status = props.get("STATUS", ({}, ""))[1].upper()
+        if status == "CANCELLED":
+            return None
+        
+        record = {"task": ics_unescape(props.get("SUMMARY", ({}, ""))[1]).strip()}
+        when = props.get("DUE") if kind == "VTODO" else None
+        when = when or props.get("DTSTART")
+        if when is None:
+            # Sem data/hora: record_fields rejeita e a importação registra o aviso
+            return record
+        start = self.local_time(when[1], when[0])
+        record["datetime"] = start.strftime("%Y-%m-%d %H:%M:%S")
+        
+        end = None
+        if kind == "VEVENT" and "DTEND" in props:
+            end = self.local_time(props["DTEND"][1], props["DTEND"][0])
+        record["reminders"] = sorted({m for m in (self.reminder(a, start, end) for a in alarms) if m})
+        
+        if "PRIORITY" in props and props["PRIORITY"][1].strip().isdigit():
+            level = int(props["PRIORITY"][1])
+            if level:
+                record["priority"] = PRIORITY_HIGH if level < 5 else PRIORITY_NORMAL if level == 5 else PRIORITY_LOW
+        if "CATEGORIES" in props:
+            record["tags"] = [tag for tag in re.split(r"(?<!\\),", props["CATEGORIES"][1]) if tag]
+            record["tags"] = [ics_unescape(tag).replace(" ", "_") for tag in record["tags"]]
+        if "RRULE" in props:
+            record["recurrence"] = self.recurrence(props["RRULE"][1], start)
+        if status == "COMPLETED" or "COMPLETED" in props:
+            record["status"] = "Concluída"
+        return record
+
+def iter_ics_records(lines, zone=None):
+    """Gera registros de tarefa dos VEVENT/VTODO de um .ics, guardando só o componente atual"""
+    reader = IcsReader(zone)
+    components = []
+    props = alarms = None
+    for line in unfold_ics_lines(lines):
+        name, params, value = parse_ics_line(line)
+        if name == "BEGIN":
+            component = value.strip().upper()
+            if component in ("VEVENT", "VTODO") and props is None:
+                props, alarms, kind = {}, [], component
+            elif component == "VALARM" and props is not None:
+                alarms.append(None)
+            components.append(component)
+            continue
+        
+        if name == "END":
+            component = components.pop() if components else None
+            if component == "VALARM" and alarms and alarms[-1] is None:
+                alarms.pop()
+            elif component in ("VEVENT", "VTODO") and props is not None and component == kind:
+                try:
+                    record = reader.record(kind, props, alarms)
+                except ValueError:
+                    logger.warning("Componente %s inválido ignorado: %s", kind, props.get("UID"))
+                    record = None
+                if record is not None:
+                    yield record
+                props = alarms = None
+            continue
+        
+        if props is None or not components:
+            continue
+        if components[-1] == "VALARM" and name == "TRIGGER":
+            alarms[-1] = (params, value)
+        elif components[-1] == kind:
+            props.setdefault(name, (params, value))
+
+def write_ics_line(f, line):
+    """Grava uma linha dobrada em 75 bytes, sem quebrar caracteres UTF-8"""
+    encoded = line.encode('utf-8')
+    start, limit = 0, 75
+    while len(encoded) - start > limit:
+        end = start + limit
+        while end > start and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        f.write(encoded[start:end].decode('utf-8') + "\r\n ")
+        start, limit = end, 74
+    f.write(encoded[start:].decode('utf-8') + "\r\n")
+
+def ics_utc(epoch):
+    return (EPOCH + timedelta(seconds=int(epoch))).strftime("%Y%m%dT%H%M%SZ")
+
+def ics_rrule(rule, zone):
+    parts = [f"FREQ={rule['freq'].upper()}", f"INTERVAL={max(int(rule.get('interval') or 1), 1)}"]
+    if rule['freq'] == "weekly" and rule.get("weekdays"):
+        parts.append("BYDAY=" + ",".join(ICS_WEEKDAYS[d] for d in sorted(rule["weekdays"])))
+    if rule['freq'] == "monthly" and rule.get("monthday"):
+        parts.append(f"BYMONTHDAY={rule['monthday']}")
+    if rule.get("count"):
+        parts.append(f"COUNT={rule['count']}")
+    elif rule.get("until"):
+        until = datetime.strptime(rule["until"], "%Y-%m-%d %H:%M:%S")
+        parts.append(f"UNTIL={ics_utc(wall_to_epoch(until, zone))}")
+    return ";".join(parts)
+
+def write_ics(f, tasks, zone=None):
+    """Exporta as tarefas pendentes como VTODO, uma de cada vez; retorna a quantidade"""
+    stamp = ics_utc(time.time())
+    count = 0
+    write_ics_line(f, "BEGIN:VCALENDAR")
+    write_ics_line(f, "VERSION:2.0")
+    write_ics_line(f, "PRODID:-//Task Reminder//PT-BR")
+    for task in tasks:
+        if task.get('status') == 'Concluída':
+            continue
+        due_at = task.get('due_at')
+        if due_at is None:
+            due_at = wall_to_epoch(datetime.strptime(task['datetime'], "%Y-%m-%d %H:%M:%S"), zone)
+        summary = ics_escape(task['task'])
+        created = re.sub(r"\D", "", task.get('created_at', ''))
+        
+        write_ics_line(f, "BEGIN:VTODO")
+        write_ics_line(f, f"UID:task-{task['id']}-{created}@task-reminder")
+        write_ics_line(f, f"DTSTAMP:{stamp}")
+        write_ics_line(f, f"SUMMARY:{summary}")
+        write_ics_line(f, f"DTSTART:{ics_utc(due_at)}")
+        write_ics_line(f, f"DUE:{ics_utc(due_at)}")
+        write_ics_line(f, f"PRIORITY:{ICS_PRIORITIES[task_priority(task)]}")
+        if task.get('tags'):
+            write_ics_line(f, "CATEGORIES:" + ",".join(ics_escape(tag) for tag in task['tags']))
+        if task.get('recurrence'):
+            write_ics_line(f, f"RRULE:{ics_rrule(task['recurrence'], zone)}")
+        write_ics_line(f, "STATUS:NEEDS-ACTION")
+        for minutes in task.get('reminders', []):
+            write_ics_line(f, "BEGIN:VALARM")
+            write_ics_line(f, "ACTION:DISPLAY")
+            write_ics_line(f, f"DESCRIPTION:{summary}")
+            write_ics_line(f, f"TRIGGER:-PT{minutes}M")
+            write_ics_line(f, "END:VALARM")
+        write_ics_line(f, "END:VTODO")
+        count += 1
+    write_ics_line(f, "END:VCALENDAR")
+    return count
+
+class EventHub:
+    """Distribui eventos do app para os fluxos /events da API (uma fila por conexão)"""
+    QUEUE_SIZE = 1000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues = set()
+
+    def subscribe(self):
+        events = queue.Queue(self.QUEUE_SIZE)
+        with self.lock:
+            self.queues.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            self.queues.discard(events)
+
+    def publish(self, event, data):
+        # Sem ninguém ouvindo, publicar não custa nada
+        if not self.queues:
+            return
+        message = (event, json.dumps(data, ensure_ascii=False))
+        with self.lock:
+            for events in self.queues:
+                try:
+                    events.put_nowait(message)
+                except queue.Full:
+                    logger.debug("Fluxo de eventos lento; evento %s descartado", event)
+
+class LocalApiHandlerMixin:
+    """Rotas da API local; a classe final herda também de BaseHTTPRequestHandler"""
+    server_version = "TaskReminder"
+    MAX_BODY = 64 * 1024 * 1024
+    KEEPALIVE = 15
+
+    def log_message(self, fmt, *args):
+        logger.debug("API %s - " + fmt, self.client_address[0], *args)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def authorized(self):
+        # Host fixo evita páginas web usando DNS rebinding; o token autentica o cliente
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if host not in ("127.0.0.1", "localhost"):
+            return False
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        return bool(self.server.token) and hmac.compare_digest(token, self.server.token)
+
+    def dispatch(self, method):
+        if not self.authorized():
+            self.reply(401, {"error": "Token inválido"})
+            return
+        
+        path, _, query = self.path.partition("?")
+        parts = [part for part in path.split("/") if part]
+        app = self.server.app
+        try:
+            if method == "GET" and parts == ["events"]:
+                self.stream_events()
+                return
+            if method == "GET" and parts == ["tasks", "upcoming"]:
+                limit = int(parse_qs(query).get("limit", ["20"])[0])
+                self.reply(200, app.call_in_ui(app.api_upcoming, limit))
+            elif method == "POST" and parts == ["tasks"]:
+                self.reply(201, app.call_in_ui(app.api_create, self.read_json()))
+            elif method == "POST" and parts == ["tasks", "bulk"]:
+                body = self.read_json()
+                records = body.get("tasks") if isinstance(body, dict) else body
+                if not isinstance(records, list):
+                    raise ValueError("Envie uma lista de tarefas")
+                self.reply(201, app.call_in_ui(app.api_bulk_create, records, timeout=120))
+            elif method == "PATCH" and len(parts) == 2 and parts[0] == "tasks":
+                self.reply(200, app.call_in_ui(app.api_update, int(parts[1]), self.read_json()))
+            elif method == "POST" and len(parts) == 3 and parts[0] == "tasks" and parts[2] == "complete":
+                self.reply(200, app.call_in_ui(app.api_complete, int(parts[1])))
+            else:
+                self.reply(404, {"error": "Rota desconhecida"})
+        except KeyError as e:
+            self.reply(404, {"error": f"Tarefa não encontrada: {e}"})
+        except ValueError as e:
+            self.reply(400, {"error": str(e)})
+        except TimeoutError as e:
+            self.reply(503, {"error": str(e)})
+        except Exception as e:
+            logger.exception("Erro na API local")
+            self.reply(500, {"error": str(e)})
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > self.MAX_BODY:
+            raise ValueError("Corpo da requisição vazio ou grande demais")
+        return json.loads(self.rfile.read(length))
+
+    def reply(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self):
+        """Server-Sent Events até o cliente desconectar ou a API parar"""
+        events = self.server.events.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            while not self.server.stopping:
+                try:
+                    event, data = events.get(timeout=self.KEEPALIVE)
+                    chunk = f"event: {event}\ndata: {data}\n\n"
+                except queue.Empty:
+                    chunk = ": keepalive\n\n"
+                self.wfile.write(chunk.encode('utf-8'))
+                self.wfile.flush()
+        except OSError:
+            logger.debug("Fluxo de eventos encerrado pelo cliente")
+        finally:
+            self.server.events.unsubscribe(events)
+
+class LocalApiServer:
+    """API JSON opcional, só em 127.0.0.1 e protegida por token"""
+    def __init__(self, app, port, token, events):
+        self.app = app
+        self.port = port
+        self.token = token
+        self.events = events
+        self.httpd = None
+
+    def start(self):
+        handler = type("LocalApiHandler", (LocalApiHandlerMixin, http_server.BaseHTTPRequestHandler), {})
+        httpd = http_server.ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+        httpd.daemon_threads = True
+        httpd.app, httpd.token, httpd.events, httpd.stopping = self.app, self.token, self.events, False
+        self.httpd = httpd
+        threading.Thread(target=httpd.serve_forever, name="LocalApi", daemon=True).start()
+        logger.info("API local ouvindo em http://127.0.0.1:%d", self.port)
+
+    def stop(self):
+        httpd, self.httpd = self.httpd, None
+        if httpd is not None:
+            httpd.stopping = True
+            httpd.shutdown()
+            httpd.server_close()
+            logger.info("API local encerrada")
+
+def app_data_dir():
+    """Pasta do executável (ou do script), onde ficam tarefas e configurações"""
+    if getattr(sys, 'frozen', False):
+        # Executando como .exe
+        return Path(sys.executable).parent.absolute()
+    # Executando como script Python
+    return Path(__file__).parent.absolute()
+
+def parse_user_datetime(text):
+    """Aceita 'DD/MM/AAAA HH:MM' ou 'AAAA-MM-DD HH:MM[:SS]'"""
+    text = text.strip()
+    if len(text) == 19 and text[10] in " T":
+        # Formato do tasks.json (e das importações): caminho rápido
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
             pass
+    for fmt in ("%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Data/hora inválida: {text} (use DD/MM/AAAA HH:MM)")
+
+class SingleInstance:
+    """Uma instância por pasta de dados: trava de arquivo + canal local para comandos.
+
+    O canal é um pipe nomeado no Windows e um socket Unix nos demais sistemas; o
+    endereço e a chave de autenticação ficam num arquivo legível só pelo usuário.
+    """
+    LOCK_NAME = "task_reminder.lock"
+    INFO_NAME = "task_reminder.ipc"
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self.lock_path = self.data_dir / self.LOCK_NAME
+        self.info_path = self.data_dir / self.INFO_NAME
+        self.lock_file = None
+        self.listener = None
+        self.address = None
+
+    def acquire(self):
+        """Tenta obter a trava; False se outra instância já está em execução.
+
+        A trava é do sistema operacional e some junto com o processo, mesmo numa queda.
+        """
+        lock_file = open(self.lock_path, 'a+b')
+        if not try_lock(lock_file):
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    @staticmethod
+    def channel_address(data_dir):
+        """Família e endereço do canal local, únicos por pasta de dados"""
+        suffix = hashlib.sha1(str(data_dir).encode('utf-8')).hexdigest()[:12]
+        if os.name == 'nt':
+            return 'AF_PIPE', rf'\\.\pipe\TaskReminder-{suffix}'
+        return 'AF_UNIX', os.path.join(tempfile.gettempdir(), f"task_reminder-{suffix}.sock")
+
+    def listen(self, handler):
+        """Abre o canal local e atende comandos em uma thread; handler(msg) -> resposta"""
+        family, self.address = self.channel_address(self.data_dir)
+        if family == 'AF_UNIX' and os.path.exists(self.address):
+            # Sobra de uma execução que caiu (a trava garante que não há outra ativa)
+            os.remove(self.address)
+        
+        authkey = os.urandom(32)
+        self.listener = multiprocessing.connection.Listener(self.address, family=family, authkey=authkey)
+        
+        info = {"family": family, "address": self.address, "authkey": authkey.hex(), "pid": os.getpid()}
+        fd = os.open(self.info_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        
+        threading.Thread(target=self._serve, args=(self.listener, handler),
+                         name="InstanceChannel", daemon=True).start()
+
+    def _serve(self, listener, handler):
+        while self.listener is listener:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                if self.listener is not listener:
+                    return
+                logger.warning("Conexão recusada no canal local", exc_info=True)
+                continue
+            
+            with conn:
+                try:
+                    reply = handler(conn.recv())
+                except Exception as e:
+                    logger.exception("Erro ao atender comando de outra execução")
+                    reply = {"ok": False, "error": str(e)}
+                try:
+                    conn.send(reply)
+                except OSError:
+                    logger.debug("Execução que enviou o comando já encerrou", exc_info=True)
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            try:
+                listener.close()
+            except OSError:
+                pass
+            for path in (self.info_path, self.address if os.name != 'nt' else None):
+                try:
+                    if path:
+                        os.remove(path)
+                except OSError:
+                    pass
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+
+# Espera (s) pela resposta da instância em execução; importações grandes levam minutos
+INSTANCE_COMMAND_TIMEOUT = 600
+
+def send_instance_command(data_dir, command, timeout=INSTANCE_COMMAND_TIMEOUT, **args):
+    """Envia um comando à instância em execução; None se não houver nenhuma ouvindo"""
+    try:
+        with open(Path(data_dir) / SingleInstance.INFO_NAME, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        conn = multiprocessing.connection.Client(info["address"], family=info["family"],
+                                                 authkey=bytes.fromhex(info["authkey"]))
+    except (OSError, ValueError, KeyError, EOFError, multiprocessing.AuthenticationError):
+        return None
+    
+    with conn:
+        conn.send({"command": command, "args": args})
+        if not conn.poll(timeout):
+            raise TimeoutError("A instância em execução não respondeu")
+        return conn.recv()
+
+def report(message):
+    """Mensagem para o terminal (no .exe sem console não há stderr)"""
+    if sys.stderr is not None:
+        print(message, file=sys.stderr)
+
+def main(start_minimized=False, command=None):
+    """Função principal; command é repassado à instância já aberta, se houver"""
+    data_dir = app_data_dir()
+    instance = SingleInstance(data_dir)
+    
+    if not instance.acquire():
+        # Já existe uma instância: ela faz o trabalho, sem abrir outro Tk
+        command = command or {"command": "show"}
+        try:
+            reply = send_instance_command(data_dir, command["command"], **command.get("args", {}))
+        except TimeoutError as e:
+            reply = {"ok": False, "error": str(e)}
+        if reply is None:
+            report("O Task Reminder já está em execução, mas não respondeu.")
+            sys.exit(1)
+        if not reply.get("ok"):
+            report(f"Erro: {reply.get('error')}")
+            sys.exit(1)
         sys.exit(0)
     
     # Criar janela principal
     root = tk.Tk()
     
     try:
-        app = TaskReminderApp(root)
+        app = TaskReminderApp(root, start_minimized=start_minimized)
+        try:
+            instance.listen(app.handle_instance_command)
+        except OSError:
+            logger.exception("Canal local indisponível; comandos de outras execuções serão ignorados")
+        if command and command["command"] != "show":
+            # Primeira execução já com um comando: executado depois de montar a janela
+            root.after_idle(lambda: app.handle_instance_command(command))
         root.mainloop()
     except Exception as e:
-        print(f"Erro fatal: {e}")
-        traceback.print_exc()
+        logger.critical("Erro fatal: %s", e, exc_info=True)
         try:
             messagebox.showerror("Erro Fatal", f"Ocorreu um erro no aplicativo:\n\n{e}")
-        except:
-            pass
+        except Exception:
+            traceback.print_exc()
     finally:
-        ctypes.windll.kernel32.CloseHandle(mutex)
+        instance.close()
+
+class OfflineCommands:
+    """Subcomandos aplicados direto nos arquivos quando nenhuma instância está aberta"""
+    def __init__(self, data_dir):
+        config = ConfigService(Path(data_dir) / "config.json")
+        config.load()
+        self.store = TaskStore(data_dir, shared=config.get("shared_file", False),
+                               backup_count=config.get("backup_count", 5))
+        self.archive = TaskArchive(Path(data_dir) / "archive")
+        self.zone = system_zone_name()
+        self.tasks = self.store.load(self.zone)
+
+    def next_task_id(self):
+        return max(next_task_id(self.tasks), self.archive.max_id + 1)
+
+    def add(self, **args):
+        task = task_from_command(self.next_task_id(), self.zone, **args)
+        self.tasks.append(task)
+        self.tasks = self.store.save(self.tasks)
+        return task['id']
+
+    def import_(self, path):
+        seen = {content_hash(t['task'], t['datetime']) for t in self.tasks}
+        totals = import_totals()
+        task_id = self.next_task_id()
+        for tasks in dedup_batches(iter_task_records(path, self.zone), self.zone, seen, totals):
+            for task in tasks:
+                task['id'] = task_id
+                task_id += 1
+            self.tasks.extend(tasks)
+        if totals['imported']:
+            self.tasks = self.store.save(self.tasks)
+        return totals
+
+    def list(self, due_before=None, include_done=False):
+        limit = parse_user_datetime(due_before) if due_before else None
+        return list_open_tasks(self.tasks, limit, include_done)
+
+    def complete(self, task_id):
+        task = next((t for t in self.tasks if t['id'] == int(task_id)), None)
+        if task is None:
+            raise ValueError(f"Tarefa {task_id} não encontrada")
+        complete_occurrence(task, self.zone)
+        self.tasks = self.store.save(self.tasks)
+        return task
+
+    def export(self):
+        return self.tasks
+
+    def stats(self):
+        return dict(task_stats(self.tasks), archived=self.archive.count)
+
+def output(text):
+    """Saída dos subcomandos (no .exe sem console não há stdout)"""
+    if sys.stdout is not None:
+        print(text)
+
+def command_arguments(args):
+    """Argumentos do comando enviado à instância (ou aplicado direto nos arquivos)"""
+    if args.subcommand == "add":
+        return {"text": args.text, "at": args.at, "reminders": args.reminders,
+                "priority": args.priority, "tags": args.tags, "list_name": args.list_name}
+    if args.subcommand == "list":
+        return {"due_before": args.due_before, "include_done": args.all}
+    if args.subcommand == "complete":
+        return {"task_id": args.task_id}
+    if args.subcommand == "import":
+        return {"path": os.path.abspath(args.path)}
+    return {}
+
+def run_command(args):
+    """Executa um subcomando pela instância aberta ou, sem ela, direto nos arquivos; retorna o código de saída"""
+    data_dir = app_data_dir()
+    command_args = command_arguments(args)
+    instance = SingleInstance(data_dir)
+    try:
+        if instance.acquire():
+            # Nenhuma instância aberta: a trava segura a interface enquanto os arquivos mudam
+            try:
+                commands = OfflineCommands(data_dir)
+                handler = commands.import_ if args.subcommand == "import" else getattr(commands, args.subcommand)
+                result = handler(**command_args)
+            finally:
+                instance.close()
+        else:
+            reply = send_instance_command(data_dir, args.subcommand, **command_args)
+            if reply is None:
+                report("O Task Reminder está em execução, mas não respondeu.")
+                return 1
+            if not reply.get("ok"):
+                report(f"Erro: {reply.get('error')}")
+                return 1
+            result = reply.get("result")
+    except (OSError, ValueError, TimeoutError) as e:
+        report(f"Erro: {e}")
+        return 1
+    
+    print_command_result(args, result)
+    return 0
+
+def print_command_result(args, result):
+    if args.subcommand == "add":
+        output(f"Tarefa {result} adicionada")
+    elif args.subcommand == "import":
+        output(describe_import(result))
+    elif args.subcommand == "complete":
+        output(f"Tarefa {result['id']} concluída: {result['task']}")
+    elif args.subcommand == "export":
+        if args.path == "-":
+            output(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            count = write_tasks_file(args.path, result, system_zone_name())
+            report(f"{count} tarefa(s) exportada(s) para {args.path}")
+    elif args.json:
+        output(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.subcommand == "list":
+        for task in result:
+            when = datetime.strptime(effective_due(task), "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y %H:%M")
+            done = " [Concluída]" if task.get('status') == 'Concluída' else ""
+            output(f"{task['id']:>5}  {when}  {task['task']}{done}")
+    elif args.subcommand == "stats":
+        output(f"Total: {result['total']}  Pendentes: {result['pending']}  "
+               f"Concluídas: {result['completed']}  Atrasadas: {result['overdue']}  "
+               f"Recorrentes: {result['recurring']}  Arquivadas: {result.get('archived', 0)}")
+        if result['next_due']:
+            output(f"Próxima: {datetime.strptime(result['next_due'], '%Y-%m-%d %H:%M:%S'):%d/%m/%Y %H:%M}")
+        for title, counts in (("Por lista", result['by_list']), ("Por prioridade", result['by_priority'])):
+            if counts:
+                output(f"{title}: " + ", ".join(f"{name} {count}" for name, count in sorted(counts.items())))
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(prog="task_reminder", description="Task Reminder")
+    parser.add_argument("--minimized", action="store_true", help="iniciar na bandeja")
+    parser.add_argument("--add", metavar="TEXTO", help="adicionar uma tarefa")
+    parser.add_argument("--at", metavar="'DD/MM/AAAA HH:MM'", help="data/hora da tarefa de --add")
+    parser.add_argument("--import", dest="import_file", metavar="ARQUIVO", help="importar tarefas de um arquivo")
+    
+    # Subcomandos: usam a instância aberta ou os arquivos, sem abrir a interface
+    subparsers = parser.add_subparsers(dest="subcommand", metavar="COMANDO")
+    
+    add = subparsers.add_parser("add", help="adicionar uma tarefa")
+    add.add_argument("text", metavar="TEXTO")
+    add.add_argument("--at", metavar="'DD/MM/AAAA HH:MM'", help="data/hora (padrão: próxima hora cheia)")
+    add.add_argument("--reminders", default="", metavar="'5m, 1h'", help="lembretes antes do horário")
+    add.add_argument("--priority", default="Normal", choices=list(PRIORITY_LABELS.values()))
+    add.add_argument("--tags", default="", metavar="'#casa #urgente'")
+    add.add_argument("--list", dest="list_name", default="", metavar="LISTA")
+    
+    list_parser = subparsers.add_parser("list", help="listar tarefas em aberto por data/hora")
+    list_parser.add_argument("--due-before", metavar="'DD/MM/AAAA HH:MM'", help="só as que vencem antes disso")
+    list_parser.add_argument("--all", action="store_true", help="incluir as concluídas")
+    list_parser.add_argument("--json", action="store_true", help="saída em JSON")
+    
+    complete = subparsers.add_parser("complete", help="marcar uma tarefa como concluída")
+    complete.add_argument("task_id", type=int, metavar="ID")
+    
+    import_parser = subparsers.add_parser("import", help="importar tarefas (.ics, .csv, .ndjson ou JSON), sem duplicatas")
+    import_parser.add_argument("path", metavar="ARQUIVO")
+    
+    export = subparsers.add_parser("export", help="exportar as tarefas (.json, .csv, .ndjson ou .ics com as pendentes)")
+    export.add_argument("path", nargs="?", default="-", metavar="ARQUIVO",
+                        help="arquivo de saída; o formato vem da extensão (padrão: JSON na tela)")
+    
+    stats = subparsers.add_parser("stats", help="resumo das tarefas")
+    stats.add_argument("--json", action="store_true", help="saída em JSON")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    start_minimized = "--minimized" in sys.argv
+    args = parse_arguments()
+    if args.subcommand:
+        sys.exit(run_command(args))
+    
+    command = None
+    if args.add:
+        command = {"command": "add", "args": {"text": args.add, "at": args.at}}
+    elif args.import_file:
+        command = {"command": "import", "args": {"path": os.path.abspath(args.import_file)}}
     
     # Iniciar aplicação
-    main()
\ No newline at end of file
+    main(start_minimized=args.minimized, command=command)
\ No newline at end of file